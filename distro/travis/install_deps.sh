@@ -17,6 +17,7 @@ install_ubuntu_deps_common()
     python-coverage \
     python-dev \
     python-lxml \
+    python-msgpack \
     python-numpy \
     python-scipy \
     python-yaml \
@@ -71,7 +72,7 @@ install_osx_deps()
   brew ls --versions python || brew install python
   brew ls --versions numpy || brew install numpy || echo "error on brew install numpy"
 
-  pip install coverage lxml PyYAML Sphinx sphinx_rtd_theme
+  pip install coverage lxml 'msgpack-python>=0.4.0' PyYAML Sphinx sphinx_rtd_theme
 }
 
 
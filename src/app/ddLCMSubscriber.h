@@ -35,6 +35,8 @@ public:
     this->mEmitMessages = true;
     this->mNotifyAllMessages = false;
     this->mRequiredElapsedMilliseconds = 0;
+    this->mReceivedCount = 0;
+    this->mDroppedCount = 0;
     this->mTimer.start();
     this->connect(this, SIGNAL(messageReceivedInQueue(const QString&)), SLOT(onMessageInQueue(const QString&)));
   }
@@ -106,6 +108,22 @@ public:
     return this->mFPSCounter.averageFPS();
   }
 
+  // Number of messages received on the LCM thread.
+  int getReceivedCount() const
+  {
+    QMutexLocker locker(&this->mMutex);
+    return this->mReceivedCount;
+  }
+
+  // Number of received messages that were never emitted, because of the
+  // speed limit or because a newer message replaced them before the main
+  // thread was ready.
+  int getDroppedCount() const
+  {
+    QMutexLocker locker(&this->mMutex);
+    return this->mDroppedCount;
+  }
+
   QByteArray getNextMessage(int timeout)
   {
 
@@ -158,6 +176,10 @@ protected:
 
     mFPSCounter.update();
 
+    this->mMutex.lock();
+    this->mReceivedCount++;
+    this->mMutex.unlock();
+
     if (this->mEmitMessages)
     {
       if (this->mRequiredElapsedMilliseconds == 0 || mTimer.elapsed() > this->mRequiredElapsedMilliseconds)
@@ -172,6 +194,10 @@ protected:
         {
           this->mMutex.lock();
           bool doEmit = !this->mLastMessage.size();
+          if (!doEmit)
+          {
+            this->mDroppedCount++;
+          }
           this->mLastMessage = messageBytes;
           this->mMutex.unlock();
 
@@ -182,6 +208,12 @@ protected:
         }
 
       }
+      else
+      {
+        this->mMutex.lock();
+        this->mDroppedCount++;
+        this->mMutex.unlock();
+      }
     }
     else
     {
@@ -196,6 +228,8 @@ protected:
   bool mEmitMessages;
   bool mNotifyAllMessages;
   int mRequiredElapsedMilliseconds;
+  int mReceivedCount;
+  int mDroppedCount;
   mutable QMutex mMutex;
   QWaitCondition mWaitCondition;
   QByteArray mLastMessage;
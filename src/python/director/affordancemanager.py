@@ -5,11 +5,14 @@ from director import visualization as vis
 from director.timercallback import TimerCallback
 from director.uuidutil import newUUID
 from director import vtkAll as vtk
+from director import callbacks
 from director.thirdparty import numpyjsoncoder
 import traceback
 
 class AffordanceObjectModelManager(object):
 
+    AFFORDANCE_CHANGED_SIGNAL = 'AFFORDANCE_CHANGED_SIGNAL'
+
     def __init__(self, view):
         self.collection = lcmobjectcollection.LCMObjectCollection(channel='AFFORDANCE_COLLECTION_COMMAND')
         self.collection.connectDescriptionUpdated(self._onDescriptionUpdated)
@@ -23,6 +26,21 @@ class AffordanceObjectModelManager(object):
         self.timer.callback = self._notifyPendingUpdates
 
         self.affordanceUpdater = None
+        self.callbacks = callbacks.CallbackRegistry([self.AFFORDANCE_CHANGED_SIGNAL])
+
+    def connectAffordanceChanged(self, func):
+        '''
+        Connect a callback func(affordanceId) that is called when an
+        affordance is registered, modified or removed, including changes
+        received from the affordance collection.
+        '''
+        return self.callbacks.connect(self.AFFORDANCE_CHANGED_SIGNAL, func)
+
+    def disconnectAffordanceChanged(self, callbackId):
+        self.callbacks.disconnect(callbackId)
+
+    def _affordanceChanged(self, aff):
+        self.callbacks.process(self.AFFORDANCE_CHANGED_SIGNAL, self.getAffordanceId(aff))
 
     def setAffordanceUpdater(self, affordanceUpdater):
         self.affordanceUpdater = affordanceUpdater
@@ -59,6 +77,7 @@ class AffordanceObjectModelManager(object):
         aff.connectRemovedFromObjectModel(self._onAffordanceRemovedFromObjectModel)
         aff.properties.connectPropertyChanged(self._onAffordancePropertyChanged)
         aff.getChildFrame().connectFrameModified(self._onAffordanceFrameChanged)
+        self._affordanceChanged(aff)
         if notify:
             self.notifyAffordanceUpdate(aff)
 
@@ -89,17 +108,20 @@ class AffordanceObjectModelManager(object):
         self._pendingUpdates.clear()
 
     def _onAffordancePropertyChanged(self, propertySet, propertyName):
+        self.callbacks.process(self.AFFORDANCE_CHANGED_SIGNAL, propertySet.getProperty('uuid'))
         if self._ignoreChanges:
             return
         self.notifyAffordanceUpdate(self.getAffordanceById(propertySet.getProperty('uuid')))
 
     def _onAffordanceFrameChanged(self, frameObj):
+        aff = frameObj.parent()
+        self._affordanceChanged(aff)
         if self._ignoreChanges:
             return
-        aff = frameObj.parent()
         self.notifyAffordanceUpdate(aff)
 
     def _onAffordanceRemovedFromObjectModel(self, objectModel, aff):
+        self._affordanceChanged(aff)
         if self._ignoreChanges:
             return
         self.removeAffordance(aff)
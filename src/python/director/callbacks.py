@@ -1,5 +1,5 @@
+import time
 from weakref import ref
-import new
 
 '''
 CallbackRegistry is a class taken from matplotlib.cbook.
@@ -52,6 +52,8 @@ class CallbackRegistry:
         '*signals* is a sequence of valid signals'
         self.signals = set()
         self.callbacks = dict()
+        self._handlers = dict()
+        self._cidSignals = dict()
         for s in signals:
             self.addSignal(s)
         self._cid = 0
@@ -67,6 +69,7 @@ class CallbackRegistry:
         if sig not in self.signals:
             self.signals.add(sig)
             self.callbacks[sig] = dict()
+            self._handlers[sig] = ()
 
     def connect(self, s, func):
         """
@@ -75,54 +78,127 @@ class CallbackRegistry:
         """
         self._check_signal(s)
         proxy = BoundMethodProxy(func)
-        for cid, callback in self.callbacks[s].items():
-            # Clean out dead references
-            if callback.inst is not None and callback.inst() is None:
-                del self.callbacks[s][cid]
-            elif callback == proxy:
+        for cid, callback in self.callbacks[s].iteritems():
+            if callback == proxy:
                 return cid
         self._cid += 1
-        self.callbacks[s][self._cid] = proxy
-        return self._cid
+        cid = self._cid
+        if proxy.inst is not None:
+            # remove the callback when the instance is garbage collected
+            proxy.inst = ref(proxy.inst(), _makeDeadCallbackRemover(self, cid))
+        self.callbacks[s][cid] = proxy
+        self._cidSignals[cid] = s
+        self._handlers[s] = None
+        return cid
 
     def disconnect(self, cid):
         """
         disconnect the callback registered with callback id *cid*
         """
-        for eventname, callbackd in self.callbacks.items():
-            try:
-                del callbackd[cid]
-            except KeyError:
-                continue
-            else:
-                return
+        s = self._cidSignals.pop(cid, None)
+        if s is not None:
+            del self.callbacks[s][cid]
+            self._handlers[s] = None
+
+    def _getHandlers(self, s):
+        '''
+        Returns a tuple of (func, inst) pairs for the callbacks of signal s,
+        where inst is a weak reference to the instance of a bound method or
+        None.  The tuple is cached until a callback is connected or removed,
+        so process does not copy the callbacks dict.
+        '''
+        self._check_signal(s)
+        handlers = self._handlers[s]
+        if handlers is None:
+            handlers = self._handlers[s] = tuple((proxy.func, proxy.inst) for cid, proxy in sorted(self.callbacks[s].iteritems()))
+        return handlers
 
     def process(self, s, *args, **kwargs):
         """
         process signal *s*.  All of the functions registered to receive
         callbacks on *s* will be called with *\*args* and *\*\*kwargs*
         """
-        self._check_signal(s)
-        for cid, proxy in self.callbacks[s].items():
-            # Clean out dead references
-            if proxy.inst is not None and proxy.inst() is None:
-                del self.callbacks[s][cid]
+        handlers = self._handlers.get(s)
+        if handlers is None:
+            handlers = self._getHandlers(s)
+
+        if _statistics is not None:
+            startTime = time.time()
+
+        for func, inst in handlers:
+            if inst is None:
+                func(*args, **kwargs)
             else:
-                proxy(*args, **kwargs)
+                obj = inst()
+                if obj is not None:
+                    func(obj, *args, **kwargs)
+
+        if _statistics is not None:
+            _recordDispatch(s, time.time() - startTime)
 
     def getCallbacks(self, s):
         """
         return callbacks registered to signal *s*.
         """
         self._check_signal(s)
-        callbacks = []
-        for cid, proxy in self.callbacks[s].items():
-            # Clean out dead references
-            if proxy.inst is not None and proxy.inst() is None:
-                del self.callbacks[s][cid]
-            else:
-                callbacks.append(proxy)
-            return callbacks
+        return [proxy for cid, proxy in sorted(self.callbacks[s].iteritems())
+                    if proxy.inst is None or proxy.inst() is not None]
+
+
+def _makeDeadCallbackRemover(registry, cid):
+    '''
+    Returns a weakref callback that disconnects cid from the registry.  The
+    registry itself is only weakly referenced.
+    '''
+    registryRef = ref(registry)
+    def onInstanceDeleted(instRef):
+        registry = registryRef()
+        if registry is not None:
+            registry.disconnect(cid)
+    return onInstanceDeleted
+
+
+_statistics = None
+
+
+def setStatisticsEnabled(enabled):
+    '''
+    Enable or disable counting the dispatches and the time spent in the
+    callbacks of each signal name, summed over all registries.  The time of
+    a signal includes the time of signals processed by its callbacks.
+    '''
+    global _statistics
+    if not enabled:
+        _statistics = None
+    elif _statistics is None:
+        _statistics = dict()
+
+
+def resetStatistics():
+    if _statistics is not None:
+        _statistics.clear()
+
+
+def getStatistics():
+    '''
+    Returns a dict of signal name to (dispatch count, total seconds).
+    '''
+    return dict((s, tuple(stats)) for s, stats in (_statistics or {}).iteritems())
+
+
+def printStatistics():
+    stats = sorted(getStatistics().iteritems(), key=lambda x: x[1][1], reverse=True)
+    print '%-40s %10s %10s %10s' % ('signal', 'count', 'total ms', 'mean us')
+    for s, (count, seconds) in stats:
+        print '%-40s %10d %10.2f %10.2f' % (s, count, seconds*1e3, seconds*1e6/count)
+
+
+def _recordDispatch(s, seconds):
+    stats = _statistics.get(s)
+    if stats is None:
+        stats = _statistics[s] = [0, 0.0]
+    stats[0] += 1
+    stats[1] += seconds
 
 
 class BoundMethodProxy(object):
@@ -162,13 +238,11 @@ class BoundMethodProxy(object):
         if self.inst is not None and self.inst() is None:
             raise ReferenceError
         elif self.inst is not None:
-            # build a new instance method with a strong reference to the instance
-            mtd = new.instancemethod(self.func, self.inst(), self.klass)
+            # call the function with a strong reference to the instance
+            return self.func(self.inst(), *args, **kwargs)
         else:
-            # not a bound method, just return the func
-            mtd = self.func
-        # invoke the callable and return the result
-        return mtd(*args, **kwargs)
+            # not a bound method, just call the func
+            return self.func(*args, **kwargs)
 
     def __eq__(self, other):
         '''
@@ -1,8 +1,155 @@
+import __builtin__
+import importlib
+import time
+import threading
 from collections import OrderedDict
 from director.fieldcontainer import FieldContainer
 from director.thirdparty.toposort import toposort_flatten
 
 
+_componentTimes = OrderedDict()
+
+
+class ImportTimer(object):
+    '''
+    A context manager that measures the time spent importing modules on the
+    current thread while it is active, and the elapsed time.  Imports are
+    timed by wrapping __builtin__.__import__ while any ImportTimer is
+    active, imports on other threads are not counted.  Nested imports are
+    counted once, and the time spent in a nested ImportTimer, for example
+    a LazyModule imported by a component init function, is excluded from
+    the enclosing timer so that it is not counted twice.
+    '''
+
+    _threadState = threading.local()
+    _lock = threading.Lock()
+    _numActive = 0
+    _import = None
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.elapsed = 0.0
+        self._depth = 0
+        self._startTime = None
+        self._nestedSeconds = 0.0
+        self._nestedImportSeconds = 0.0
+
+    @classmethod
+    def _getStack(cls):
+        stack = getattr(cls._threadState, 'stack', None)
+        if stack is None:
+            stack = cls._threadState.stack = []
+        return stack
+
+    def __enter__(self):
+        with ImportTimer._lock:
+            if not ImportTimer._numActive:
+                ImportTimer._import = __builtin__.__import__
+                __builtin__.__import__ = ImportTimer._timedImport
+            ImportTimer._numActive += 1
+
+        self._getStack().append(self)
+        self._startTime = time.time()
+        return self
+
+    def __exit__(self, *args):
+        totalSeconds = time.time() - self._startTime
+        stack = self._getStack()
+        stack.pop()
+        if stack:
+            parent = stack[-1]
+            parent._nestedSeconds += totalSeconds
+            if parent._depth:
+                parent._nestedImportSeconds += totalSeconds
+
+        self.elapsed = totalSeconds - self._nestedSeconds
+        self.seconds -= self._nestedImportSeconds
+
+        with ImportTimer._lock:
+            ImportTimer._numActive -= 1
+            if not ImportTimer._numActive:
+                __builtin__.__import__ = ImportTimer._import
+
+    @staticmethod
+    def _timedImport(*args, **kwargs):
+        stack = getattr(ImportTimer._threadState, 'stack', None)
+        if not stack or stack[-1]._depth:
+            return ImportTimer._import(*args, **kwargs)
+
+        timer = stack[-1]
+        timer._depth += 1
+        startTime = time.time()
+        try:
+            return ImportTimer._import(*args, **kwargs)
+        finally:
+            timer._depth -= 1
+            timer.seconds += time.time() - startTime
+
+
+class LazyModule(object):
+    '''
+    A module proxy that imports the module on first attribute access:
+
+        drilldemo = LazyModule('director.drilldemo')
+        ...
+        demo = drilldemo.DrillPlannerDemo(...)
+
+    The import time is recorded as a component named 'import <name>', see
+    getComponentTimes.
+    '''
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            importTimer = ImportTimer()
+            with importTimer:
+                module = importlib.import_module(self._name)
+            recordComponentTime('import ' + self._name, importTimer.seconds, 0.0)
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        return '<lazy module %r%s>' % (self._name, '' if self._module is None else ' (imported)')
+
+
+def recordComponentTime(name, importSeconds, initSeconds):
+    _componentTimes[name] = (importSeconds, initSeconds)
+
+
+def getComponentTimes():
+    '''
+    Returns an OrderedDict of component name to (import seconds, init
+    seconds) for the components initialized so far and the lazy modules
+    imported so far, in the order they were recorded.  The times of a
+    component exclude the components and lazy modules it initialized or
+    imported on demand, they are recorded separately, so the times add up
+    to the total.
+    '''
+    return OrderedDict(_componentTimes)
+
+
+def printComponentTimes(componentTimes=None):
+
+    componentTimes = componentTimes if componentTimes is not None else getComponentTimes()
+    totalImport = sum(importSeconds for importSeconds, initSeconds in componentTimes.values())
+    totalInit = sum(initSeconds for importSeconds, initSeconds in componentTimes.values())
+
+    print '%-40s %10s %10s %10s' % ('component', 'import ms', 'init ms', 'total ms')
+    for name, (importSeconds, initSeconds) in sorted(componentTimes.iteritems(), key=lambda x: sum(x[1]), reverse=True):
+        print '%-40s %10.1f %10.1f %10.1f' % (name, importSeconds*1e3, initSeconds*1e3, (importSeconds + initSeconds)*1e3)
+    print '%-40s %10.1f %10.1f %10.1f' % ('total', totalImport*1e3, totalInit*1e3, (totalImport + totalInit)*1e3)
+
+
 class ComponentGraph(object):
 
     def __init__(self):
@@ -50,7 +197,10 @@ class ComponentFactory(object):
         self.componentGraph = ComponentGraph()
         self.initFunctions = {}
         self.componentFields = {}
+        self.componentTimes = OrderedDict()
+        self.lazyComponents = set()
         self.defaultOptions = FieldContainer()
+        self._defaultFields = None
 
     def register(self, factoryClass):
 
@@ -68,6 +218,12 @@ class ComponentFactory(object):
             if name not in components.keys():
                 raise Exception('Unknown component %s found in list of disabled components.' % name)
 
+        lazyComponents = fact.getLazyComponents() if hasattr(fact, 'getLazyComponents') else []
+        for name in lazyComponents:
+            if name not in components.keys():
+                raise Exception('Unknown component %s found in list of lazy components.' % name)
+        self.lazyComponents.update(lazyComponents)
+
         options = dict()
         for name, deps in components.iteritems():
             self.componentGraph.addComponent(name, deps)
@@ -141,15 +297,49 @@ class ComponentFactory(object):
         self._verifyOptions(options)
         defaultFields = FieldContainer(options=options, **kwargs)
 
+        self._defaultFields = defaultFields
+
         initOrder = toposort_flatten(self.componentGraph.getComponentGraph())
-        for name in initOrder:
-            isEnabled = getattr(options, 'use'+name)
-            if isEnabled:
+        enabledComponents = [name for name in initOrder if getattr(options, 'use'+name)]
+
+        # lazy components that an eager component depends on are initialized now
+        eagerComponents = set(name for name in enabledComponents if name not in self.lazyComponents)
+        for name in list(eagerComponents):
+            eagerComponents.update(self.componentGraph.getComponentDependencies(name))
+
+        for name in enabledComponents:
+            if name in eagerComponents:
                 self.initComponent(name, defaultFields)
 
         fields = self._joinFields([defaultFields] + self.componentFields.values())
         return fields
 
+    def isComponentEnabled(self, name):
+        assert self._defaultFields is not None
+        return getattr(self._defaultFields.options, self._toOptionName(name))
+
+    def requireComponent(self, name):
+        '''
+        Returns the fields of an enabled component, initializing it and its
+        dependencies first if they have not been initialized.  Components
+        returned by a factory's getLazyComponents method are not initialized
+        by construct, unless an eager component depends on them, call this
+        method when they are first needed.
+        '''
+        if name not in self.componentFields:
+
+            if not self.isComponentEnabled(name):
+                raise Exception('Component %s is disabled.' % name)
+
+            dependencies = set(self.componentGraph.getComponentDependencies(name))
+            for dep in toposort_flatten(self.componentGraph.getComponentGraph()):
+                if dep in dependencies and dep not in self.componentFields:
+                    self.initComponent(dep, self._defaultFields)
+
+            self.initComponent(name, self._defaultFields)
+
+        return self.componentFields[name]
+
     def printComponentFields(self):
         for k, v in self.componentFields.iteritems():
             print k, 'exports fields:'
@@ -161,7 +351,13 @@ class ComponentFactory(object):
         initFunction = self.initFunctions[name]
         dependencies = self.componentGraph.getComponentDependencies(name)
         inputFields = self._joinFields([defaultFields] + [self.componentFields[dep] for dep in dependencies])
-        newFields = initFunction(inputFields)
+
+        importTimer = ImportTimer()
+        with importTimer:
+            newFields = initFunction(inputFields)
+        initSeconds = importTimer.elapsed - importTimer.seconds
+        self.componentTimes[name] = (importTimer.seconds, initSeconds)
+        recordComponentTime(name, importTimer.seconds, initSeconds)
 
         if not newFields:
             newFields = FieldContainer()
@@ -1,4 +1,4 @@
-import math, os
+import os
 import numpy as np
 from director import lcmUtils
 
@@ -287,17 +287,25 @@ class Link(object):
     def __init__(self, link):
         self.transform = vtk.vtkTransform()
         self.geometry = []
+        self.scanGeometry = None
         for g in link.geom:
             self.geometry.extend(Geometry.createGeometry(link.name + ' geometry data', g))
+        for g in self.geometry:
+            g.polyDataItem.actor.SetUserTransform(self.transform)
 
     def setTransform(self, pos, quat):
-        self.transform = transformUtils.transformFromPose(pos, quat)
+        self.setMatrix(transformUtils.matricesFromPoses(pos, quat).ravel())
+
+    def setMatrix(self, elements):
+        '''
+        Update the link transform in place from the 16 elements of a row
+        major 4x4 matrix.
+        '''
+        self.transform.SetMatrix(elements)
         for g in self.geometry:
             childFrame = g.polyDataItem.getChildFrame()
             if childFrame:
                 childFrame.copyFrame(self.transform)
-            else:
-                g.polyDataItem.actor.SetUserTransform(self.transform)
 
 
 class DrakeVisualizer(object):
@@ -309,6 +317,9 @@ class DrakeVisualizer(object):
         self.view = view
         self.robots = {}
         self.linkWarnings = set()
+        self.linkIndex = {}
+        self.drawLinks = None
+        self.drawMatrices = np.empty((0, 4, 4))
         self.enable()
         self.sendStatusMessage('loaded')
 
@@ -366,6 +377,42 @@ class DrakeVisualizer(object):
     def addLinksFromLCM(self, load_msg):
         for link in load_msg.link:
             self.addLink(Link(link), link.robot_num, link.name)
+        self.updateLinkIndex()
+
+    def updateLinkIndex(self):
+        '''
+        Rebuild the (robotNum, linkName) --> Link index used by onViewerDraw.
+        Must be called whenever robots are added or removed.
+        '''
+        self.linkIndex = {}
+        for robotNum, links in self.robots.iteritems():
+            for linkName, link in links.iteritems():
+                self.linkIndex[(robotNum, linkName)] = link
+        self.drawLinks = None
+
+    def getDrawLinks(self, msg):
+        '''
+        Returns the list of Link objects (or None for unknown links) matching
+        the link order of the given draw message.  The list is cached and only
+        rebuilt when the link order of the draw messages changes.
+        '''
+        if (self.drawLinks is not None
+            and msg.link_name == self.drawLinkNames
+            and msg.robot_num == self.drawRobotNums):
+            return self.drawLinks
+
+        self.drawLinkNames = list(msg.link_name)
+        self.drawRobotNums = list(msg.robot_num)
+        self.drawLinks = []
+        for robotNum, linkName in zip(msg.robot_num, msg.link_name):
+            link = self.linkIndex.get((robotNum, linkName))
+            if link is None and linkName not in self.linkWarnings:
+                print 'Error locating link name:', linkName
+                self.linkWarnings.add(linkName)
+            self.drawLinks.append(link)
+
+        self.drawMatrices = np.empty((msg.num_links, 4, 4))
+        return self.drawLinks
 
     def addLink(self, link, robotNum, linkName):
         self.robots.setdefault(robotNum, {})[linkName] = link
@@ -393,11 +440,13 @@ class DrakeVisualizer(object):
             if child.getProperty('Name') != "pointclouds":
                 om.removeFromObjectModel(child)
         self.robots = {}
+        self.updateLinkIndex()
 
     def removeRobot(self, robotNum):
         if robotNum in self.robots:
             om.removeFromObjectModel(self.getRobotFolder(robotNum))
             del self.robots[robotNum]
+            self.updateLinkIndex()
 
     def sendStatusMessage(self, message):
         msg = lcmrl.viewer_command_t()
@@ -407,21 +456,13 @@ class DrakeVisualizer(object):
 
     def onViewerDraw(self, msg):
 
-        for i in xrange(msg.num_links):
-
-            pos = msg.position[i]
-            quat = msg.quaternion[i]
-            robotNum = msg.robot_num[i]
-            linkName = msg.link_name[i]
+        links = self.getDrawLinks(msg)
+        matrices = transformUtils.matricesFromPoses(msg.position, msg.quaternion,
+                                                    out=self.drawMatrices)
 
-            try:
-                link = self.getLink(robotNum, linkName)
-            except KeyError:
-                if linkName not in self.linkWarnings:
-                    print 'Error locating link name:', linkName
-                    self.linkWarnings.add(linkName)
-            else:
-                link.setTransform(pos, quat)
+        for link, elements in zip(links, matrices.reshape(-1, 16)):
+            if link is not None:
+                link.setMatrix(elements)
 
         self.view.render()
 
@@ -438,67 +479,70 @@ class DrakeVisualizer(object):
                 print 'Error locating link name:', linkName
                 self.linkWarnings.add(linkName)
         else:
-            if len(link.geometry):
-                polyData = link.geometry[0].polyDataItem
-            else:
-                polyData = vtk.vtkPolyData()
-
-                name = linkName + ' geometry data'
+            # the scan gets its own geometry, the link geometry may be a mesh
+            g = link.scanGeometry
+            if g is None:
                 visInfo = FieldContainer(color=[1.0,0.0,0.0], alpha=1.0, texture=None)
-                g = Geometry(name, polyData, visInfo)
+                g = Geometry(linkName + ' planar lidar', vtk.vtkPolyData(), visInfo)
                 link.geometry.append(g)
+                link.scanGeometry = g
 
                 linkFolder = self.getLinkFolder(robotNum, linkName)
                 self.addLinkGeometry(g, linkName, linkFolder)
                 g.polyDataItem.actor.SetUserTransform(link.transform)
 
-            points = vtk.vtkPoints()
-            verts = vtk.vtkCellArray()
+            ranges = np.asarray(msg.ranges)
+            angles = msg.rad0 + msg.radstep * np.arange(len(ranges))
+            valid = ranges >= 0
+            ranges = ranges[valid]
+            angles = angles[valid]
 
-            t = msg.rad0
-            for r in msg.ranges:
-                if r >= 0:
-                    x = r * math.cos(t)
-                    y = r * math.sin(t)
+            points = np.zeros((len(ranges), 3))
+            points[:,0] = ranges * np.cos(angles)
+            points[:,1] = ranges * np.sin(angles)
 
-                    pointId = points.InsertNextPoint([x,y,0])
-                    verts.InsertNextCell(1)
-                    verts.InsertCellPoint(pointId)
-
-                t += msg.radstep
-
-            polyData.SetPoints(points)
-            polyData.SetVerts(verts)
+            vnp.updatePolyDataFromNumpy(g.polyDataItem.polyData, points)
+            g.polyDataItem._renderAllViews()
 
 
     def onPointCloud(self, msg, channel):
         pointcloudName = channel.replace('DRAKE_POINTCLOUD_', '', 1)
 
-        polyData = vnp.numpyToPolyData(np.asarray(msg.points), createVertexCells=True)
+        points = np.asarray(msg.points, dtype=np.float32)
 
         # If the user provided color channels, then use them to colorize
         # the pointcloud.
+        pointData = {}
         channels = {msg.channel_names[i]: msg.channels[i] for i in range(msg.n_channels)}
         if "r" in channels and "g" in channels and "b" in channels:
             colorized = True
             colorArray = np.empty((msg.n_points, 3), dtype=np.uint8)
             for (colorIndex, color) in enumerate(["r", "g", "b"]):
                 colorArray[:, colorIndex] = 255 * np.asarray(channels[color])
-            vnp.addNumpyToVtk(polyData, colorArray, "rgb")
+            pointData["rgb"] = colorArray
         else:
             colorized = False
 
         folder = self.getPointCloudFolder()
 
-        # If there was an existing point cloud by this name, then just
-        # set its polyData to the new point cloud.
+        # If there was an existing point cloud by this name, then update
+        # its polyData in place, reusing the existing buffers when the
+        # number of points is unchanged.
         # This has the effect of preserving all the user-specified properties
         # like point size, coloration mode, alpha, etc.
         previousPointcloud = folder.findChild(pointcloudName)
         if previousPointcloud is not None:
-            previousPointcloud.setPolyData(polyData)
-            previousPointcloud._updateColorByProperty()
+            polyData = previousPointcloud.polyData
+            removedColors = not colorized and polyData.GetPointData().GetArray("rgb") is not None
+            if removedColors:
+                polyData.GetPointData().RemoveArray("rgb")
+            if vnp.updatePolyDataFromNumpy(polyData, points, pointData) and not removedColors:
+                previousPointcloud._renderAllViews()
+            else:
+                previousPointcloud.setPolyData(polyData)
         else:
+            polyData = vtk.vtkPolyData()
+            vnp.updatePolyDataFromNumpy(polyData, points, pointData)
             item = vis.PolyDataItem(pointcloudName, polyData, view=None)
             item.addToView(self.view)
             if colorized:
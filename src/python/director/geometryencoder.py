@@ -1,7 +1,16 @@
 from director import vtkAll as vtk
 from director import vtkNumpy as vnp
+from director import filterUtils
 from director.shallowCopy import shallowCopy
 import numpy as np
+import struct
+import zlib
+
+try:
+    import lz4.frame as lz4frame
+    HAVE_LZ4 = True
+except ImportError:
+    HAVE_LZ4 = False
 
 def encodePolyData(polyData):
     '''Given a vtkPolyData, returns a numpy int8 array that contains
@@ -38,3 +47,215 @@ def decodePolyData(data):
     polyData = vtk.vtkPolyData()
     vtk.vtkCommunicator.UnMarshalDataObject(charArray, polyData)
     return polyData
+
+
+# Compact mesh codec
+#
+# A mesh is serialized as a fixed size header followed by a payload that is
+# optionally compressed:
+#
+#   header: magic 'DDMC', version, flags, quantization bits, number of point
+#           data arrays, number of points, number of triangles, bounds
+#           minimum (3 doubles), quantization step (3 doubles)
+#   payload: vertex positions, quantized to unsigned integers of the given
+#            number of bits (or raw float32 when bits is 0),
+#            byte length of the triangle index stream followed by the
+#            zigzag, delta, varint encoded triangle indices,
+#            then for each point data array: name, dtype, number of
+#            components and the raw little-endian array data.
+#
+# Only triangle meshes can be represented; triangle strips and polygons are
+# triangulated, polyData with vertex or line cells is not supported.
+
+MESH_CODEC_NAME = 'ddmesh'
+MESH_CODEC_MAGIC = 'DDMC'
+MESH_CODEC_VERSION = 1
+
+_MESH_HEADER = struct.Struct('<4sBBBBII3d3d')
+_MESH_FLAG_ZLIB = 1
+_MESH_FLAG_LZ4 = 2
+
+
+def _zigzagEncode(values):
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def _zigzagDecode(values):
+    values = values.astype(np.uint64)
+    return (values >> np.uint64(1)).astype(np.int64) ^ -(values & np.uint64(1)).astype(np.int64)
+
+
+def _varintEncode(values):
+    '''Encode an array of uint64 as LEB128 varints, returns a uint8 array.'''
+    values = np.asarray(values, dtype=np.uint64)
+    numBytes = np.ones(len(values), dtype=np.int64)
+    for i in xrange(1, 10):
+        numBytes += values >= np.uint64(1 << (7*i))
+
+    offsets = np.zeros(len(values), dtype=np.int64)
+    np.cumsum(numBytes[:-1], out=offsets[1:])
+    result = np.empty(numBytes.sum(), dtype=np.uint8)
+
+    for i in xrange(numBytes.max() if len(values) else 0):
+        mask = numBytes > i
+        byte = (values[mask] >> np.uint64(7*i)) & np.uint64(0x7f)
+        byte |= np.where(numBytes[mask] > i+1, np.uint64(0x80), np.uint64(0))
+        result[offsets[mask] + i] = byte
+    return result
+
+
+def _varintDecode(data):
+    '''Decode a uint8 array of LEB128 varints, returns a uint64 array.'''
+    data = np.asarray(data, dtype=np.uint8)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.zeros(len(ends), dtype=np.int64)
+    starts[1:] = ends[:-1] + 1
+    numBytes = ends - starts + 1
+
+    values = np.zeros(len(ends), dtype=np.uint64)
+    for i in xrange(numBytes.max() if len(ends) else 0):
+        mask = numBytes > i
+        byte = (data[starts[mask] + i] & 0x7f).astype(np.uint64)
+        values[mask] |= byte << np.uint64(7*i)
+    return values
+
+
+def _compress(payload, compression):
+    if compression is None:
+        return payload, 0
+    elif compression == 'zlib':
+        return zlib.compress(payload), _MESH_FLAG_ZLIB
+    elif compression == 'lz4':
+        if not HAVE_LZ4:
+            raise ValueError('lz4 compression requires the lz4 module')
+        return lz4frame.compress(payload), _MESH_FLAG_LZ4
+    raise ValueError('Unknown compression: %r' % compression)
+
+
+def _decompress(payload, flags):
+    if flags & _MESH_FLAG_ZLIB:
+        return zlib.decompress(payload)
+    elif flags & _MESH_FLAG_LZ4:
+        if not HAVE_LZ4:
+            raise ValueError('lz4 compressed mesh requires the lz4 module')
+        return lz4frame.decompress(payload)
+    return payload
+
+
+def canEncodeMesh(polyData):
+    return not polyData.GetNumberOfVerts() and not polyData.GetNumberOfLines()
+
+
+def encodeMesh(polyData, quantizationBits=16, compression='zlib'):
+    '''Given a vtkPolyData triangle mesh, returns a numpy uint8 array with a
+    compact serialization of the mesh that can be passed to decodeMesh.
+    Vertex positions are quantized to the given number of bits per
+    coordinate, or stored as float32 if quantizationBits is 0.  The
+    compression argument is one of 'zlib', 'lz4' or None.'''
+
+    if not canEncodeMesh(polyData):
+        raise ValueError('encodeMesh only supports triangle meshes')
+    assert 0 <= quantizationBits <= 32
+
+    if polyData.GetNumberOfStrips() or polyData.GetPolys().GetMaxCellSize() != 3:
+        polyData = filterUtils.triangulatePolyData(polyData)
+
+    numPoints = polyData.GetNumberOfPoints()
+    points = vnp.getNumpyFromVtk(polyData, 'Points') if numPoints else np.zeros((0, 3))
+    polys = vnp.numpy_support.vtk_to_numpy(polyData.GetPolys().GetData())
+    triangles = polys.reshape(-1, 4)[:,1:]
+
+    boundsMin = points.min(axis=0) if numPoints else np.zeros(3)
+    boundsMax = points.max(axis=0) if numPoints else np.zeros(3)
+
+    chunks = []
+    if quantizationBits:
+        step = (boundsMax - boundsMin) / float((1 << quantizationBits) - 1)
+        step[step == 0] = 1.0
+        dtype = '<u2' if quantizationBits <= 16 else '<u4'
+        quantized = np.rint((points - boundsMin) / step).astype(dtype)
+        chunks.append(quantized.tobytes())
+    else:
+        step = np.ones(3)
+        chunks.append(points.astype('<f4').tobytes())
+
+    indices = _varintEncode(_zigzagEncode(np.diff(np.concatenate([[0], triangles.ravel()]))))
+    chunks.append(struct.pack('<I', len(indices)))
+    chunks.append(indices.tobytes())
+
+    pointData = polyData.GetPointData()
+    numArrays = 0
+    for i in xrange(pointData.GetNumberOfArrays()):
+        vtkArray = pointData.GetArray(i)
+        if not vtkArray or not vtkArray.GetName():
+            continue
+        array = vnp.numpy_support.vtk_to_numpy(vtkArray)
+        name = vtkArray.GetName()
+        dtype = array.dtype.newbyteorder('<').str
+        numComponents = vtkArray.GetNumberOfComponents()
+        chunks.append(struct.pack('<H', len(name)) + name)
+        chunks.append(struct.pack('<4sB', dtype, numComponents))
+        chunks.append(np.ascontiguousarray(array, dtype=dtype).tobytes())
+        numArrays += 1
+
+    payload, flags = _compress(''.join(chunks), compression)
+    header = _MESH_HEADER.pack(MESH_CODEC_MAGIC, MESH_CODEC_VERSION, flags,
+                               quantizationBits, numArrays, numPoints,
+                               len(triangles), *np.concatenate([boundsMin, step]))
+    return np.frombuffer(header + payload, dtype=np.uint8)
+
+
+def decodeMesh(data):
+    '''Given a numpy uint8 array produced by encodeMesh, constructs and
+    returns a new vtkPolyData.'''
+
+    data = np.asarray(data, dtype=np.uint8).tobytes()
+    header = _MESH_HEADER.unpack_from(data)
+    magic, version, flags, quantizationBits, numArrays, numPoints, numTriangles = header[:7]
+    boundsMin = np.array(header[7:10])
+    step = np.array(header[10:13])
+
+    if magic != MESH_CODEC_MAGIC:
+        raise ValueError('Data is not an encoded mesh')
+    if version != MESH_CODEC_VERSION:
+        raise ValueError('Unsupported mesh codec version: %d' % version)
+
+    payload = _decompress(data[_MESH_HEADER.size:], flags)
+
+    def read(dtype, count, offset):
+        array = np.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+        return array, offset + array.nbytes
+
+    if quantizationBits:
+        dtype = '<u2' if quantizationBits <= 16 else '<u4'
+        quantized, offset = read(dtype, 3*numPoints, 0)
+        points = quantized.reshape(-1, 3) * step + boundsMin
+    else:
+        points, offset = read('<f4', 3*numPoints, 0)
+        points = points.reshape(-1, 3)
+
+    numIndexBytes, offset = struct.unpack_from('<I', payload, offset)[0], offset + 4
+    indices, offset = read(np.uint8, numIndexBytes, offset)
+    triangles = np.cumsum(_zigzagDecode(_varintDecode(indices)))
+    assert len(triangles) == 3*numTriangles
+
+    polyData = vtk.vtkPolyData()
+    polyData.SetPoints(vnp.getVtkPointsFromNumpy(np.ascontiguousarray(points)))
+
+    cells = np.empty((numTriangles, 4), dtype=vnp.numpy_support.ID_TYPE_CODE)
+    cells[:,0] = 3
+    cells[:,1:] = triangles.reshape(-1, 3)
+    cellArray = vtk.vtkCellArray()
+    cellArray.SetCells(numTriangles, vnp.getVtkIdTypeArrayFromNumpy(cells.ravel()))
+    polyData.SetPolys(cellArray)
+
+    for i in xrange(numArrays):
+        nameLength, offset = struct.unpack_from('<H', payload, offset)[0], offset + 2
+        name, offset = payload[offset:offset+nameLength], offset + nameLength
+        (dtype, numComponents), offset = struct.unpack_from('<4sB', payload, offset), offset + 5
+        array, offset = read(dtype.rstrip('\0'), numPoints*numComponents, offset)
+        array = array.reshape(numPoints, numComponents) if numComponents > 1 else array
+        vnp.addNumpyToVtk(polyData, array.copy(), name)
+
+    return polyData
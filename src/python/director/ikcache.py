@@ -0,0 +1,209 @@
+import os
+import json
+import atexit
+import hashlib
+import weakref
+from collections import OrderedDict
+import numpy as np
+
+from director import ikconstraintencoder
+from director.timercallback import TimerCallback
+
+
+CACHE_VERSION = 1
+
+# caches with a file that are flushed at exit, see IkSolutionCache.close
+_openCaches = weakref.WeakSet()
+
+
+def _flushOpenCaches():
+    for cache in list(_openCaches):
+        cache.flush()
+
+
+atexit.register(_flushOpenCaches)
+
+
+def _canonicalize(obj, resolution):
+    '''
+    Returns a copy of a json compatible object with floats quantized to
+    integer multiples of resolution and dicts converted to sorted lists of
+    key, value pairs, so that equal inputs have an equal json encoding.
+    '''
+    if isinstance(obj, float):
+        if not np.isfinite(obj):
+            return repr(obj)
+        return int(round(obj / resolution))
+    elif isinstance(obj, dict):
+        return [[key, _canonicalize(obj[key], resolution)] for key in sorted(obj)]
+    elif isinstance(obj, (list, tuple)):
+        return [_canonicalize(value, resolution) for value in obj]
+    return obj
+
+
+def _hash(obj):
+    return hashlib.sha1(json.dumps(obj, separators=(',', ':'))).hexdigest()
+
+
+class IkSolutionCache(object):
+    '''
+    A cache of ik solutions keyed by a fingerprint of the ik request fields
+    returned by PlannerPublisher.setupFields.  The fingerprint is computed
+    from the encoded constraints, ik options, position costs and the seed,
+    nominal and constraint-referenced poses, with floats quantized.
+
+    Two fingerprints are computed for a request.  The exact key quantizes
+    poses to poseResolution and constraint values to constraintResolution,
+    a cache hit on this key returns the cached solution.  The near miss key
+    uses the coarser nearMiss resolutions, a hit on this key returns a
+    cached solution to use as a warm-start seed for a new solve.
+
+    The cache holds at most maxSize solutions and evicts the least recently
+    used.  If filename is given the cache is loaded from that json file.
+    Changes are saved saveDelay seconds after the first change since the
+    last save, and at exit.  With saveDelay None they are only saved by
+    flush() and at exit.
+    '''
+
+    def __init__(self, maxSize=256, filename=None, poseResolution=1e-3, constraintResolution=1e-5,
+                 nearMissPoseResolution=0.05, nearMissConstraintResolution=0.01, saveDelay=5.0):
+
+        self.maxSize = maxSize
+        self.filename = filename
+        self.saveDelay = saveDelay
+        self.saveTimer = None
+        self.dirty = False
+        self.poseResolution = poseResolution
+        self.constraintResolution = constraintResolution
+        self.nearMissPoseResolution = nearMissPoseResolution
+        self.nearMissConstraintResolution = nearMissConstraintResolution
+        self.entries = OrderedDict()
+        self.nearMissKeys = {}
+        self.hits = 0
+        self.nearMisses = 0
+        self.misses = 0
+
+        if filename:
+            self.load()
+            _openCaches.add(self)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def getKeys(self, fields):
+        '''
+        Returns the (exact, near miss) keys of the given ik request fields.
+        '''
+        poseNames = set()
+        for c in fields.constraints:
+            for attr in ('postureName', 'poseName'):
+                if hasattr(c, attr):
+                    poseNames.add(getattr(c, attr))
+
+        poses = dict(('pose:' + name, list(fields.poses[name])) for name in poseNames if name in fields.poses)
+        poses['seed'] = list(fields.poses[fields.seedPose])
+        poses['nominal'] = list(fields.poses[fields.nominalPose])
+
+        request = json.loads(ikconstraintencoder.encodeConstraints([fields.constraints, fields.options,
+            list(fields.positionCosts), fields.jointNames, fields.jointLimits, fields.affordances]))
+
+        def makeKey(poseResolution, constraintResolution):
+            return _hash([_canonicalize(request, constraintResolution), _canonicalize(poses, poseResolution)])
+
+        return (makeKey(self.poseResolution, self.constraintResolution),
+                makeKey(self.nearMissPoseResolution, self.nearMissConstraintResolution))
+
+    def lookup(self, keys):
+        '''
+        Given the keys returned by getKeys, returns (endPose, info, isExact)
+        or None if there is no cached solution.
+        '''
+        exactKey, nearMissKey = keys
+
+        entry = self.entries.pop(exactKey, None)
+        if entry is not None:
+            self.entries[exactKey] = entry
+            self.hits += 1
+            return np.array(entry['endPose']), entry['info'], True
+
+        entry = self.entries.get(self.nearMissKeys.get(nearMissKey))
+        if entry is not None:
+            self.nearMisses += 1
+            return np.array(entry['endPose']), entry['info'], False
+
+        self.misses += 1
+        return None
+
+    def add(self, keys, endPose, info):
+        exactKey, nearMissKey = keys
+
+        self.entries.pop(exactKey, None)
+        self.entries[exactKey] = dict(endPose=list(np.asarray(endPose, dtype=float)), info=int(info), nearMissKey=nearMissKey)
+        self.nearMissKeys[nearMissKey] = exactKey
+
+        while len(self.entries) > self.maxSize:
+            evictedKey, evicted = self.entries.popitem(last=False)
+            if self.nearMissKeys.get(evicted['nearMissKey']) == evictedKey:
+                del self.nearMissKeys[evicted['nearMissKey']]
+
+        self._setDirty()
+
+    def clear(self):
+        self.entries.clear()
+        self.nearMissKeys.clear()
+        self._setDirty()
+
+    def _setDirty(self):
+        if not self.filename:
+            return
+        self.dirty = True
+        if self.saveDelay is None:
+            return
+        if self.saveTimer is None:
+            self.saveTimer = TimerCallback(callback=self.flush)
+        if not self.saveTimer.singleShotTimer.isActive():
+            self.saveTimer.singleShot(self.saveDelay)
+
+    def flush(self):
+        '''
+        Save the cache if it has changes that are not saved yet.
+        '''
+        if self.dirty:
+            self.save()
+
+    def close(self):
+        '''
+        Save pending changes, stop the save timer, and stop flushing the
+        cache at exit.
+        '''
+        if self.saveTimer is not None:
+            self.saveTimer.stop()
+        self.flush()
+        _openCaches.discard(self)
+
+    def load(self):
+        try:
+            with open(self.filename) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        if data.get('version') != CACHE_VERSION:
+            return
+
+        self.entries.clear()
+        self.nearMissKeys.clear()
+        for key, entry in data['entries'][-self.maxSize:]:
+            key, entry['nearMissKey'] = str(key), str(entry['nearMissKey'])
+            self.entries[key] = entry
+            self.nearMissKeys[entry['nearMissKey']] = key
+
+    def save(self):
+        data = dict(version=CACHE_VERSION, entries=self.entries.items())
+        tmpFilename = self.filename + '.tmp'
+        try:
+            with open(tmpFilename, 'w') as f:
+                json.dump(data, f)
+            os.rename(tmpFilename, self.filename)
+        except (IOError, OSError):
+            pass
+        self.dirty = False
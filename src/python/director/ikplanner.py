@@ -52,7 +52,7 @@ class ConstraintSet(object):
         self.jointLimitsLower = np.array([ikPlanner.robotModel.model.getJointLimits(jointName)[0] for jointName in robotstate.getDrakePoseJointNames()])
         self.jointLimitsUpper = np.array([ikPlanner.robotModel.model.getJointLimits(jointName)[1] for jointName in robotstate.getDrakePoseJointNames()])
 
-    def runIk(self):
+    def _getIkArgs(self):
         seedPoseName = self.seedPoseName
         if not seedPoseName:
             seedPoseName = getIkOptions().getPropertyEnumValue('Seed pose')
@@ -65,12 +65,15 @@ class ConstraintSet(object):
         if nominalPoseName == 'q_start':
             nominalPoseName = self.startPoseName
 
-        if not self.positionCosts:
-            positionCosts = self.ikPlanner.defaultPositionCosts
+        positionCosts = self.positionCosts or self.ikPlanner.defaultPositionCosts
 
         ikParameters = self.ikPlanner.mergeWithDefaultIkParameters(self.ikParameters)
 
-        self.endPose, self.info = self.ikPlanner.plannerPub.processIK(self.constraints, ikParameters, positionCosts, nominalPoseName=nominalPoseName, seedPoseName=seedPoseName)
+        return dict(ikParameters=ikParameters, positionCosts=positionCosts, nominalPoseName=nominalPoseName, seedPoseName=seedPoseName)
+
+    def _onIkResult(self, endPose, info):
+
+        self.endPose, self.info = endPose, info
 
         if self.ikPlanner.clipFloat32SafeJointLimits:
             self.endPose = self.ikPlanner.clipState(self.endPose, self.jointLimitsLower, self.jointLimitsUpper)
@@ -79,6 +82,70 @@ class ConstraintSet(object):
         print 'info:', self.info
         return self.endPose, self.info
 
+    def runIk(self):
+        '''
+        Solve ik for the constraints.  If the 'IK seeds' option is more than
+        one and the planner publisher supports it, this is a multi-seed
+        solve, see runIkMultiSeed.
+        '''
+        numSeeds = getIkOptions().getProperty('IK seeds')
+        if numSeeds > 1 and hasattr(self.ikPlanner.plannerPub, 'processIKMultiSeed'):
+            return self.runIkMultiSeed(numSeeds)
+
+        endPose, info = self.ikPlanner.plannerPub.processIK(self.constraints, **self._getIkArgs())
+        return self._onIkResult(endPose, info)
+
+    def runIkMultiSeed(self, numSeeds=8, earlyTermination=True):
+        '''
+        Like runIk, but solves from multiple seeds if the planner publisher
+        supports it, see PyDrakePlannerPublisher.processIKMultiSeed.  The
+        per-seed results are stored in self.seedResults.
+        '''
+        plannerPub = self.ikPlanner.plannerPub
+
+        if not hasattr(plannerPub, 'processIKMultiSeed'):
+            self.seedResults = []
+            endPose, info = plannerPub.processIK(self.constraints, **self._getIkArgs())
+            return self._onIkResult(endPose, info)
+
+        endPose, info, self.seedResults = plannerPub.processIKMultiSeed(self.constraints,
+            numSeeds=numSeeds, earlyTermination=earlyTermination, **self._getIkArgs())
+        for result in self.seedResults:
+            print '  seed %-12s %-9s info: %-4s time: %s' % (result['seed'], result['status'], result['info'],
+                '%.3f s' % result['solveTime'] if result['solveTime'] is not None else '-')
+        return self._onIkResult(endPose, info)
+
+    def runIkAsync(self, callback=None):
+        '''
+        Like runIk, but with a planner publisher that supports asynchronous
+        requests (see PyDrakePlannerPublisher.processIKAsync) the solve does
+        not block the main thread.  A new request cancels the pending ones.
+        The callback, if given, is called with (endPose, info) when the
+        solve completes.  The worker pool is enabled with the
+        ikWorkerPoolSize director config option.
+        '''
+        plannerPub = self.ikPlanner.plannerPub
+
+        if not hasattr(plannerPub, 'processIKAsync'):
+            endPose, info = self.runIk()
+            if callback:
+                callback(endPose, info)
+            return None
+
+        def onDone(future):
+            if future.cancelled():
+                return
+            if future.status == 'error':
+                # the worker pool failed, solve on the main thread instead
+                print future.value
+                endPose, info = self.runIk()
+            else:
+                endPose, info = self._onIkResult(*future.result())
+            if callback:
+                callback(endPose, info)
+
+        return plannerPub.processIKAsync(self.constraints, callback=onDone, cancelPending=True, **self._getIkArgs())
+
     def runIkTraj(self):
         assert self.endPose is not None
         endPoseName = self.endPoseName or 'q_end'
@@ -110,7 +177,7 @@ class ConstraintSet(object):
         return self.plan
 
     def onFrameModified(self, frame):
-        self.runIk()
+        self.runIkAsync()
     
     def searchFinalPose(self, side, eeTransform):
         nominalPoseName = self.nominalPoseName
@@ -144,6 +211,7 @@ class IkOptionsItem(om.ObjectModelItem):
         self.addProperty('Max joint degrees/s', ikPlanner.defaultIkParameters.maxDegreesPerSecond, attributes=om.PropertyAttributes(decimals=0, minimum=1, maximum=100.0, singleStep=1.0))
         self.addProperty('Nominal pose', 1, attributes=om.PropertyAttributes(enumNames=['q_start', 'q_nom', 'q_end', 'q_zero']))
         self.addProperty('Seed pose', 0, attributes=om.PropertyAttributes(enumNames=['q_start', 'q_nom', 'q_end', 'q_zero']))
+        self.addProperty('IK seeds', drcargs.getDirectorConfig().get('ikNumSeeds', 1), attributes=om.PropertyAttributes(minimum=1, maximum=32))
         self.addProperty('Major iterations limit', ikPlanner.defaultIkParameters.majorIterationsLimit)
         self.addProperty('Major feasibility tolerance', ikPlanner.defaultIkParameters.majorFeasibilityTolerance, attributes=om.PropertyAttributes(decimals=6, minimum=1e-6, maximum=1.0, singleStep=1e-5))
         self.addProperty('Major optimality tolerance', ikPlanner.defaultIkParameters.majorOptimalityTolerance, attributes=om.PropertyAttributes(decimals=6, minimum=1e-6, maximum=1.0, singleStep=1e-4))
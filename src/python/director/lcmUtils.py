@@ -10,6 +10,12 @@ import tempfile
 import imp
 import sys
 import re
+import time
+import threading
+import collections
+import traceback
+import weakref
+from director.timercallback import TimerCallback
 
 class GlobalLCM(object):
 
@@ -95,46 +101,209 @@ def captureMessageCallback(channel, messageClass, callback):
     return subscriber
 
 
-def addSubscriber(channel, messageClass=None, callback=None, historicalLoader=None, callbackNeedsChannel=False):
+class SubscriberStats(object):
+    '''
+    Message counters of a subscriber, see getSubscriberStats().  The decode
+    counters are kept for subscribers with a messageClass, decodeTime is
+    the total decode time in seconds.
+    '''
+
+    def __init__(self, received=0, dropped=0):
+        self.received = received
+        self.dropped = dropped
+        self.decoded = 0
+        self.decodeErrors = 0
+        self.decodeTime = 0.0
+
+    def getAverageDecodeTime(self):
+        return self.decodeTime / self.decoded if self.decoded else 0.0
+
+    def __repr__(self):
+        return 'received: %d, dropped: %d, decoded: %d, decode errors: %d, average decode time: %.3f ms' % (
+            self.received, self.dropped, self.decoded, self.decodeErrors, self.getAverageDecodeTime()*1e3)
+
+
+class BackgroundDecoder(object):
+    '''
+    Decodes the messages received by a ddLCMSubscriber on a worker thread
+    and passes the decoded messages to a callback on the main thread from a
+    timer.  With latestOnly, a message that is still waiting for the worker
+    is dropped when a newer one arrives.
+    '''
+
+    def __init__(self, callback, decodeFunction, callbackNeedsChannel=False, latestOnly=False):
+
+        self.callback = callback
+        self.decodeFunction = decodeFunction
+        self.callbackNeedsChannel = callbackNeedsChannel
+        self.latestOnly = latestOnly
+        self.stats = SubscriberStats()
+
+        self.inputs = collections.deque()
+        self.results = collections.deque()
+        self.numInFlight = 0
+        self.condition = threading.Condition()
+        self.running = True
+        self.resultTimer = TimerCallback(targetFps=60, callback=self._dispatchResults)
+        self.worker = threading.Thread(target=self._decodeLoop)
+        self.worker.daemon = True
+        self.worker.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.inputs.clear()
+            self.condition.notify()
+        self.resultTimer.stop()
+
+    def onMessageReceived(self, messageData, channel):
+        with self.condition:
+            if self.latestOnly and self.inputs:
+                self.stats.dropped += len(self.inputs)
+                self.numInFlight -= len(self.inputs)
+                self.inputs.clear()
+            self.inputs.append((messageData.data(), channel))
+            self.numInFlight += 1
+            self.condition.notify()
+
+        if not self.resultTimer.isActive():
+            self.resultTimer.start()
+
+    def _decodeLoop(self):
+        while True:
+            with self.condition:
+                while self.running and not self.inputs:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                messageBytes, channel = self.inputs.popleft()
+
+            startTime = time.time()
+            try:
+                msg = self.decodeFunction(messageBytes)
+            except Exception:
+                # any error must produce a result, or the message would
+                # stay in flight and the worker thread would exit
+                print 'error decoding message on channel:', channel
+                traceback.print_exc()
+                msg = None
+            self.results.append((msg, channel, time.time() - startTime))
+
+    def _dispatchResults(self):
+        while self.results:
+            msg, channel, decodeTime = self.results.popleft()
+            self.numInFlight -= 1
+            self.stats.decodeTime += decodeTime
+            if msg is None:
+                self.stats.decodeErrors += 1
+                continue
+            self.stats.decoded += 1
+            if self.callbackNeedsChannel:
+                self.callback(msg, channel=channel)
+            else:
+                self.callback(msg)
+        return self.numInFlight > 0
+
+
+# The background decoders and the decode stats are kept alive by the
+# signal connections of their subscriber, so an entry goes away together
+# with its subscriber.
+_backgroundDecoders = weakref.WeakValueDictionary()
+_subscriberStats = weakref.WeakValueDictionary()
 
+
+def addSubscriber(channel, messageClass=None, callback=None, historicalLoader=None, callbackNeedsChannel=False,
+                  latestOnly=False, maxRate=None, decodeInBackground=False):
+    '''
+    Subscribe to an lcm channel and return the ddLCMSubscriber.  Messages
+    are decoded with messageClass and passed to callback on the main thread.
+    If messageClass is None, the callback receives the raw message data and
+    the channel name.
+
+    latestOnly: with decodeInBackground, drop a message that is still
+        waiting to be decoded when a newer one arrives.  The subscriber
+        itself always delivers only the most recent message when several
+        arrive while the main thread is busy.
+    maxRate: deliver at most maxRate messages per second, messages that
+        arrive sooner are dropped.
+    decodeInBackground: decode messages on a worker thread, the callback is
+        still called on the main thread.
+
+    Message counters are available from getSubscriberStats().
+    '''
     lcmThread = getGlobalLCMThread()
     subscriber = PythonQt.dd.ddLCMSubscriber(channel, lcmThread)
 
+    def decodeMessage(messageData):
+        try:
+            return messageClass.decode(messageData)
+        except ValueError:
+            if historicalLoader is None:
+                raise
+            return historicalLoader.decode(messageClass.__module__.split('.')[-1], messageData)
+
+    stats = SubscriberStats()
+
     def handleMessage(messageData, channel):
-        loadSuccessful = False
+        startTime = time.time()
         try:
-            msg = messageClass.decode(messageData.data())
-            loadSuccessful = True
+            msg = decodeMessage(messageData.data())
         except ValueError:
-            if historicalLoader is not None:
-                # try:
-                    msg = historicalLoader.decode(messageClass.__module__.split('.')[-1], messageData.data())
-                    loadSuccessful = True
-                # except ValueError:
-                #     pass
-        if loadSuccessful:
-            if callbackNeedsChannel:
-                callback(msg, channel=channel)
-            else:
-                callback(msg)
-        else:
+            stats.decodeTime += time.time() - startTime
+            stats.decodeErrors += 1
             print 'error decoding message on channel:', channel
-
-    if callback is not None:
-        if messageClass is not None:
-            subscriber.connect('messageReceived(const QByteArray&, const QString&)', handleMessage)
+            return
+        stats.decodeTime += time.time() - startTime
+        stats.decoded += 1
+        if callbackNeedsChannel:
+            callback(msg, channel=channel)
         else:
-            subscriber.connect('messageReceived(const QByteArray&, const QString&)', callback)
-    else:
+            callback(msg)
+
+    if maxRate:
+        subscriber.setSpeedLimit(maxRate)
+
+    if callback is None:
         subscriber.setCallbackEnabled(False)
+    elif messageClass is None:
+        subscriber.connect('messageReceived(const QByteArray&, const QString&)', callback)
+    elif decodeInBackground:
+        decoder = BackgroundDecoder(callback, decodeMessage, callbackNeedsChannel, latestOnly)
+        subscriber.connect('messageReceived(const QByteArray&, const QString&)', decoder.onMessageReceived)
+        subscriber.connect('destroyed()', decoder.stop)
+        _backgroundDecoders[subscriber] = decoder
+        _subscriberStats[subscriber] = decoder.stats
+    else:
+        subscriber.connect('messageReceived(const QByteArray&, const QString&)', handleMessage)
+        _subscriberStats[subscriber] = stats
 
     lcmThread.addSubscriber(subscriber)
     return subscriber
 
 
+def getSubscriberStats(subscriber):
+    '''
+    Returns the SubscriberStats of a subscriber.  The received and dropped
+    counts come from the subscriber, the decode counters are filled in for
+    subscribers created with a messageClass and a callback.
+    '''
+    stats = SubscriberStats(subscriber.getReceivedCount(), subscriber.getDroppedCount())
+    decodeStats = _subscriberStats.get(subscriber)
+    if decodeStats:
+        stats.dropped += decodeStats.dropped
+        stats.decoded = decodeStats.decoded
+        stats.decodeErrors = decodeStats.decodeErrors
+        stats.decodeTime = decodeStats.decodeTime
+    return stats
+
+
 def removeSubscriber(subscriber):
     lcmThread = getGlobalLCMThread()
     lcmThread.removeSubscriber(subscriber)
+    _subscriberStats.pop(subscriber, None)
+    decoder = _backgroundDecoders.pop(subscriber, None)
+    if decoder:
+        decoder.stop()
     if subscriber.parent() == lcmThread:
         subscriber.setParent(None)
 
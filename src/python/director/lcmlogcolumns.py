@@ -0,0 +1,244 @@
+import os
+import re
+import json
+import numpy as np
+
+from director import lcmlogindex
+from director import lcmspy
+
+
+COLUMNS_VERSION = 1
+
+_fieldPathCache = {}
+
+
+def parseFieldPath(fieldPath):
+    '''
+    Parse a field path such as 'pose.translation.x' or 'joint_position[3]'
+    into a list of attribute names and integer indices.
+    '''
+    parsed = _fieldPathCache.get(fieldPath)
+    if parsed is None:
+        if not re.match(r'^\w+(\.\w+|\[\d+\])*$', fieldPath):
+            raise ValueError('invalid field path: %r' % fieldPath)
+        parsed = [int(index) if index else name for name, index in re.findall(r'(\w+)|\[(\d+)\]', fieldPath)]
+        _fieldPathCache[fieldPath] = parsed
+    return parsed
+
+
+def getFieldValue(msg, fieldPath):
+    '''
+    Returns the value of the field path of a decoded message, see
+    parseFieldPath.
+    '''
+    value = msg
+    for key in parseFieldPath(fieldPath):
+        value = value[key] if isinstance(key, int) else getattr(value, key)
+    return value
+
+
+class LcmLogColumns(object):
+    '''
+    Columnar extraction of message fields from an lcm log.
+
+    fields is a list of (channel, fieldPath) pairs, see getFieldValue.
+    The log is streamed once in file order using the lcmlogindex index,
+    and only the events on the requested channels are read and decoded.
+    Each field becomes a typed numpy column with one row per event, and
+    the event timestamps of each channel are stored as an int64 column.
+
+    Columns are written in chunks to npy files in cacheDir (default
+    <log>.ddcolumns) and are memory mapped when loaded, so later analyses
+    of the same log do not parse it again.  If the log has grown, only
+    the appended events are extracted and stored as a new chunk.
+    '''
+
+    def __init__(self, filename, fields, cacheDir=None, decodeFunction=None, chunkSize=4096):
+        self.filename = filename
+        self.fields = [(str(channel), str(fieldPath)) for channel, fieldPath in fields]
+        self.cacheDir = cacheDir or filename + '.ddcolumns'
+        self.metaFilename = os.path.join(self.cacheDir, 'columns.json')
+        self.decodeFunction = decodeFunction or lcmspy.decodeMessage
+        self.chunkSize = chunkSize
+        self.meta = None
+        self.columns = {}
+
+    @property
+    def channels(self):
+        return sorted(set(channel for channel, fieldPath in self.fields))
+
+    @staticmethod
+    def getColumnName(channel, fieldPath):
+        return '%s.%s' % (channel, fieldPath)
+
+    @staticmethod
+    def getTimestampColumnName(channel):
+        return '%s@timestamp' % channel
+
+    def _newMeta(self):
+        return dict(version=COLUMNS_VERSION, fields=self.fields, numEvents=0, lastUtime=None, chunks=[])
+
+    def _loadMeta(self):
+        try:
+            with open(self.metaFilename) as f:
+                meta = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if meta.get('version') != COLUMNS_VERSION or [tuple(f) for f in meta['fields']] != self.fields:
+            return None
+        return meta
+
+    def _saveMeta(self):
+        tmpFilename = self.metaFilename + '.tmp'
+        with open(tmpFilename, 'w') as f:
+            json.dump(self.meta, f)
+        os.rename(tmpFilename, self.metaFilename)
+
+    def _isConsistentWithIndex(self, index):
+        numEvents = self.meta['numEvents']
+        return not numEvents or (len(index) >= numEvents and index.utimes[numEvents-1] == self.meta['lastUtime'])
+
+    def update(self, progressFunction=None):
+        '''
+        Extract the columns of any events that were not extracted yet.
+        progressFunction, if given, is called with (eventsDone, eventsTotal)
+        while extracting.  Returns the number of new events extracted.
+        '''
+        index = lcmlogindex.LcmLogIndex(self.filename)
+        index.update()
+
+        if self.meta is None:
+            self.meta = self._loadMeta()
+        if self.meta is None or not self._isConsistentWithIndex(index):
+            self.meta = self._newMeta()
+            self.columns = {}
+
+        startEvent = self.meta['numEvents']
+        if startEvent == len(index):
+            return 0
+
+        channelIds = dict((channel, i) for i, channel in enumerate(index.channels) if channel in self.channels)
+        events = np.asarray(index.events[startEvent:])
+        eventIndices = np.flatnonzero(index.getChannelMask(channelIds.values())[startEvent:]) if channelIds else []
+
+        if not os.path.isdir(self.cacheDir):
+            os.makedirs(self.cacheDir)
+
+        chunk = self._extractChunk(events, eventIndices, channelIds, progressFunction)
+
+        self.meta['chunks'].append(chunk)
+        self.meta['numEvents'] = len(index)
+        self.meta['lastUtime'] = int(index.utimes[-1])
+        self._saveMeta()
+        self.columns = {}
+        return len(eventIndices)
+
+    def _extractChunk(self, events, eventIndices, channelIds, progressFunction):
+
+        chunkId = len(self.meta['chunks'])
+        fieldsByChannel = {}
+        for channel, fieldPath in self.fields:
+            fieldsByChannel.setdefault(channel, []).append(fieldPath)
+
+        numRows = dict((channel, int(np.sum(events['channel'] == channelId))) for channel, channelId in channelIds.iteritems())
+        rows = dict((channel, 0) for channel in channelIds)
+        writers = {}
+        files = {}
+
+        def getWriter(name, value, channel):
+            writer = writers.get(name)
+            if writer is None:
+                value = np.asarray(value)
+                if value.dtype.kind not in 'biuf':
+                    raise ValueError('column %s is not numeric: %r' % (name, value.dtype))
+                filename = 'chunk%d_column%d.npy' % (chunkId, len(files))
+                files[name] = filename
+                writer = writers[name] = _ColumnWriter(os.path.join(self.cacheDir, filename), value.dtype,
+                                                       (numRows[channel],) + value.shape, self.chunkSize)
+            return writer
+
+        channelNames = dict((channelId, channel) for channel, channelId in channelIds.iteritems())
+
+        with open(self.filename, 'rb') as f:
+            for i, eventIndex in enumerate(eventIndices):
+
+                if progressFunction and i % self.chunkSize == 0:
+                    progressFunction(i, len(eventIndices))
+
+                event = events[eventIndex]
+                channel = channelNames[event['channel']]
+                utime, _, data = lcmlogindex.readEventAt(f, int(event['offset']))
+                msg = self.decodeFunction(data)
+
+                row = rows[channel]
+                rows[channel] += 1
+                getWriter(self.getTimestampColumnName(channel), utime, channel).write(row, utime)
+                for fieldPath in fieldsByChannel[channel]:
+                    name = self.getColumnName(channel, fieldPath)
+                    value = getFieldValue(msg, fieldPath)
+                    getWriter(name, value, channel).write(row, value)
+
+        for writer in writers.values():
+            writer.close()
+
+        return dict(files=files, numRows=numRows)
+
+    def getColumn(self, channel, fieldPath=None):
+        '''
+        Returns the column of a field, or the timestamps column of the
+        channel if fieldPath is None.  Call update first.  Returns an empty
+        array if there are no events on the channel.
+        '''
+        if fieldPath is None:
+            name = self.getTimestampColumnName(channel)
+        elif (channel, fieldPath) in self.fields:
+            name = self.getColumnName(channel, fieldPath)
+        else:
+            raise KeyError('%s is not an extracted field' % self.getColumnName(channel, fieldPath))
+
+        column = self.columns.get(name)
+        if column is None:
+            chunks = [np.load(os.path.join(self.cacheDir, chunk['files'][name]), mmap_mode='r')
+                      for chunk in self.meta['chunks'] if name in chunk['files']]
+            if not chunks:
+                column = np.zeros(0)
+            elif len(chunks) == 1:
+                column = chunks[0]
+            else:
+                column = np.concatenate(chunks)
+            self.columns[name] = column
+        return column
+
+    def getTimestamps(self, channel):
+        return self.getColumn(channel)
+
+
+class _ColumnWriter(object):
+    '''
+    Writes the rows of a column to an npy file in chunks of chunkSize rows.
+    '''
+
+    def __init__(self, filename, dtype, shape, chunkSize):
+        self.array = np.lib.format.open_memmap(filename, mode='w+', dtype=dtype, shape=shape)
+        self.buffer = np.zeros((chunkSize,) + shape[1:], dtype=dtype)
+        self.bufferStart = 0
+        self.bufferCount = 0
+
+    def write(self, row, value):
+        if self.bufferCount == len(self.buffer):
+            self.flush()
+            self.bufferStart = row
+        try:
+            self.buffer[self.bufferCount] = value
+        except ValueError:
+            raise ValueError('row %d has shape %r, expected %r' % (row, np.shape(value), self.buffer.shape[1:]))
+        self.bufferCount += 1
+
+    def flush(self):
+        self.array[self.bufferStart:self.bufferStart + self.bufferCount] = self.buffer[:self.bufferCount]
+        self.bufferCount = 0
+
+    def close(self):
+        self.flush()
+        self.array.flush()
+        del self.array
@@ -0,0 +1,251 @@
+import os
+import re
+import json
+import mmap
+import struct
+import numpy as np
+
+
+EVENT_SYNC_WORD = 0xEDA1DA01
+EVENT_HEADER = struct.Struct('>IqqII')
+
+INDEX_VERSION = 1
+INDEX_DTYPE = np.dtype([('offset', '<i8'), ('utime', '<i8'), ('channel', '<i4'), ('size', '<i4')])
+
+
+def scanEvents(filename, startOffset=0, channelIds=None, progressFunction=None, endOffset=None):
+    '''
+    Scan the event headers of an lcm log file starting at the given byte
+    offset.  Only the headers are parsed, message payloads are skipped.
+
+    channelIds is a dict of channel name --> integer id that is updated in
+    place with any new channels.  progressFunction, if given, is called
+    periodically with (bytesScanned, bytesTotal, utime) and may return False
+    to stop the scan.  Scanning stops at endOffset (default end
+    of file) or at the first incomplete event, so a log that is still being
+    written can be scanned again later from the returned end offset.
+
+    Returns an array of INDEX_DTYPE and the byte offset after the last
+    complete event.
+    '''
+    if channelIds is None:
+        channelIds = {}
+
+    headerSize = EVENT_HEADER.size
+    syncBytes = struct.pack('>I', EVENT_SYNC_WORD)
+    unpack = EVENT_HEADER.unpack_from
+
+    offsets = []
+    utimes = []
+    channels = []
+    sizes = []
+
+    with open(filename, 'rb') as f:
+        fileSize = os.fstat(f.fileno()).st_size
+        if endOffset is None or endOffset > fileSize:
+            endOffset = fileSize
+        if endOffset - startOffset < headerSize:
+            return np.zeros(0, dtype=INDEX_DTYPE), startOffset
+
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            pos = startOffset
+            nextProgress = pos
+            while pos + headerSize <= endOffset:
+
+                sync, eventNumber, utime, channelLength, dataLength = unpack(mm, pos)
+                if sync != EVENT_SYNC_WORD:
+                    # resync, or stop at the corrupt bytes so that a later
+                    # scan resumes from here when more data was written
+                    syncPos = mm.find(syncBytes, pos + 1, endOffset)
+                    if syncPos < 0:
+                        break
+                    pos = syncPos
+                    continue
+
+                channelStart = pos + headerSize
+                eventEnd = channelStart + channelLength + dataLength
+                if eventEnd > endOffset:
+                    break
+
+                channel = mm[channelStart:channelStart + channelLength]
+                channelId = channelIds.get(channel)
+                if channelId is None:
+                    channelId = channelIds[channel] = len(channelIds)
+
+                offsets.append(pos)
+                utimes.append(utime)
+                channels.append(channelId)
+                sizes.append(dataLength)
+                pos = eventEnd
+
+                if progressFunction and pos >= nextProgress:
+                    nextProgress = pos + (1 << 24)
+                    if not progressFunction(pos, endOffset, utime):
+                        break
+        finally:
+            mm.close()
+
+    events = np.zeros(len(offsets), dtype=INDEX_DTYPE)
+    events['offset'] = offsets
+    events['utime'] = utimes
+    events['channel'] = channels
+    events['size'] = sizes
+    return events, pos
+
+
+def readEventAt(f, offset):
+    '''
+    Read the event at the given byte offset of an open log file.
+    Returns (utime, channel, data).
+    '''
+    f.seek(offset)
+    header = f.read(EVENT_HEADER.size)
+    sync, eventNumber, utime, channelLength, dataLength = EVENT_HEADER.unpack(header)
+    assert sync == EVENT_SYNC_WORD
+    channel = f.read(channelLength)
+    data = f.read(dataLength)
+    return utime, channel, data
+
+
+class LcmLogIndex(object):
+    '''
+    A persistent index of the events in an lcm log file.
+
+    The index stores the byte offset, utime, channel id and payload size of
+    every event.  It is saved next to the log as <log>.ddindex.npy with a
+    small <log>.ddindex.json sidecar that stores the channel names.  The
+    npy file is memory mapped when the index is loaded.  If the log has
+    grown since it was indexed, only the appended events are scanned.
+    '''
+
+    def __init__(self, filename, indexFilename=None):
+        self.filename = filename
+        self.indexFilename = indexFilename or filename + '.ddindex.npy'
+        self.metaFilename = os.path.splitext(self.indexFilename)[0] + '.json'
+        self.events = np.zeros(0, dtype=INDEX_DTYPE)
+        self.channels = []
+        self.endOffset = 0
+        self.persistent = True
+
+    @property
+    def offsets(self):
+        return self.events['offset']
+
+    @property
+    def utimes(self):
+        return self.events['utime']
+
+    @property
+    def channelIds(self):
+        return self.events['channel']
+
+    def __len__(self):
+        return len(self.events)
+
+    def _loadIndex(self):
+        try:
+            with open(self.metaFilename) as f:
+                meta = json.load(f)
+            if meta['version'] != INDEX_VERSION:
+                return False
+            events = np.load(self.indexFilename, mmap_mode='r')
+        except (IOError, OSError, ValueError, KeyError):
+            return False
+
+        if events.dtype != INDEX_DTYPE or len(events) != meta['numEvents']:
+            return False
+
+        self.events = events
+        self.channels = [str(c) for c in meta['channels']]
+        self.endOffset = meta['endOffset']
+        return True
+
+    def _saveIndex(self):
+        meta = dict(version=INDEX_VERSION, numEvents=len(self.events),
+                    endOffset=self.endOffset, channels=self.channels)
+        try:
+            tmpFilename = self.indexFilename + '.tmp'
+            with open(tmpFilename, 'wb') as f:
+                np.save(f, np.asarray(self.events))
+            os.rename(tmpFilename, self.indexFilename)
+            with open(self.metaFilename + '.tmp', 'w') as f:
+                json.dump(meta, f)
+            os.rename(self.metaFilename + '.tmp', self.metaFilename)
+        except (IOError, OSError):
+            # the log directory may not be writable, keep the index in memory
+            self.persistent = False
+            return
+        self.events = np.load(self.indexFilename, mmap_mode='r')
+
+    def _isConsistentWithLog(self, logSize):
+        if logSize < self.endOffset:
+            return False
+        if not len(self.events):
+            return True
+        # check that the last indexed event is still where we expect it
+        with open(self.filename, 'rb') as f:
+            utime, channel, data = readEventAt(f, int(self.events['offset'][-1]))
+        return utime == self.events['utime'][-1] and channel == self.channels[self.events['channel'][-1]]
+
+    def update(self, progressFunction=None):
+        '''
+        Load the index from disk if possible, then scan any events that were
+        appended to the log since it was indexed.  Returns the number of new
+        events.  See scanEvents for the progressFunction arguments.
+        '''
+        logSize = os.path.getsize(self.filename)
+
+        if not len(self.events) and self.persistent:
+            if not self._loadIndex():
+                self.events = np.zeros(0, dtype=INDEX_DTYPE)
+                self.channels = []
+                self.endOffset = 0
+
+        try:
+            consistent = self._isConsistentWithLog(logSize)
+        except (AssertionError, struct.error, IndexError):
+            consistent = False
+
+        if not consistent:
+            self.events = np.zeros(0, dtype=INDEX_DTYPE)
+            self.channels = []
+            self.endOffset = 0
+
+        if logSize - self.endOffset < EVENT_HEADER.size:
+            return 0
+
+        channelIds = dict((c, i) for i, c in enumerate(self.channels))
+        newEvents, self.endOffset = scanEvents(self.filename, self.endOffset, channelIds, progressFunction)
+        if not len(newEvents):
+            return 0
+
+        self.channels = sorted(channelIds, key=channelIds.get)
+        self.events = np.concatenate([self.events, newEvents])
+        if self.persistent:
+            self._saveIndex()
+        return len(newEvents)
+
+    def getChannelId(self, channel):
+        return self.channels.index(channel)
+
+    def getChannelIdsMatching(self, pattern):
+        '''
+        Returns the ids of the channels that fully match the given regex.
+        '''
+        regex = re.compile('(?:%s)$' % pattern)
+        return [i for i, c in enumerate(self.channels) if regex.match(c)]
+
+    def getChannelMask(self, channelIds):
+        '''
+        Returns a boolean event mask for the events on the given channel ids.
+        '''
+        lookup = np.zeros(len(self.channels), dtype=bool)
+        lookup[list(channelIds)] = True
+        return lookup[self.events['channel']]
+
+    def findEventIndex(self, utime):
+        '''
+        Returns the index of the first event with utime >= the given utime.
+        '''
+        return int(self.events['utime'].searchsorted(utime))
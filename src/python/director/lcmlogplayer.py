@@ -1,8 +1,10 @@
 from director import lcmUtils
+from director import lcmlogindex
 from director.timercallback import TimerCallback
 from director.qtutils import BlockSignals
 
 import lcm
+import re
 import numpy as np
 from PythonQt import QtCore, QtGui
 
@@ -14,11 +16,85 @@ class LcmLogPlayer(object):
             lcmHandle = lcmUtils.getGlobalLCM()
         self.lcmHandle = lcmHandle
         self.log = None
+        self.index = None
         self.filePositions = []
         self.playbackFactor = 1.0
         self.timer = TimerCallback()
         self.timestamps = np.array([])
         self.timestampOffset = 0.0
+        self.logFile = None
+        self.includeChannels = None
+        self.excludeChannels = []
+        self.channelMaxRates = {}
+        self._updateChannelTable()
+
+    def setChannelFilter(self, include=None, exclude=None):
+        '''
+        Set lists of channel regex patterns for playback.  A channel is
+        published if it matches one of the include patterns (all channels if
+        include is None) and none of the exclude patterns.
+        '''
+        self.includeChannels = include
+        self.excludeChannels = exclude or []
+        self._updateChannelTable()
+
+    def setChannelMaxRate(self, pattern, maxRate):
+        '''
+        Decimate channels matching the regex pattern to at most maxRate
+        messages per second of log time.  Use maxRate=None to remove the limit.
+        '''
+        if maxRate is None:
+            self.channelMaxRates.pop(pattern, None)
+        else:
+            self.channelMaxRates[pattern] = maxRate
+        self._updateChannelTable()
+
+    def _getChannelSettings(self, channel):
+        '''
+        Returns (enabled, minPeriod) for the channel, with minPeriod in utime.
+        '''
+        match = lambda pattern: re.match('(?:%s)$' % pattern, channel)
+        enabled = ((self.includeChannels is None or any(match(p) for p in self.includeChannels))
+                   and not any(match(p) for p in self.excludeChannels))
+        minPeriod = 0.0
+        for pattern, maxRate in self.channelMaxRates.iteritems():
+            if match(pattern):
+                minPeriod = max(minPeriod, 1e6 / maxRate)
+        return enabled, minPeriod
+
+    def _updateChannelTable(self):
+        '''
+        Rebuild the per-channel playback table.  With a log index the table
+        is a set of arrays indexed by channel id, so the publish decision for
+        an event is made from its index entry without reading the event.
+        '''
+        self.channelSettings = {}
+        channels = self.index.channels if self.index is not None else []
+        settings = [self._getChannelSettings(channel) for channel in channels]
+        self.channelEnabled = np.array([enabled for enabled, _ in settings], dtype=bool)
+        self.channelMinPeriod = np.array([minPeriod for _, minPeriod in settings])
+        self._resetChannelRates()
+
+    def _resetChannelRates(self):
+        self.channelLastPublish = np.empty(len(self.channelMinPeriod))
+        self.channelLastPublish.fill(-np.inf)
+        self.channelLastPublishByName = {}
+
+    def _shouldPublish(self, channel, utime):
+        '''
+        Publish decision for playback without a log index.
+        '''
+        settings = self.channelSettings.get(channel)
+        if settings is None:
+            settings = self.channelSettings[channel] = self._getChannelSettings(channel)
+        enabled, minPeriod = settings
+        if not enabled:
+            return False
+        if minPeriod:
+            if utime - self.channelLastPublishByName.get(channel, -np.inf) < minPeriod:
+                return False
+            self.channelLastPublishByName[channel] = utime
+        return True
 
     def findEventIndex(self, timestampRequest):
         requestIndex = self.timestamps.searchsorted(timestampRequest)
@@ -28,8 +104,10 @@ class LcmLogPlayer(object):
 
     def resetPlayPosition(self, playTime):
         self.nextEventIndex = self.findEventIndex(playTime*1e6)
-        filepos = self.filePositions[self.nextEventIndex]
-        self.log.seek(filepos)
+        self._resetChannelRates()
+        if self.index is None:
+            filepos = self.filePositions[self.nextEventIndex]
+            self.log.seek(filepos)
 
     def advanceTime(self, playLength, onFrame=None):
 
@@ -40,6 +118,10 @@ class LcmLogPlayer(object):
         startTimestamp = self.timestamps[self.nextEventIndex]
         endTimestamp = startTimestamp + playLength*1e6
 
+        if self.index is not None:
+            self._advanceIndexed(endTimestamp, onFrame)
+            return
+
         good = True
 
         while good:
@@ -47,17 +129,65 @@ class LcmLogPlayer(object):
             event = self.log.read_next_event()
             self.nextEventIndex += 1
 
-            self.lcmHandle.publish(event.channel, event.data)
+            if self._shouldPublish(event.channel, event.timestamp):
+                self.lcmHandle.publish(event.channel, event.data)
 
             good = (self.nextEventIndex < numEvents
                     and self.timestamps[self.nextEventIndex] <= endTimestamp)
             if onFrame and good:
                 onFrame(self.timestamps[self.nextEventIndex] / 1.e6)
 
+    def _advanceIndexed(self, endTimestamp, onFrame=None):
+
+        start = self.nextEventIndex
+        end = max(start + 1, int(self.timestamps.searchsorted(endTimestamp, side='right')))
+        channelIds = self.index.channelIds[start:end]
+        utimes = self.index.utimes
+
+        for i in np.flatnonzero(self.channelEnabled[channelIds]) + start:
+            channelId = channelIds[i - start]
+            minPeriod = self.channelMinPeriod[channelId]
+            if minPeriod:
+                if utimes[i] - self.channelLastPublish[channelId] < minPeriod:
+                    continue
+                self.channelLastPublish[channelId] = utimes[i]
+
+            self._publishEventAt(i)
+            if onFrame and i + 1 < end:
+                onFrame(self.timestamps[i + 1] / 1.e6)
+
+        self.nextEventIndex = end
+
+    def _publishEventAt(self, eventIndex):
+        utime, channel, data = lcmlogindex.readEventAt(self.logFile, int(self.index.offsets[eventIndex]))
+        self.lcmHandle.publish(channel, data)
+
     def skipToTime(self, timeRequest, playLength=0.0):
         self.resetPlayPosition(timeRequest)
         self.advanceTime(playLength)
 
+    def skipToState(self, timeRequest):
+        '''
+        Fast-forward to timeRequest, publishing only the most recent message
+        before that time on each channel enabled for playback.  Requires the
+        log index, see readLog.
+        '''
+        if self.index is None:
+            raise ValueError('skipToState requires a log read with an index')
+
+        self.resetPlayPosition(timeRequest)
+        # unlike the play position, the target is not clamped to the last
+        # event, so a time past the end includes the last event
+        target = int(self.timestamps.searchsorted(timeRequest*1e6))
+
+        reversedChannelIds = self.index.channelIds[:target][::-1]
+        channelIds, reversedIndices = np.unique(reversedChannelIds, return_index=True)
+        lastIndices = target - 1 - reversedIndices
+        lastIndices = np.sort(lastIndices[self.channelEnabled[channelIds]])
+
+        for i in lastIndices:
+            self._publishEventAt(i)
+
     def getEndTime(self):
         assert len(self.timestamps)
         return self.timestamps[-1]*1e-6
@@ -90,8 +220,21 @@ class LcmLogPlayer(object):
         self.timer.start()
 
     def readLog(self, filename, eventTimeFunction=None, progressFunction=None):
+        '''
+        Open a log file for playback.  Unless a custom eventTimeFunction is
+        given, event timestamps and file positions are read from a persistent
+        index (see lcmlogindex.LcmLogIndex) which is built on the first open
+        and extended if the log has grown.
+        '''
+        if eventTimeFunction is None:
+            self.readLogIndex(filename, progressFunction)
+            return
+
         log = lcm.EventLog(filename, 'r')
         self.log = log
+        self.index = None
+        self._closeLogFile()
+        self._updateChannelTable()
 
         timestamps = []
         filePositions = []
@@ -136,6 +279,34 @@ class LcmLogPlayer(object):
         self.timestamps = np.array(timestamps)
         self.timestampOffset = timestampOffset
 
+    def _closeLogFile(self):
+        if self.logFile is not None:
+            self.logFile.close()
+            self.logFile = None
+
+    def readLogIndex(self, filename, progressFunction=None):
+
+        index = lcmlogindex.LcmLogIndex(filename)
+
+        if progressFunction:
+            startUtime = []
+            def onProgress(bytesScanned, bytesTotal, utime):
+                if not startUtime:
+                    startUtime.append(utime)
+                return progressFunction((utime - startUtime[0])*1e-6)
+            index.update(onProgress)
+        else:
+            index.update()
+
+        self.index = index
+        self.log = None
+        self._closeLogFile()
+        self.logFile = open(filename, 'rb')
+        self.filePositions = index.offsets
+        self.timestampOffset = index.utimes[0] if len(index) else 0
+        self.timestamps = index.utimes - self.timestampOffset
+        self._updateChannelTable()
+
 
 class LcmLogPlayerGui(object):
 
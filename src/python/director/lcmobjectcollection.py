@@ -57,6 +57,13 @@ class LCMObjectCollection(object):
     def getDescriptionId(self, desc):
         return desc['uuid']
 
+    def getDescriptionHash(self, desc):
+        '''
+        Descriptions may provide a content hash under the 'hash' key.  An
+        update with the same id and hash as the stored description is a no-op.
+        '''
+        return desc.get('hash')
+
     def prettyPrintCollection(self):
         print json.dumps(json.loads(numpyjsoncoder.encode(self.collection)), indent=2)
 
@@ -64,7 +71,13 @@ class LCMObjectCollection(object):
         return self.collection[descriptionId]
 
     def updateDescription(self, desc, publish=True, notify=True):
-        self.collection[self.getDescriptionId(desc)] = desc
+        descriptionId = self.getDescriptionId(desc)
+        contentHash = self.getDescriptionHash(desc)
+        previousDesc = self.collection.get(descriptionId)
+        if contentHash is not None and previousDesc is not None and self.getDescriptionHash(previousDesc) == contentHash:
+            return
+
+        self.collection[descriptionId] = desc
         self._modified()
         if publish and USE_LCM:
             msg = self._newCommandMessage('update', description=desc)
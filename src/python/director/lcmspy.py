@@ -4,7 +4,13 @@ import glob
 import lcm
 import time
 import math
+import mmap
+import json
 import random
+import multiprocessing
+import numpy as np
+
+from director import lcmlogindex
 
 
 messageTypes = {}
@@ -159,19 +165,263 @@ def printLCMCatalog():
         printMessageFields(lcmCatalog[channel], indent='  ')
 
 
-def printLogFileDescription(filename):
+# Log file cataloguing
+#
+# A log is summarized without decoding every message.  The file is split
+# into byte ranges that are scanned in parallel worker processes.  Workers
+# read only event headers and the 8 byte fingerprint at the start of each
+# message, which identifies the message type via getMessageClass.  Only a
+# few sample events per channel are decoded, by the caller.  The summary is
+# cached next to the log as <log>.ddcatalog.json and reused while the file
+# size and mtime are unchanged.
+
+CATALOG_VERSION = 1
+MAX_CHANNEL_LENGTH = 255
+
+
+def _findEventStart(mm, pos, fileSize):
+    '''
+    Returns the offset of the first event at or after pos, or fileSize if
+    there is none.  A sync word is accepted if its header is plausible and
+    the event is followed by another sync word or the end of the file, so
+    the sync pattern occurring inside message data is not mistaken for the
+    start of an event.
+    '''
+    syncBytes = lcmlogindex.EVENT_HEADER.pack(lcmlogindex.EVENT_SYNC_WORD, 0, 0, 0, 0)[:4]
+    headerSize = lcmlogindex.EVENT_HEADER.size
+
+    while True:
+        pos = mm.find(syncBytes, pos, fileSize)
+        if pos < 0 or pos + headerSize > fileSize:
+            return fileSize
+
+        sync, eventNumber, utime, channelLength, dataLength = lcmlogindex.EVENT_HEADER.unpack_from(mm, pos)
+        eventEnd = pos + headerSize + channelLength + dataLength
+        if 0 < channelLength <= MAX_CHANNEL_LENGTH and (eventEnd == fileSize
+                or mm[eventEnd:eventEnd + 4] == syncBytes):
+            return pos
+        pos += 1
+
+
+def _catalogByteRange(args):
+    '''
+    Worker function, summarizes the events that start in the byte range
+    [startOffset, endOffset) of the log.  Returns a dict of channel -->
+    summary dict.
+    '''
+    filename, startOffset, endOffset, numSamples, binSeconds, gapSeconds = args
+
+    headerSize = lcmlogindex.EVENT_HEADER.size
+    unpack = lcmlogindex.EVENT_HEADER.unpack_from
+    channels = {}
+
+    with open(filename, 'rb') as f:
+        fileSize = os.fstat(f.fileno()).st_size
+        if not fileSize:
+            return {}
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            pos = _findEventStart(mm, startOffset, fileSize)
+            while pos < endOffset and pos + headerSize <= fileSize:
+
+                sync, eventNumber, utime, channelLength, dataLength = unpack(mm, pos)
+                if sync != lcmlogindex.EVENT_SYNC_WORD:
+                    pos = _findEventStart(mm, pos + 1, fileSize)
+                    continue
+
+                dataStart = pos + headerSize + channelLength
+                eventEnd = dataStart + dataLength
+                if eventEnd > fileSize:
+                    break
+
+                channel = mm[pos + headerSize:dataStart]
+                info = channels.get(channel)
+                if info is None:
+                    info = channels[channel] = dict(utimes=[], bytes=0, fingerprints={}, sampleOffsets=[])
+
+                info['utimes'].append(utime)
+                info['bytes'] += dataLength
+                fingerprint = mm[dataStart:dataStart + min(dataLength, 8)]
+                info['fingerprints'][fingerprint] = info['fingerprints'].get(fingerprint, 0) + 1
+                if len(info['sampleOffsets']) < numSamples:
+                    info['sampleOffsets'].append(pos)
+
+                pos = eventEnd
+        finally:
+            mm.close()
+
+    binSize = int(binSeconds*1e6)
+    gapSize = gapSeconds*1e6
+    results = {}
+
+    for channel, info in channels.iteritems():
+        utimes = np.array(info.pop('utimes'), dtype=np.int64)
+        bins, binCounts = np.unique(utimes // binSize, return_counts=True)
+        gapIndices = np.flatnonzero(np.diff(utimes) > gapSize)
+        info.update(count=len(utimes), firstUtime=int(utimes[0]), lastUtime=int(utimes[-1]),
+                    bins=dict(zip(bins.tolist(), binCounts.tolist())),
+                    gaps=[[int(utimes[i]), int(utimes[i+1] - utimes[i])] for i in gapIndices])
+        results[channel] = info
+
+    return results
+
+
+def _mergeByteRangeSummaries(rangeSummaries, numSamples, gapSeconds):
+    '''
+    Merge the worker results, which must be given in file order.
+    '''
+    channels = {}
+    for rangeSummary in rangeSummaries:
+        for channel, info in rangeSummary.iteritems():
+            merged = channels.get(channel)
+            if merged is None:
+                channels[channel] = info
+                continue
+
+            if info['firstUtime'] - merged['lastUtime'] > gapSeconds*1e6:
+                merged['gaps'].append([merged['lastUtime'], info['firstUtime'] - merged['lastUtime']])
+            merged['gaps'].extend(info['gaps'])
+            merged['lastUtime'] = info['lastUtime']
+            merged['count'] += info['count']
+            merged['bytes'] += info['bytes']
+            merged['sampleOffsets'] = (merged['sampleOffsets'] + info['sampleOffsets'])[:numSamples]
+            for key, counts in (('fingerprints', info['fingerprints']), ('bins', info['bins'])):
+                for value, count in counts.iteritems():
+                    merged[key][value] = merged[key].get(value, 0) + count
+    return channels
+
+
+def catalogLogFile(filename, numWorkers=None, numSamples=1, binSeconds=1.0, gapSeconds=1.0,
+                   chunkSize=None, useCache=True, progressFunction=None):
+    '''
+    Returns a summary dict of the given lcm log file.  The summary contains
+    the log size, number of events, first and last utime, and a dict of
+    per-channel summaries with keys:
+
+        count, bytes, firstUtime, lastUtime, rate: number of messages,
+            payload bytes, utime range and average rate in Hz
+        fingerprints: dict of hex message fingerprint --> count, see
+            getChannelMessageTypes
+        rateHistogram: message counts in bins of binSeconds starting at
+            the first utime of the log
+        gaps: list of [utime, duration] for gaps longer than gapSeconds,
+            duration in microseconds
+        sampleOffsets: byte offsets of the first numSamples events
+
+    The log is split into byte ranges of chunkSize bytes which are
+    summarized in numWorkers processes (default one per cpu).
+    progressFunction, if given, is called with (bytesScanned, bytesTotal).
+    '''
+    stat = os.stat(filename)
+    settings = dict(version=CATALOG_VERSION, size=stat.st_size, mtime=stat.st_mtime,
+                    numSamples=numSamples, binSeconds=binSeconds, gapSeconds=gapSeconds)
+    cacheFilename = filename + '.ddcatalog.json'
+
+    if useCache:
+        try:
+            with open(cacheFilename) as f:
+                catalog = json.load(f)
+            if all(catalog.get(key) == value for key, value in settings.iteritems()):
+                catalog['channels'] = dict((str(channel), info) for channel, info in catalog['channels'].iteritems())
+                return catalog
+        except (IOError, OSError, ValueError):
+            pass
+
+    numWorkers = numWorkers or multiprocessing.cpu_count()
+    chunkSize = chunkSize or max(stat.st_size // (numWorkers*4) + 1, 64 * 1024**2)
+    ranges = [(offset, offset + chunkSize) for offset in xrange(0, stat.st_size, chunkSize)]
+    tasks = [(filename, start, end, numSamples, binSeconds, gapSeconds) for start, end in ranges]
+
+    pool = multiprocessing.Pool(numWorkers) if numWorkers > 1 and len(tasks) > 1 else None
+    rangeSummaries = []
+    try:
+        results = pool.imap(_catalogByteRange, tasks) if pool else (_catalogByteRange(task) for task in tasks)
+        for (start, end), result in zip(ranges, results):
+            rangeSummaries.append(result)
+            if progressFunction:
+                progressFunction(min(end, stat.st_size), stat.st_size)
+    finally:
+        if pool:
+            pool.terminate()
+
+    channels = _mergeByteRangeSummaries(rangeSummaries, numSamples, gapSeconds)
+
+    startUtime = min([info['firstUtime'] for info in channels.itervalues()] or [0])
+    endUtime = max([info['lastUtime'] for info in channels.itervalues()] or [0])
+    binSize = int(binSeconds*1e6)
+    firstBin = startUtime // binSize
+    numBins = endUtime // binSize - firstBin + 1
+
+    for info in channels.itervalues():
+        histogram = np.zeros(numBins, dtype=int)
+        for binIndex, count in info.pop('bins').iteritems():
+            histogram[binIndex - firstBin] = count
+        duration = (info['lastUtime'] - info['firstUtime'])*1e-6
+        info['rate'] = (info['count'] - 1) / duration if duration > 0 else 0.0
+        info['rateHistogram'] = histogram.tolist()
+        info['fingerprints'] = dict((fingerprint.encode('hex'), count) for fingerprint, count in info['fingerprints'].iteritems())
+
+    catalog = dict(settings, numEvents=sum(info['count'] for info in channels.itervalues()),
+                   startUtime=startUtime, endUtime=endUtime, channels=channels)
+
+    if useCache:
+        try:
+            with open(cacheFilename, 'w') as f:
+                json.dump(catalog, f)
+        except (IOError, OSError):
+            pass
+
+    return catalog
+
+
+def getChannelMessageTypes(channelSummary):
+    '''
+    Returns a list of (message type full name, count) for a channel summary
+    returned by catalogLogFile, most frequent first.  Unknown fingerprints
+    are reported as None.
+    '''
+    messageTypes = []
+    for fingerprint, count in channelSummary['fingerprints'].iteritems():
+        msgType = getMessageClass(fingerprint.decode('hex'))
+        messageTypes.append((getMessageTypeFullName(msgType) if msgType else None, count))
+    return sorted(messageTypes, key=lambda x: -x[1])
+
+
+def readSampleMessages(filename, channelSummary):
+    '''
+    Returns the raw message bytes of the sample events of a channel summary.
+    '''
+    with open(filename, 'rb') as f:
+        return [lcmlogindex.readEventAt(f, offset)[2] for offset in channelSummary['sampleOffsets']]
+
+
+def printLogCatalog(catalog):
+
+    print '%-40s %-50s %10s %10s %10s %6s' % ('channel', 'type', 'count', 'MB', 'rate (Hz)', 'gaps')
+    for channel in sorted(catalog['channels']):
+        info = catalog['channels'][channel]
+        messageTypes = getChannelMessageTypes(info)
+        typeName = messageTypes[0][0] or '<unknown msg type>'
+        if len(messageTypes) > 1:
+            typeName += ' (+%d types)' % (len(messageTypes) - 1)
+        print '%-40s %-50s %10d %10.2f %10.2f %6d' % (channel, typeName, info['count'],
+                info['bytes']/(1024.0**2), info['rate'], len(info['gaps']))
+
 
-    log = lcm.EventLog(filename, 'r')
+def printLogFileDescription(filename):
 
     print 'reading %s' % filename
-    print 'log file size: %.2f MB' % (log.size()/(1024.0**2))
+    print 'log file size: %.2f MB' % (os.path.getsize(filename)/(1024.0**2))
 
-    for event in log:
-        onLCMMessage(event.channel, event.data)
+    catalog = catalogLogFile(filename)
 
-    log.close()
+    for channel in sorted(catalog['channels']):
+        for messageBytes in readSampleMessages(filename, catalog['channels'][channel]):
+            onLCMMessage(channel, messageBytes, checkExistingChannel=True)
 
     printLCMCatalog()
+    print
+    printLogCatalog(catalog)
 
 
 def spyLCMTraffic():
@@ -2,6 +2,7 @@ from director import lcmobjectcollection
 from director import geometryencoder
 from director import ioUtils
 from director.uuidutil import newUUID
+import hashlib
 import os
 
 
@@ -9,16 +10,31 @@ class MeshManager(object):
 
     def __init__(self):
         self.meshes = {}
+        self.meshHashes = {}
+        self.meshCodec = geometryencoder.MESH_CODEC_NAME
+        self.meshQuantizationBits = 16
+        self.meshCompression = 'zlib'
         self.cacheDirectory = '/tmp'
         self.cacheDataType = 'stl'
         self.collection = lcmobjectcollection.LCMObjectCollection(channel='MESH_COLLECTION_COMMAND')
         self.collection.connectDescriptionUpdated(self._onDescriptionUpdated)
 
     def add(self, polyData, publish=True):
-        meshId = newUUID()
-        self.meshes[meshId] = polyData
+        '''
+        Add a mesh and return its id.  If an identical mesh has already been
+        added, the existing id is returned and the mesh is not published again.
+        '''
+        desc = self._encodeMesh(polyData)
+        meshId = self.meshHashes.get(desc['hash'])
+
+        if meshId is None:
+            meshId = newUUID()
+            self.meshes[meshId] = polyData
+            self.meshHashes[desc['hash']] = meshId
+
         if publish and self.collection:
-            self._publishMesh(meshId)
+            desc['uuid'] = meshId
+            self.collection.updateDescription(desc, notify=False)
         return meshId
 
     def get(self, meshId):
@@ -32,14 +48,29 @@ class MeshManager(object):
             return filename
         return None
 
+    def _encodeMesh(self, polyData):
+        if self.meshCodec == geometryencoder.MESH_CODEC_NAME and geometryencoder.canEncodeMesh(polyData):
+            data = geometryencoder.encodeMesh(polyData, self.meshQuantizationBits, self.meshCompression)
+            codec = geometryencoder.MESH_CODEC_NAME
+        else:
+            data = geometryencoder.encodePolyData(polyData)
+            codec = None
+        return dict(data=data, codec=codec, hash=hashlib.sha1(data).hexdigest())
+
     def _publishMesh(self, meshId):
-        polyData = self.meshes[meshId]
-        self.collection.updateDescription(dict(uuid=meshId, data=geometryencoder.encodePolyData(polyData)), notify=False)
+        desc = self._encodeMesh(self.meshes[meshId])
+        desc['uuid'] = meshId
+        self.collection.updateDescription(desc, notify=False)
 
     def _onDescriptionUpdated(self, collection, descriptionId):
         desc = collection.getDescription(descriptionId)
         meshId = desc['uuid']
         if meshId not in self.meshes:
-            polyData = geometryencoder.decodePolyData(desc['data'])
+            if desc.get('codec') == geometryencoder.MESH_CODEC_NAME:
+                polyData = geometryencoder.decodeMesh(desc['data'])
+            else:
+                polyData = geometryencoder.decodePolyData(desc['data'])
             self.meshes[meshId] = polyData
+            if desc.get('hash'):
+                self.meshHashes.setdefault(desc['hash'], meshId)
             #print 'decoded polydata with %d points' % polyData.GetNumberOfPoints()
@@ -1,9 +1,11 @@
 import os
 import re
+import contextlib
 import PythonQt
 from PythonQt import QtCore, QtGui
 from director.propertyset import PropertySet, PropertyAttributes, PropertyPanelHelper, PropertyPanelConnector
 from director import callbacks
+from collections import OrderedDict
 
 class Icons(object):
 
@@ -181,7 +183,14 @@ class ObjectModelTree(object):
         self._treeWidget = None
         self._propertiesPanel = None
         self._objects = {}
+        self._items = {}
+        self._parents = {}
+        self._children = {None: OrderedDict()}
+        self._objectsByName = {}
+        self._objectNames = {}
         self._blockSignals = False
+        self._batchDepth = 0
+        self._batchState = None
         self._propertyConnector = None
         self.actions = []
         self.callbacks = callbacks.CallbackRegistry([
@@ -198,21 +207,17 @@ class ObjectModelTree(object):
         return self._propertiesPanel
 
     def getObjectParent(self, obj):
-        item = self._getItemForObject(obj)
-        if item.parent():
-            return self._getObjectForItem(item.parent())
+        return self._parents[obj]
 
     def getObjectChildren(self, obj):
-        item = self._getItemForObject(obj)
-        return [self._getObjectForItem(item.child(i)) for i in xrange(item.childCount())]
+        return self._children[obj].keys()
 
     def getTopLevelObjects(self):
-        return [self._getObjectForItem(self._treeWidget.topLevelItem(i))
-                  for i in xrange(self._treeWidget.topLevelItemCount)]
+        return self._children[None].keys()
 
     def getActiveObject(self):
         item = self._getSelectedItem()
-        return self._objects[item] if item is not None else None
+        return self._objects.get(item) if item is not None else None
 
     def setActiveObject(self, obj):
         item = self._getItemForObject(obj)
@@ -234,23 +239,58 @@ class ObjectModelTree(object):
         return items[0] if len(items) == 1 else None
 
     def _getItemForObject(self, obj):
-        for item, itemObj in self._objects.iteritems():
-            if itemObj == obj:
-                return item
+        return self._items.get(obj) if obj is not None else None
 
     def _getObjectForItem(self, item):
         return self._objects[item]
 
+    def _addToIndex(self, obj, item, parentObj):
+        '''
+        The tree keeps indexes of object to item, object to parent, parent
+        to children in tree order, and name to objects in the order they
+        were added.
+        '''
+        name = obj.getProperty('Name')
+        self._objects[item] = obj
+        self._items[obj] = item
+        self._parents[obj] = parentObj
+        self._children[parentObj][obj] = None
+        self._children[obj] = OrderedDict()
+        self._objectNames[obj] = name
+        self._objectsByName.setdefault(name, OrderedDict())[obj] = None
+
+    def _removeFromIndex(self, obj):
+        item = self._items.pop(obj)
+        del self._objects[item]
+        del self._children[self._parents.pop(obj)][obj]
+        del self._children[obj]
+        self._removeFromNameIndex(obj, self._objectNames.pop(obj))
+
+    def _removeFromNameIndex(self, obj, name):
+        objects = self._objectsByName[name]
+        del objects[obj]
+        if not objects:
+            del self._objectsByName[name]
+
+    def _updateNameIndex(self, obj):
+        name = obj.getProperty('Name')
+        oldName = self._objectNames.get(obj)
+        if oldName is None or oldName == name:
+            return
+        self._removeFromNameIndex(obj, oldName)
+        self._objectNames[obj] = name
+        self._objectsByName.setdefault(name, OrderedDict())[obj] = None
+
     def findObjectByName(self, name, parent=None):
         if parent:
             return self.findChildByName(parent, name)
-        for obj in self._objects.values():
-            if obj.getProperty('Name') == name:
-                return obj
+        objects = self._objectsByName.get(name)
+        if objects:
+            return next(iter(objects))
 
     def findChildByName(self, parent, name):
-        for child in self.getObjectChildren(parent):
-            if child.getProperty('Name') == name:
+        for child in self._children.get(parent, ()):
+            if self._objectNames[child] == name:
                 return child
 
     def _onTreeSelectionChanged(self):
@@ -290,6 +330,7 @@ class ObjectModelTree(object):
         if propertyName == 'Visible':
             self.updateVisIcon(obj)
         elif propertyName == 'Name':
+            self._updateNameIndex(obj)
             self.updateObjectName(obj)
         elif propertyName == 'Icon':
             self.updateObjectIcon(obj)
@@ -304,50 +345,66 @@ class ObjectModelTree(object):
         self.callbacks.process(self.OBJECT_CLICKED, self, obj)
 
     def _removeItemFromObjectModel(self, item):
-        while item.childCount():
-            self._removeItemFromObjectModel(item.child(0))
-
         try:
             obj = self._getObjectForItem(item)
         except KeyError:
             return
+        self._removeObjectFromObjectModel(obj)
+
+    def _removeObjectFromObjectModel(self, obj):
+        children = self._children[obj]
+        while children:
+            self._removeObjectFromObjectModel(next(iter(children)))
+
+        item = self._items[obj]
 
         obj.callbacks.process(obj.REMOVED_FROM_OBJECT_MODEL, self, obj)
         obj.onRemoveFromObjectModel()
         obj._tree = None
 
-        if item.parent():
-            item.parent().removeChild(item)
+        parentItem = self._getItemForObject(self._parents[obj])
+        if self._batchDepth:
+            self._removeBatchItem(obj, parentItem, item)
+        elif parentItem is not None:
+            parentItem.removeChild(item)
         else:
             tree = self.getTreeWidget()
             tree.takeTopLevelItem(tree.indexOfTopLevelItem(item))
 
-        del self._objects[item]
+        self._removeFromIndex(obj)
 
 
     def removeFromObjectModel(self, obj):
         if obj is None:
             return
 
-        item = self._getItemForObject(obj)
-        if item:
-            self._removeItemFromObjectModel(item)
+        if obj in self._items:
+            self._removeObjectFromObjectModel(obj)
 
 
     def addToObjectModel(self, obj, parentObj=None):
         assert obj._tree is None
 
         parentItem = self._getItemForObject(parentObj)
+        if parentItem is None:
+            parentObj = None
         objName = obj.getProperty('Name')
 
-        item = QtGui.QTreeWidgetItem(parentItem, [objName])
+        if self._batchDepth:
+            item = QtGui.QTreeWidgetItem([objName])
+        else:
+            item = QtGui.QTreeWidgetItem(parentItem, [objName])
         item.setIcon(0, Icons.getIcon(obj.getProperty('Icon')))
 
         obj._tree = self
 
-        self._objects[item] = obj
+        self._addToIndex(obj, item, parentObj)
         self.updateVisIcon(obj)
 
+        if self._batchDepth:
+            self._addBatchItem(obj, parentItem, item)
+            return
+
         if parentItem is None:
             tree = self.getTreeWidget()
             tree.addTopLevelItem(item)
@@ -356,15 +413,124 @@ class ObjectModelTree(object):
         self.callbacks.process(self.OBJECT_ADDED, self, obj)
 
 
+    @contextlib.contextmanager
+    def batchUpdate(self):
+        '''
+        A context manager for adding and removing many objects at once:
+
+            with om.batchUpdate():
+                for step in folder.children():
+                    om.removeFromObjectModel(step)
+                ...
+
+        Inside the context the tree widget does not repaint or emit
+        signals.  The objects are added to and removed from the object model
+        immediately, so lookups work as usual, but the tree widget items are
+        queued and inserted and removed in one pass per parent when the
+        context exits.  OBJECT_ADDED is then emitted once for each object
+        that is still in the object model, and SELECTION_CHANGED once if the
+        selection changed.  REMOVED_FROM_OBJECT_MODEL callbacks of the
+        objects are not deferred.  Contexts may be nested, the queued
+        updates are applied when the outermost context exits.
+        '''
+        self._beginBatch()
+        try:
+            yield self
+        finally:
+            self._endBatch()
+
+
+    def _beginBatch(self):
+        self._batchDepth += 1
+        if self._batchDepth > 1:
+            return
+
+        tree = self.getTreeWidget()
+        self._batchState = dict(
+            newItems=OrderedDict(),
+            expandItems=OrderedDict(),
+            removedItems=[],
+            addedObjects=OrderedDict(),
+            selectedItems=tree.selectedItems(),
+            signalsBlocked=tree.blockSignals(True))
+        tree.setUpdatesEnabled(False)
+
+    def _addBatchItem(self, obj, parentItem, item):
+        state = self._batchState
+        state['newItems'].setdefault(parentItem, OrderedDict())[item] = None
+        if parentItem is None:
+            state['expandItems'][item] = True
+        state['addedObjects'][obj] = None
+
+    def _removeBatchItem(self, obj, parentItem, item):
+        state = self._batchState
+        state['addedObjects'].pop(obj, None)
+        state['expandItems'].pop(item, None)
+        state['newItems'].pop(item, None)
+
+        newItems = state['newItems'].get(parentItem)
+        if newItems is not None and item in newItems:
+            del newItems[item]
+        else:
+            state['removedItems'].append((parentItem, item))
+
+    def _endBatch(self):
+        self._batchDepth -= 1
+        if self._batchDepth:
+            return
+
+        state, self._batchState = self._batchState, None
+        tree = self.getTreeWidget()
+
+        # items are removed children first, so in reverse order each parent
+        # item is taken from the tree widget before its descendants are taken
+        # from it
+        removedItems = OrderedDict()
+        for parentItem, item in reversed(state['removedItems']):
+            removedItems.setdefault(parentItem, []).append(item)
+
+        for parentItem, items in removedItems.iteritems():
+            if parentItem is None:
+                for item in items:
+                    tree.takeTopLevelItem(tree.indexOfTopLevelItem(item))
+            elif len(items) == parentItem.childCount():
+                parentItem.takeChildren()
+            else:
+                for item in items:
+                    parentItem.removeChild(item)
+
+        for parentItem, items in state['newItems'].iteritems():
+            if parentItem is None:
+                tree.addTopLevelItems(items.keys())
+            else:
+                parentItem.addChildren(items.keys())
+
+        for item, expanded in state['expandItems'].iteritems():
+            item.setExpanded(expanded)
+
+        tree.blockSignals(state['signalsBlocked'])
+        tree.setUpdatesEnabled(True)
+
+        for obj in state['addedObjects']:
+            self.callbacks.process(self.OBJECT_ADDED, self, obj)
+
+        if tree.selectedItems() != state['selectedItems']:
+            self._onTreeSelectionChanged()
+
+
     def collapse(self, obj):
         item = self._getItemForObject(obj)
-        if item:
+        if item and self._batchDepth:
+            self._batchState['expandItems'][item] = False
+        elif item:
             self.getTreeWidget().collapseItem(item)
 
 
     def expand(self, obj):
         item = self._getItemForObject(obj)
-        if item:
+        if item and self._batchDepth:
+            self._batchState['expandItems'][item] = True
+        elif item:
             self.getTreeWidget().expandItem(item)
 
 
@@ -440,10 +606,11 @@ class ObjectModelTree(object):
 
 
     def removeSelectedItems(self):
-        for item in self.getTreeWidget().selectedItems():
-            obj = self._getObjectForItem(item)
-            if (not obj.hasProperty('Deletable')) or obj.getProperty('Deletable'):
-                self._removeItemFromObjectModel(item)
+        with self.batchUpdate():
+            for item in self.getTreeWidget().selectedItems():
+                obj = self._objects.get(item)
+                if obj is not None and ((not obj.hasProperty('Deletable')) or obj.getProperty('Deletable')):
+                    self._removeObjectFromObjectModel(obj)
 
 
     def _filterEvent(self, obj, event):
@@ -529,6 +696,9 @@ def removeFromObjectModel(obj):
 def addToObjectModel(obj, parentObj=None):
     _t.addToObjectModel(obj, parentObj)
 
+def batchUpdate():
+    return _t.batchUpdate()
+
 def collapse(obj):
     _t.collapse(obj)
 
@@ -29,6 +29,7 @@ class PlannerPublisher(object):
         self.jointNames = list(self.ikPlanner.jointController.jointNames)
         self.jointLimits = {}
         self.poses = {}
+        self.affordanceScene = AffordanceScene(affordanceManager)
 
         for jointName in self.jointNames:
             self.jointLimits[jointName] = list(self.ikPlanner.robotModel.model.getJointLimits(jointName))
@@ -78,44 +79,138 @@ class PlannerPublisher(object):
         self.poses[poseName] = list(pose)
 
     def processAffordances(self):
-        affs = self.affordanceManager.getCollisionAffordances()
-        s='['
-        first=True
-        for aff in affs:
-            des=aff.getDescription()
-            classname=des['classname'];
-            if first:
-                s+='{'
-            else:
-                s+='\n,{'
-            first=False
-            s+='"classname":"'+classname+'"'
-            s+=',"name":"'+des['Name']+'"'
-            s+=',"uuid":"'+des['uuid']+'"'
-            s+=',"pose": {"position":{"__ndarray__":'+repr(des['pose'][0].tolist())+'},"quaternion":{"__ndarray__":'+repr(des['pose'][1].tolist())+'}}'
-            if self.affordanceManager.affordanceUpdater is not None: # attached collision object / frameSync
-                if des['Name'] in self.affordanceManager.affordanceUpdater.attachedAffordances:
-                    s+=',"attachedTo":"'+self.affordanceManager.affordanceUpdater.attachedAffordances[des['Name']]+'"'
-                else: # it's not attached
-                    s+=',"attachedTo":"__world__"' # __world__ means it's a fixed collision object (sometimes called world or map - we use __world__ here)
-            else: # no affordanceUpdater - so no attached collision objects either
-                s+=',"attachedTo":"__world__"'
-            if classname=='MeshAffordanceItem':
-                s+=',"filename":"'+aff.getMeshManager().getFilesystemFilename(des['Filename'])+'"'
-            if classname=='SphereAffordanceItem':
-                s+=',"radius":'+repr(des['Radius'])
-            if classname=='CylinderAffordanceItem' or classname=='CapsuleAffordanceItem':
-                s+=',"radius":'+repr(des['Radius'])
-                s+=',"length":'+repr(des['Length'])
-            if classname=='BoxAffordanceItem':
-                s+=',"dimensions":'+repr(des['Dimensions'])
-            if classname=='CapsuleRingAffordanceItem':
-                s+=',"radius":'+repr(des['Radius'])
-                s+=',"tube_radius":'+repr(des['Tube Radius'])
-                s+=',"segments":'+repr(des['Segments'])
-            s+='}'
-        s=s+']'
-        return s
+        return self.affordanceScene.getSerialized()
+
+    def getAffordanceSceneDelta(self, sinceVersion):
+        '''
+        Returns the changes to the collision affordance scene since the
+        given version, see AffordanceScene.getDelta.
+        '''
+        self.affordanceScene.update()
+        return self.affordanceScene.getDelta(sinceVersion)
+
+
+class AffordanceScene(object):
+    '''
+    A cached, versioned snapshot of the collision affordances that are sent
+    to planners.  Affordances are re-encoded only after a change
+    notification from the AffordanceObjectModelManager or a change of
+    attachment in its affordanceUpdater, so an unchanged scene costs
+    nothing per planning request.  The version is incremented when the
+    serialized scene changes.
+    '''
+
+    def __init__(self, affordanceManager):
+        self.affordanceManager = affordanceManager
+        self.version = 0
+        self.entries = OrderedDict()
+        self.entryVersions = {}
+        self.removedVersions = {}
+        self.attachments = {}
+        self.serialized = '[]'
+        self.needsUpdate = True
+        self.dirtyIds = set()
+        affordanceManager.connectAffordanceChanged(self._onAffordanceChanged)
+
+    def _onAffordanceChanged(self, affordanceId):
+        self.needsUpdate = True
+        self.dirtyIds.add(affordanceId)
+
+    def invalidate(self):
+        '''
+        Force all affordances to be re-encoded at the next update.
+        '''
+        self.needsUpdate = True
+        self.dirtyIds.update(self.entries.keys())
+
+    def _getAttachments(self):
+        updater = self.affordanceManager.affordanceUpdater
+        return dict(updater.attachedAffordances) if updater is not None else {}
+
+    def _encodeAffordance(self, aff, attachments):
+        des = aff.getDescription()
+        classname = des['classname']
+
+        entry = OrderedDict()
+        entry['classname'] = classname
+        entry['name'] = des['Name']
+        entry['uuid'] = des['uuid']
+        entry['pose'] = OrderedDict([('position', {'__ndarray__': des['pose'][0].tolist()}),
+                                     ('quaternion', {'__ndarray__': des['pose'][1].tolist()})])
+
+        # __world__ means it's a fixed collision object (sometimes called world or map)
+        entry['attachedTo'] = attachments.get(des['Name'], '__world__')
+
+        if classname == 'MeshAffordanceItem':
+            entry['filename'] = aff.getMeshManager().getFilesystemFilename(des['Filename'])
+        if classname in ('SphereAffordanceItem', 'CylinderAffordanceItem', 'CapsuleAffordanceItem'):
+            entry['radius'] = des['Radius']
+        if classname in ('CylinderAffordanceItem', 'CapsuleAffordanceItem'):
+            entry['length'] = des['Length']
+        if classname == 'BoxAffordanceItem':
+            entry['dimensions'] = list(des['Dimensions'])
+        if classname == 'CapsuleRingAffordanceItem':
+            entry['radius'] = des['Radius']
+            entry['tube_radius'] = des['Tube Radius']
+            entry['segments'] = des['Segments']
+
+        return json.dumps(entry, cls=ikconstraintencoder.ConstraintEncoder)
+
+    def update(self):
+        '''
+        Re-encode the affordances that changed since the last update.
+        '''
+        attachments = self._getAttachments()
+        if not self.needsUpdate and attachments == self.attachments:
+            return
+
+        attachmentChanges = set(name for name in set(attachments) | set(self.attachments)
+                                if attachments.get(name) != self.attachments.get(name))
+
+        entries = OrderedDict()
+        changedIds = []
+        for aff in self.affordanceManager.getCollisionAffordances():
+            affordanceId = self.affordanceManager.getAffordanceId(aff)
+            entry = self.entries.get(affordanceId)
+            if entry is None or affordanceId in self.dirtyIds or aff.getProperty('Name') in attachmentChanges:
+                entry = self._encodeAffordance(aff, attachments)
+                if entry != self.entries.get(affordanceId):
+                    changedIds.append(affordanceId)
+            entries[affordanceId] = entry
+
+        removedIds = [affordanceId for affordanceId in self.entries if affordanceId not in entries]
+
+        if changedIds or removedIds or entries.keys() != self.entries.keys():
+            self.version += 1
+            for affordanceId in changedIds:
+                self.entryVersions[affordanceId] = self.version
+                self.removedVersions.pop(affordanceId, None)
+            for affordanceId in removedIds:
+                del self.entryVersions[affordanceId]
+                self.removedVersions[affordanceId] = self.version
+            self.entries = entries
+            self.serialized = '[' + '\n,'.join(entries.values()) + ']'
+
+        self.attachments = attachments
+        self.dirtyIds.clear()
+        self.needsUpdate = False
+
+    def getSerialized(self):
+        '''
+        Returns the scene as a json list of affordance descriptions.
+        '''
+        self.update()
+        return self.serialized
+
+    def getDelta(self, sinceVersion):
+        '''
+        Returns a dict with the current version, the json encoded
+        affordances that were added or modified after sinceVersion, and the
+        uuids of the affordances removed after sinceVersion.
+        '''
+        return dict(version=self.version,
+                    updated=[self.entries[affordanceId] for affordanceId, version in self.entryVersions.iteritems() if version > sinceVersion],
+                    removed=[affordanceId for affordanceId, version in self.removedVersions.iteritems() if version > sinceVersion])
 
 
 class DummyPlannerPublisher(PlannerPublisher):
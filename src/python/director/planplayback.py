@@ -12,7 +12,9 @@ from director.utime import getUtime
 from director import robotstate
 
 import pickle
+import hashlib
 import scipy.interpolate
+from collections import OrderedDict
 
 
 def asRobotPlan(msg):
@@ -31,6 +33,113 @@ def asRobotPlan(msg):
     return msg
 
 
+def quaternionsToRollPitchYaw(quats):
+    '''
+    Vectorized transformUtils.quaternionToRollPitchYaw for an (N x 4) array
+    of w, x, y, z quaternions.  Returns an (N x 3) array.
+    '''
+    quats = np.asarray(quats, dtype=float)
+    norms = np.sum(quats**2, axis=1)
+    valid = norms >= np.finfo(float).eps * 4.0
+    q = np.zeros_like(quats)
+    q[valid] = quats[valid] * np.sqrt(2.0 / norms[valid])[:,np.newaxis]
+    w, x, y, z = q.T
+
+    m00 = 1.0 - y*y - z*z
+    m10 = x*y + z*w
+    m20 = x*z - y*w
+    m21 = y*z + x*w
+    m22 = 1.0 - x*x - y*y
+    m11 = 1.0 - x*x - z*z
+    m12 = y*z - x*w
+
+    cy = np.sqrt(m00*m00 + m10*m10)
+    gimbal = cy <= np.finfo(float).eps * 4.0
+    rpy = np.empty((len(quats), 3))
+    rpy[:,0] = np.where(gimbal, np.arctan2(-m12, m11), np.arctan2(m21, m22))
+    rpy[:,1] = np.arctan2(-m20, cy)
+    rpy[:,2] = np.where(gimbal, 0.0, np.arctan2(m10, m00))
+    return rpy
+
+
+def decodePlanPoses(msg):
+    '''
+    Decode the states of a robot plan message to an array of pose times and
+    a (T x N) array of drake poses, see
+    robotstate.convertStateMessageToDrakePose.
+    '''
+    msg = asRobotPlan(msg)
+    states = msg.plan
+    drakePoseJointNames = robotstate.getDrakePoseJointNames()
+    jointNames = drakePoseJointNames[6:]
+
+    poseTimes = np.empty(len(states))
+    poses = np.empty((len(states), len(drakePoseJointNames)))
+    transAndQuats = np.empty((len(states), 7))
+
+    jointIndices = None
+    stateJointNames = None
+
+    for i, state in enumerate(states):
+
+        # plan states almost always share a joint name list, so the map
+        # from message order to drake pose order is computed once
+        if state.joint_name != stateJointNames:
+            stateJointNames = state.joint_name
+            jointMap = dict((name, j) for j, name in enumerate(stateJointNames))
+            jointIndices = [jointMap[name] for name in jointNames]
+
+        poseTimes[i] = state.utime / 1e6
+        poses[i,6:] = np.asarray(state.joint_position)[jointIndices]
+
+        trans = state.pose.translation
+        quat = state.pose.rotation
+        transAndQuats[i] = trans.x, trans.y, trans.z, quat.w, quat.x, quat.y, quat.z
+
+    poses[:,:3] = transAndQuats[:,:3]
+    poses[:,3:6] = quaternionsToRollPitchYaw(transAndQuats[:,3:])
+    return poseTimes, poses
+
+
+class PlanCache(object):
+    '''
+    A cache of decoded robot plan messages keyed by a hash of the encoded
+    message, so that plans with equal content share an entry and a plan
+    that was modified in place gets a new one.  Each entry holds the pose times and (T x N) pose
+    array of the plan, and the interpolators and sampled meshes that
+    PlanPlayback computed from it.
+    '''
+
+    def __init__(self, maxSize=16):
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+
+    @staticmethod
+    def getKey(msg):
+        return hashlib.sha1(asRobotPlan(msg).encode()).digest()
+
+    def get(self, msg):
+        key = self.getKey(msg)
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            poseTimes, poses = decodePlanPoses(msg)
+            entry = dict(poseTimes=poseTimes, poses=poses, interpolators={}, meshes={})
+            while len(self.entries) >= self.maxSize:
+                self.entries.popitem(last=False)
+        self.entries[key] = entry
+        return entry
+
+    def clear(self):
+        self.entries.clear()
+
+
+_planCache = PlanCache()
+
+
+def getPlanCache():
+    return _planCache
+
+
 class PlanPlayback(object):
 
     def __init__(self):
@@ -44,26 +153,28 @@ class PlanPlayback(object):
     def getPlanPoses(msgOrList):
 
         if isinstance(msgOrList, list):
-            messages = msgOrList
-            allPoseTimes, allPoses = PlanPlayback.getPlanPoses(messages[0])
-
-            for msg in messages[1:]:
-                poseTimes, poses = PlanPlayback.getPlanPoses(msg)
-                poseTimes += allPoseTimes[-1]
-                allPoseTimes = np.hstack((allPoseTimes, poseTimes[1:]))
-                allPoses += poses[1:]
+            entries = [_planCache.get(msg) for msg in msgOrList]
+
+            # concatenate the plans, dropping the first state of each
+            # subsequent plan and offsetting its times
+            numStates = len(entries[0]['poseTimes']) + sum(len(entry['poseTimes']) - 1 for entry in entries[1:])
+            allPoseTimes = np.empty(numStates)
+            allPoses = np.empty((numStates, entries[0]['poses'].shape[1]))
+
+            allPoseTimes[:len(entries[0]['poseTimes'])] = entries[0]['poseTimes']
+            allPoses[:len(entries[0]['poses'])] = entries[0]['poses']
+            start = len(entries[0]['poseTimes'])
+
+            for entry in entries[1:]:
+                end = start + len(entry['poseTimes']) - 1
+                allPoseTimes[start:end] = entry['poseTimes'][1:] + allPoseTimes[start-1]
+                allPoses[start:end] = entry['poses'][1:]
+                start = end
             return allPoseTimes, allPoses
 
         else:
-            msg = asRobotPlan(msgOrList)
-
-            poses = []
-            poseTimes = []
-            for plan in msg.plan:
-                pose = robotstate.convertStateMessageToDrakePose(plan)
-                poseTimes.append(plan.utime / 1e6)
-                poses.append(pose)
-            return np.array(poseTimes), poses
+            entry = _planCache.get(msgOrList)
+            return entry['poseTimes'].copy(), entry['poses'].copy()
 
     @staticmethod
     def getPlanElapsedTime(msg):
@@ -95,8 +206,21 @@ class PlanPlayback(object):
 
 
     def getPoseInterpolatorFromPlan(self, message):
-        poseTimes, poses = self.getPlanPoses(message)
-        return self.getPoseInterpolator(poseTimes, poses)
+        '''
+        Returns the pose interpolator for a plan message or list of
+        messages.  The interpolator of a single message is cached for each
+        interpolation method.
+        '''
+        if isinstance(message, list):
+            poseTimes, poses = self.getPlanPoses(message)
+            return self.getPoseInterpolator(poseTimes, poses)
+
+        entry = _planCache.get(message)
+        f = entry['interpolators'].get(self.interpolationMethod)
+        if f is None:
+            f = self.getPoseInterpolator(entry['poseTimes'], entry['poses'])
+            entry['interpolators'][self.interpolationMethod] = f
+        return f
 
 
     def getPoseInterpolator(self, poseTimes, poses, unwrap_rpy=True):
@@ -112,20 +236,44 @@ class PlanPlayback(object):
 
 
     def getPlanPoseMeshes(self, messages, jointController, robotModel, numberOfSamples):
+        '''
+        Returns robot model meshes at numberOfSamples times sampled evenly
+        over the plan.  For a single plan message the meshes are cached,
+        and the polydata of a previous sampling is reused.
+        '''
+        if isinstance(messages, list) and len(messages) == 1:
+            messages = messages[0]
+
+        if isinstance(messages, list):
+            poseTimes, poses = self.getPlanPoses(messages)
+            cachedMeshes = {}
+        else:
+            entry = _planCache.get(messages)
+            poseTimes = entry['poseTimes']
+            cachedMeshes = entry['meshes']
 
-        poseTimes, poses = self.getPlanPoses(messages)
-        f = self.getPoseInterpolator(poseTimes, poses)
+        f = self.getPoseInterpolatorFromPlan(messages)
         sampleTimes = np.linspace(poseTimes[0], poseTimes[-1], numberOfSamples)
-        meshes = []
 
-        for sampleTime in sampleTimes:
+        key = (id(robotModel), self.interpolationMethod, numberOfSamples)
+        if key in cachedMeshes:
+            jointController.setPose('plan_playback', f(sampleTimes[-1]))
+            return cachedMeshes[key]
+
+        samplePoses = f(sampleTimes)
+
+        # reuse the polydata from another sampling of this plan
+        reusable = [polyData for meshes in cachedMeshes.values() for polyData in meshes]
+        cachedMeshes.clear()
+        meshes = []
 
-            pose = f(sampleTime)
+        for pose in samplePoses:
             jointController.setPose('plan_playback', pose)
-            polyData = vtk.vtkPolyData()
+            polyData = reusable.pop() if reusable else vtk.vtkPolyData()
             robotModel.model.getModelMesh(polyData)
             meshes.append(polyData)
 
+        cachedMeshes[key] = meshes
         return meshes
 
 
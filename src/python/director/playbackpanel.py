@@ -306,11 +306,6 @@ class PlaybackPanel(object):
         for i, mesh in reversed(list(enumerate(meshes))):
             d.addPolyData(mesh, color=colorFunc(i))
 
-        pd = d.getPolyData()
-        clean = vtk.vtkCleanPolyData()
-        clean.SetInput(pd)
-        clean.Update()
-        pd = clean.GetOutput()
 
         self.planFramesObj = vis.updatePolyData(d.getPolyData(), 'robot plan', alpha=1.0, visible=False, colorByName='RGB255', parent='planning')
         self.showPlanFrames()
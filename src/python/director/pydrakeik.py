@@ -4,11 +4,16 @@ import pydrake.solvers.ik as pydrakeik
 import pydrake
 
 import os
+import time
 import json
+import Queue
+import traceback
+import multiprocessing
 from collections import OrderedDict
 import numpy as np
 import scipy.interpolate
 
+from director import ikcache
 from director import ikconstraints
 from director import ikconstraintencoder
 from director import ikparameters
@@ -17,6 +22,7 @@ from director import transformUtils
 from director import roboturdf
 from director.fieldcontainer import FieldContainer
 from director.simpletimer import FPSCounter
+from director.timercallback import TimerCallback
 from director import vtkAll as vtk
 from director import transformUtils
 
@@ -28,6 +34,319 @@ except ImportError:
     from drc import robot_plan_t
 
 
+def encodeFields(fields):
+    '''
+    Serialize the fields returned by PlannerPublisher.setupFields to a json
+    string, see decodeFields.
+    '''
+    return json.dumps(fields, cls=ikconstraintencoder.ConstraintEncoder)
+
+
+def decodeFields(encoded):
+    '''
+    Decode fields serialized by encodeFields and rebuild the ikconstraints
+    objects and ikparameters.IkParameters options.
+    '''
+    decoded = json.loads(encoded, object_hook=ikconstraintencoder.ConstraintDecoder)
+
+    del decoded['class']
+    fields = FieldContainer(**decoded)
+
+    del fields.options['class']
+    fields.options = ikparameters.IkParameters(**fields.options)
+
+    constraints = []
+
+    for c in fields.constraints:
+        objClass = getattr(ikconstraints, c['class'])
+        del c['class']
+        obj = objClass()
+        constraints.append(obj)
+
+        for attr, value in c.iteritems():
+            if isinstance(value, dict) and 'position' in value and 'quaternion' in value:
+                value = transformUtils.transformFromPose(value['position'], value['quaternion'])
+            setattr(obj, attr, value)
+
+    fields.constraints = constraints
+
+    return fields
+
+
+def isIkInfoFeasible(info):
+    '''
+    Returns whether an snopt info code from an ik solve is a feasible
+    solution.  Codes of 10 and above are infeasible or failed solves.
+    '''
+    return info < 10
+
+
+def computeIkCost(pose, nominalPose, positionCosts):
+    '''
+    Returns the ik objective (q - q_nom)' Q (q - q_nom) with Q = diag(positionCosts).
+    '''
+    delta = np.asarray(pose, dtype=float) - np.asarray(nominalPose, dtype=float)
+    return float(np.dot(np.asarray(positionCosts, dtype=float), delta**2))
+
+
+def makeIkSeeds(fields, numSeeds, previousSolutions=(), randomState=None):
+    '''
+    Returns a list of up to numSeeds (seedName, pose) for a multi-seed ik
+    solve: the requested seed pose, the nominal pose, previous solutions
+    (most recent first) and then random poses drawn uniformly within the
+    joint limits.  Joints with unbounded limits, such as the floating base,
+    keep the value of the requested seed pose in the random seeds.
+    '''
+    randomState = randomState or np.random
+    seedPose = np.asarray(fields.poses[fields.seedPose], dtype=float)
+    nominalPose = np.asarray(fields.poses[fields.nominalPose], dtype=float)
+
+    seeds = [('seed', seedPose), ('nominal', nominalPose)]
+    for i, pose in enumerate(previousSolutions):
+        seeds.append(('previous_%d' % i, np.asarray(pose, dtype=float)))
+    seeds = seeds[:numSeeds]
+
+    limits = np.array([fields.jointLimits[name] for name in fields.jointNames], dtype=float)
+    lower, upper = limits[:,0], limits[:,1]
+    bounded = np.isfinite(lower) & np.isfinite(upper)
+
+    for i in xrange(numSeeds - len(seeds)):
+        pose = seedPose.copy()
+        pose[bounded] = randomState.uniform(lower[bounded], upper[bounded])
+        seeds.append(('random_%d' % i, pose))
+
+    return seeds
+
+
+class IkCancelledError(Exception):
+    pass
+
+
+class IkTimeoutError(Exception):
+    pass
+
+
+class IkFuture(object):
+    '''
+    The pending result of an ik request submitted to an IkWorkerPool.
+    Done callbacks are called on the main thread with the future as
+    argument when the request completes or is cancelled.  solveTime is the
+    time in seconds the worker spent on the request.
+    '''
+
+    def __init__(self, pool=None, requestId=None):
+        self.pool = pool
+        self.requestId = requestId
+        self.status = None
+        self.value = None
+        self.solveTime = None
+        self.completionTime = None
+        self.callbacks = []
+
+    def done(self):
+        return self.status is not None
+
+    def cancelled(self):
+        return self.status == 'cancelled'
+
+    def cancel(self):
+        '''
+        Cancel the request.  A request that a worker has already started
+        runs to completion but its result is discarded.
+        '''
+        if not self.done():
+            if self.pool:
+                self.pool._cancelRequest(self.requestId)
+            self._setResult('cancelled', None)
+        return self.cancelled()
+
+    def addDoneCallback(self, func):
+        if self.done():
+            func(self)
+        else:
+            self.callbacks.append(func)
+
+    def result(self, timeout=None):
+        if not self.done():
+            self.pool.waitForFuture(self, timeout)
+        if not self.done():
+            raise IkTimeoutError()
+        if self.cancelled():
+            raise IkCancelledError()
+        if self.status == 'error':
+            raise Exception('ik worker error:\n' + self.value)
+        return self.value
+
+    def _setResult(self, status, value):
+        if self.done():
+            return
+        self.status = status
+        self.value = value
+        self.completionTime = time.time()
+        callbacks, self.callbacks = self.callbacks, []
+        for func in callbacks:
+            func(self)
+
+
+def _ikWorkerMain(urdfFile, packagePaths, requestQueue, resultQueue, cancelFlags):
+
+    server = PyDrakeIkServer()
+    server.initInstance(FieldContainer(urdfFile=urdfFile, packagePaths=packagePaths))
+
+    while True:
+        request = requestQueue.get()
+        if request is None:
+            return
+
+        requestId, method, encodedFields = request
+        if cancelFlags[requestId % len(cancelFlags)]:
+            resultQueue.put((requestId, 'cancelled', None, 0.0))
+            continue
+
+        startTime = time.time()
+        try:
+            result = getattr(server, method)(decodeFields(encodedFields))
+            resultQueue.put((requestId, 'done', result, time.time() - startTime))
+        except Exception:
+            resultQueue.put((requestId, 'error', traceback.format_exc(), time.time() - startTime))
+
+
+class IkWorkerPool(object):
+    '''
+    A pool of worker processes that each hold a PyDrakeIkServer with the
+    robot model loaded, so that ik solves run without blocking the main
+    thread.  Requests are sent as fields serialized with encodeFields and
+    results are returned through IkFuture objects.  Results are collected
+    on the main thread by a timer while requests are pending.  If a worker
+    process exits, the pending requests fail and the pool shuts down, see
+    isAlive().
+    '''
+
+    def __init__(self, urdfFile, packagePaths, numWorkers=1):
+
+        self.requestQueue = multiprocessing.Queue()
+        self.resultQueue = multiprocessing.Queue()
+        # ring of per-request cancel flags shared with the workers
+        self.cancelFlags = multiprocessing.Array('b', 4096, lock=False)
+        self.nextRequestId = 1
+        self.futures = {}
+        self.timer = TimerCallback(targetFps=60, callback=self._pollResults)
+
+        self.workers = []
+        for i in xrange(numWorkers):
+            worker = multiprocessing.Process(target=_ikWorkerMain, args=(urdfFile, packagePaths,
+                        self.requestQueue, self.resultQueue, self.cancelFlags))
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+
+    def submit(self, method, fields, callback=None, cancelPending=False):
+        '''
+        Submit a request to call the PyDrakeIkServer method (runIk or
+        runIkTraj) with the given fields.  If cancelPending is true, all
+        previously submitted requests are cancelled first, use this when a
+        new request makes the pending ones stale.  Returns an IkFuture.
+        '''
+        if cancelPending:
+            self.cancelPending()
+
+        requestId = self.nextRequestId
+        self.nextRequestId += 1
+
+        self.cancelFlags[requestId % len(self.cancelFlags)] = 0
+        future = IkFuture(self, requestId)
+        if callback:
+            future.addDoneCallback(callback)
+
+        if not self._checkWorkers():
+            future._setResult('error', 'the ik worker pool is shut down')
+            return future
+
+        self.futures[requestId] = future
+
+        self.requestQueue.put((requestId, method, encodeFields(fields)))
+        if not self.timer.isActive():
+            self.timer.start()
+        return future
+
+    def cancelPending(self):
+        for future in self.futures.values():
+            future.cancel()
+
+    def _cancelRequest(self, requestId):
+        self.cancelFlags[requestId % len(self.cancelFlags)] = 1
+
+    def _handleResult(self, requestId, status, value, solveTime):
+        future = self.futures.pop(requestId, None)
+        if future is not None:
+            future.solveTime = solveTime
+            future._setResult(status, value)
+
+    def _pollResults(self):
+        while True:
+            try:
+                self._handleResult(*self.resultQueue.get_nowait())
+            except Queue.Empty:
+                break
+        self._checkWorkers()
+        return bool(self.futures)
+
+    def isAlive(self):
+        '''
+        Returns whether all worker processes are running.
+        '''
+        return bool(self.workers) and all(worker.is_alive() for worker in self.workers)
+
+    def _checkWorkers(self):
+        '''
+        If a worker process has exited, fail the pending requests and shut
+        down the pool, since the request the worker was solving is lost.
+        Returns whether the pool is alive.
+        '''
+        if self.isAlive():
+            return True
+        exitCodes = [worker.exitcode for worker in self.workers if not worker.is_alive()]
+        for future in self.futures.values():
+            future._setResult('error', 'ik worker process exited with code %s' % exitCodes)
+        self.futures.clear()
+        self.shutdown()
+        return False
+
+    def waitForFuture(self, future, timeout=None):
+        '''
+        Block until the future is done, or until timeout seconds elapsed.
+        '''
+        self.waitForAny([future], timeout)
+
+    def waitForAny(self, futures, timeout=None, pollInterval=0.1):
+        '''
+        Block until any of the futures is done, or until timeout seconds
+        elapsed.  The workers are checked every pollInterval seconds, so
+        that the wait ends with failed futures if a worker has exited.
+        '''
+        endTime = time.time() + timeout if timeout is not None else None
+        while not any(future.done() for future in futures):
+            waitTime = pollInterval if endTime is None else min(pollInterval, endTime - time.time())
+            if waitTime <= 0:
+                break
+            try:
+                self._handleResult(*self.resultQueue.get(timeout=waitTime))
+            except Queue.Empty:
+                if not self._checkWorkers():
+                    break
+
+    def shutdown(self):
+        self.cancelPending()
+        self.timer.stop()
+        for worker in self.workers:
+            self.requestQueue.put(None)
+        for worker in self.workers:
+            worker.join(1.0)
+            if worker.is_alive():
+                worker.terminate()
+        self.workers = []
+
+
 class PyDrakePlannerPublisher(plannerPublisher.PlannerPublisher):
 
     def _setup(self):
@@ -35,47 +354,91 @@ class PyDrakePlannerPublisher(plannerPublisher.PlannerPublisher):
         self.counter = FPSCounter()
         self.counter.printToConsole = True
         self.ikServer = None
+        self.workerPool = None
+        self.previousSolutions = []
+        self.maxPreviousSolutions = 4
+        self.ikCache = None
+
+    def _getInitArgs(self):
+        return FieldContainer(
+            urdfFile=self.ikPlanner.robotModel.getProperty('Filename'),
+            packagePaths=roboturdf.getPackagePaths()
+            )
 
     def _setupLocalServer(self):
 
         if self.ikServer is not None:
             return
 
-        initArgs = FieldContainer(
-            urdfFile=self.ikPlanner.robotModel.getProperty('Filename'),
-            packagePaths=roboturdf.getPackagePaths()
-            )
-
         self.ikServer = PyDrakeIkServer()
-        self.ikServer.initInstance(initArgs)
-
-    def testEncodeDecode(self, fields):
+        self.ikServer.initInstance(self._getInitArgs())
 
-        encoded = json.dumps(fields, cls=ikconstraintencoder.ConstraintEncoder)
-        decoded = json.loads(encoded, object_hook=ikconstraintencoder.ConstraintDecoder)
+    def enableWorkerPool(self, numWorkers=1):
+        '''
+        Start an IkWorkerPool that is used by processIKAsync,
+        processTrajAsync and processIKMultiSeed.  Each worker process loads
+        its own copy of the robot model.  If the pool can not be started, or
+        later stops, requests are solved on the main thread instead.
+        Returns whether the pool is running.
+        '''
+        if self.workerPool is None:
+            initArgs = self._getInitArgs()
+            try:
+                self.workerPool = IkWorkerPool(initArgs.urdfFile, initArgs.packagePaths, numWorkers)
+            except Exception:
+                print 'failed to start the ik worker pool, ik will be solved on the main thread:'
+                traceback.print_exc()
+        return self._useWorkerPool()
+
+    def _useWorkerPool(self):
+        return self.workerPool is not None and self.workerPool.isAlive()
+
+    def disableWorkerPool(self):
+        if self.workerPool is not None:
+            self.workerPool.shutdown()
+            self.workerPool = None
+
+    def enableIkCache(self, maxSize=256, filename=None):
+        '''
+        Cache ik solutions, see ikcache.IkSolutionCache.  Requests that
+        match a cached request return the cached solution without solving,
+        near misses use the cached solution as the seed pose.
+        '''
+        self.ikCache = ikcache.IkSolutionCache(maxSize, filename)
 
-        del decoded['class']
-        fields = FieldContainer(**decoded)
+    def disableIkCache(self):
+        if self.ikCache is not None:
+            self.ikCache.close()
+        self.ikCache = None
 
-        del fields.options['class']
-        fields.options = ikparameters.IkParameters(**fields.options)
+    def _lookupIkCache(self, fields):
+        '''
+        Returns (cachedResult, cacheKeys).  cachedResult is (endPose, info)
+        on a cache hit, otherwise None.  On a near miss the seed pose of the
+        fields is replaced with the cached solution.
+        '''
+        if self.ikCache is None:
+            return None, None
 
-        constraints = []
+        cacheKeys = self.ikCache.getKeys(fields)
+        cached = self.ikCache.lookup(cacheKeys)
+        if cached is None:
+            return None, cacheKeys
 
-        for c in fields.constraints:
-            objClass = getattr(ikconstraints, c['class'])
-            del c['class']
-            obj = objClass()
-            constraints.append(obj)
+        endPose, info, isExact = cached
+        if isExact:
+            return (endPose, info), cacheKeys
 
-            for attr, value in c.iteritems():
-                if isinstance(value, dict) and 'position' in value and 'quaternion' in value:
-                    value = transformUtils.transformFromPose(value['position'], value['quaternion'])
-                setattr(obj, attr, value)
+        fields.poses['q_ik_cache_seed'] = list(endPose)
+        fields.seedPose = 'q_ik_cache_seed'
+        return None, cacheKeys
 
-        fields.constraints = constraints
+    def _addToIkCache(self, cacheKeys, endPose, info):
+        if cacheKeys is not None and isIkInfoFeasible(info):
+            self.ikCache.add(cacheKeys, endPose, info)
 
-        return fields
+    def testEncodeDecode(self, fields):
+        return decodeFields(encodeFields(fields))
 
     def makePlanMessage(self, poses, poseTimes, info, fields):
 
@@ -104,11 +467,88 @@ class PyDrakePlannerPublisher(plannerPublisher.PlannerPublisher):
     def processIK(self, constraints, ikParameters, positionCosts, nominalPoseName="", seedPoseName=""):
 
         fields = self.setupFields(constraints, ikParameters, positionCosts, nominalPoseName, seedPoseName)
+        cached, cacheKeys = self._lookupIkCache(fields)
+        if cached is not None:
+            self.counter.tick()
+            return cached
+
         fields = self.testEncodeDecode(fields)
         endPose, info = self.ikServer.runIk(fields)
+        self._addToIkCache(cacheKeys, endPose, info)
+        if isIkInfoFeasible(info):
+            self._addPreviousSolution(endPose)
         self.counter.tick()
         return endPose, info
 
+    def _addPreviousSolution(self, pose):
+        self.previousSolutions.insert(0, np.array(pose))
+        del self.previousSolutions[self.maxPreviousSolutions:]
+
+    def processIKMultiSeed(self, constraints, ikParameters, positionCosts, nominalPoseName="", seedPoseName="",
+                           numSeeds=8, earlyTermination=True, randomState=None):
+        '''
+        Solve ik from multiple seeds, see makeIkSeeds.  With the worker pool
+        enabled the seeds are solved in parallel, otherwise one after the
+        other.  With earlyTermination the first feasible solution is
+        returned and the remaining seeds are cancelled, otherwise the
+        feasible solution with the lowest cost is returned.  If no seed
+        gives a feasible solution, the lowest cost solution is returned.
+
+        Returns (endPose, info, seedResults) where seedResults is a list of
+        dicts with keys seed, status, info, cost and solveTime, in seed order.
+        '''
+        fields = self.setupFields(constraints, ikParameters, positionCosts, nominalPoseName, seedPoseName)
+        seeds = makeIkSeeds(fields, numSeeds, self.previousSolutions, randomState)
+        nominalPose = fields.poses[fields.nominalPose]
+
+        for seedName, pose in seeds:
+            fields.poses['q_multiseed_' + seedName] = pose.tolist()
+
+        useWorkerPool = self._useWorkerPool()
+        futures = []
+        for seedName, pose in seeds:
+            if earlyTermination and not useWorkerPool and any(
+                    f.status == 'done' and isIkInfoFeasible(f.value[1]) for f in futures):
+                break
+            fields.seedPose = 'q_multiseed_' + seedName
+            futures.append(self._submit('runIk', fields, None, cancelPending=False))
+
+        if useWorkerPool:
+            pending = list(futures)
+            while pending:
+                self.workerPool.waitForAny(pending)
+                pending = [f for f in pending if not f.done()]
+                if earlyTermination and any(f.status == 'done' and isIkInfoFeasible(f.value[1]) for f in futures):
+                    for f in pending:
+                        f.cancel()
+                    break
+
+        seedResults = []
+        costs = {}
+        for (seedName, pose), future in map(None, seeds, futures):
+            result = dict(seed=seedName, status=future.status if future else 'skipped',
+                          info=None, cost=None, solveTime=future.solveTime if future else None)
+            if result['status'] == 'done':
+                endPose, info = future.value
+                costs[future] = computeIkCost(endPose, nominalPose, positionCosts)
+                result.update(info=info, cost=costs[future])
+            seedResults.append(result)
+
+        if not costs:
+            raise Exception('multi-seed ik failed: %r' % seedResults)
+
+        feasible = [f for f in costs if isIkInfoFeasible(f.value[1])]
+        if earlyTermination and feasible:
+            best = min(feasible, key=lambda f: f.completionTime)
+        else:
+            best = min(feasible or costs.keys(), key=costs.get)
+
+        endPose, info = best.value
+        if isIkInfoFeasible(info):
+            self._addPreviousSolution(endPose)
+        self.counter.tick()
+        return endPose, info, seedResults
+
     def processTraj(self, constraints, ikParameters, positionCosts, nominalPoseName="", seedPoseName="", endPoseName=""):
 
         fields = self.setupFields(constraints, ikParameters, positionCosts, nominalPoseName, seedPoseName, endPoseName)
@@ -118,6 +558,79 @@ class PyDrakePlannerPublisher(plannerPublisher.PlannerPublisher):
         lcmUtils.publish('CANDIDATE_MANIP_PLAN', plan)
         return plan, info
 
+    def _submit(self, method, fields, callback, cancelPending):
+
+        if self._useWorkerPool():
+            return self.workerPool.submit(method, fields, callback, cancelPending)
+
+        # without a worker pool, solve now and return a completed future
+        self._setupLocalServer()
+        future = IkFuture()
+        if callback:
+            future.addDoneCallback(callback)
+        startTime = time.time()
+        try:
+            result = getattr(self.ikServer, method)(self.testEncodeDecode(fields))
+        except Exception:
+            future.solveTime = time.time() - startTime
+            future._setResult('error', traceback.format_exc())
+        else:
+            future.solveTime = time.time() - startTime
+            future._setResult('done', result)
+        return future
+
+    def processIKAsync(self, constraints, ikParameters, positionCosts, nominalPoseName="", seedPoseName="",
+                       callback=None, cancelPending=True):
+        '''
+        Like processIK, but the solve runs in the worker pool if it is
+        enabled (see enableWorkerPool).  Returns an IkFuture whose result is
+        (endPose, info).  By default pending requests are cancelled, so
+        only the latest request of an interactive goal frame drag is solved.
+        '''
+        fields = self.setupFields(constraints, ikParameters, positionCosts, nominalPoseName, seedPoseName)
+        cached, cacheKeys = self._lookupIkCache(fields)
+
+        def onDone(future):
+            if future.status == 'done':
+                if cached is None:
+                    self._addToIkCache(cacheKeys, *future.value)
+                if isIkInfoFeasible(future.value[1]):
+                    self._addPreviousSolution(future.value[0])
+                self.counter.tick()
+            if callback:
+                callback(future)
+
+        if cached is not None:
+            if cancelPending and self._useWorkerPool():
+                self.workerPool.cancelPending()
+            future = IkFuture()
+            future.addDoneCallback(onDone)
+            future._setResult('done', cached)
+            return future
+
+        return self._submit('runIk', fields, onDone, cancelPending)
+
+    def processTrajAsync(self, constraints, ikParameters, positionCosts, nominalPoseName="", seedPoseName="", endPoseName="",
+                         callback=None, cancelPending=True):
+        '''
+        Like processTraj, but the solve runs in the worker pool if it is
+        enabled.  The plan is published when the request completes.  Returns
+        an IkFuture whose result is (poses, poseTimes, info), the done
+        callback is called with the future and the plan message.
+        '''
+        fields = self.setupFields(constraints, ikParameters, positionCosts, nominalPoseName, seedPoseName, endPoseName)
+
+        def onDone(future):
+            plan = None
+            if future.status == 'done':
+                poses, poseTimes, info = future.value
+                plan = self.makePlanMessage(poses, poseTimes, info, fields)
+                lcmUtils.publish('CANDIDATE_MANIP_PLAN', plan)
+            if callback:
+                callback(future, plan)
+
+        return self._submit('runIkTraj', fields, onDone, cancelPending)
+
 
 class RigidBodyTreeCompatNew(object):
 
@@ -217,6 +730,14 @@ class PyDrakeIkServer(object):
         self.rigidBodyTree = None
         self.trajInterpolationMode = 'cubic'
 
+        # incremental trajectory mode, see runIkTraj
+        self.incrementalTrajEnabled = False
+        self.incrementalTolerance = 1e-6
+        self.incrementalPointwiseTolerance = 1e-3
+        self.incrementalPinTolerance = 1e-4
+        self.incrementalWindowPadding = 1
+        self.lastTraj = None
+
     def initInstance(self, fields):
 
         self.rigidBodyTree = self.loadRigidBodyTree(fields.urdfFile, fields.packagePaths)
@@ -518,8 +1039,102 @@ class PyDrakeIkServer(object):
         else:
             return scipy.interpolate.interp1d(x, y, axis=0, kind=kind)
 
-    def runIkTraj(self, fields):
+    def getTrajRequestState(self, fields):
+        '''
+        Returns (signature, values, tspans) that describe the constraints of
+        a trajectory request for incremental solves.  Each constraint, with
+        the poses it references, and the seed, end and nominal poses are
+        flattened to a structure string, which must match between requests,
+        and a vector of numeric values.
+        '''
+        entries = []
+        for c in fields.constraints:
+            data = [json.loads(ikconstraintencoder.encodeConstraints(c))]
+            data += [list(fields.poses[getattr(c, attr)]) for attr in ('postureName', 'poseName') if hasattr(c, attr)]
+            entries.append((type(c).__name__, data, np.asarray(c.tspan, dtype=float)))
+
+        for name in [fields.seedPose, fields.endPose, fields.nominalPose]:
+            entries.append(('pose:' + name, list(fields.poses[name]), np.array([-np.inf, np.inf])))
+
+        signature = []
+        values = []
+        tspans = []
+        for name, data, tspan in entries:
+            numbers = []
+            def flatten(obj):
+                if isinstance(obj, float) and np.isfinite(obj):
+                    numbers.append(obj)
+                    return None
+                elif isinstance(obj, dict):
+                    return [[key, flatten(obj[key])] for key in sorted(obj)]
+                elif isinstance(obj, (list, tuple)):
+                    return [flatten(x) for x in obj]
+                return repr(obj) if isinstance(obj, float) else obj
+            signature.append(json.dumps([name, flatten(data)]))
+            values.append(np.array(numbers))
+            tspans.append(tspan)
+
+        return signature, values, tspans
+
+    def getChangedTrajWindow(self, fields, timeSamples):
+        '''
+        Compares the request with the previous trajectory request.  Returns
+        None if the previous solution cannot be reused, otherwise
+        (window, maxDelta) where window is a boolean mask of the time
+        samples that are affected by the changed constraints.
+        '''
+        signature, values, tspans = self.getTrajRequestState(fields)
+        state = dict(signature=signature, values=values)
+        previous = self.lastTraj
+        self.lastTraj = dict(state, timeSamples=timeSamples)
+
+        if (previous is None or previous['signature'] != signature
+                or not np.array_equal(previous['timeSamples'], timeSamples)):
+            return None
+
+        deltas = np.array([np.max(np.abs(a - b)) if len(a) else 0.0 for a, b in zip(values, previous['values'])])
+        # keep the solutions of the previous request
+        self.lastTraj = dict(previous, **state)
+
+        window = np.zeros(len(timeSamples), dtype=bool)
+        for i in np.flatnonzero(deltas > self.incrementalTolerance):
+            tspan = tspans[i]
+            window |= (timeSamples >= tspan[0]) & (timeSamples <= tspan[1])
+
+        # free the neighbouring samples so the trajectory can blend into the window
+        for i in xrange(self.incrementalWindowPadding):
+            window[1:] |= window[:-1].copy()
+            window[:-1] |= window[1:].copy()
+
+        return window, deltas.max() if len(deltas) else 0.0
+
+    def makePinConstraints(self, timeSamples, poses):
+        '''
+        Returns posture constraints that hold the given poses at the given
+        time samples, within incrementalPinTolerance.
+        '''
+        positionInds = np.arange(len(self.positionNames), dtype=np.int32)
+        constraints = []
+        for t, q in zip(timeSamples, poses):
+            pc = pydrakeik.PostureConstraint(self.rigidBodyTree, np.array([t, t], dtype=float))
+            pc.setJointLimits(positionInds, q - self.incrementalPinTolerance, q + self.incrementalPinTolerance)
+            constraints.append(pc)
+        return constraints
 
+    def runIkTraj(self, fields):
+        '''
+        Solve a trajectory with InverseKinTraj, optionally followed by
+        InverseKinPointwise at numPointwiseSamples.
+
+        If incrementalTrajEnabled is set and the request has the same
+        constraint structure and time samples as the previous request, the
+        previous solution is reused:  the previous trajectory is the seed,
+        time samples outside the window of the changed constraints are held
+        at their previous values, and only pointwise samples in the window
+        are re-solved.  The pointwise pass is skipped when all constraint
+        deltas are below incrementalPointwiseTolerance.  If no constraint
+        changed, the previous result is returned.
+        '''
         timeSamples = self.makeTimeSamplesFromConstraints(fields)
         ikoptions = self.makeIkOptions(fields)
         constraints = self.makeConstraints(fields)
@@ -529,12 +1144,26 @@ class PyDrakeIkServer(object):
         q_seed_end = np.asarray(fields.poses[fields.endPose])
 
         q_nom_array = np.tile(q_nom, (len(timeSamples), 1)).transpose()
-
-        values = np.vstack((q_seed, q_seed_end))
         timeRange = [timeSamples[0], timeSamples[-1]]
 
-        q_seed_array = self.getInterpolationFunction(timeRange, values,
-                                kind=self.trajInterpolationMode)(timeSamples).transpose()
+        change = None
+        if self.incrementalTrajEnabled:
+            change = self.getChangedTrajWindow(fields, timeSamples)
+            if change is not None and 'result' not in self.lastTraj:
+                change = None
+
+        if change is not None:
+            window, maxDelta = change
+            if not window.any():
+                return self.lastTraj['result']
+
+            previousPoses = self.lastTraj['trajPoses']
+            q_seed_array = previousPoses.transpose()
+            constraints = constraints + self.makePinConstraints(timeSamples[~window], previousPoses[~window])
+        else:
+            values = np.vstack((q_seed, q_seed_end))
+            q_seed_array = self.getInterpolationFunction(timeRange, values,
+                                    kind=self.trajInterpolationMode)(timeSamples).transpose()
 
         assert q_seed_array.shape == (len(q_nom), len(timeSamples))
         #print 'time range:', timeRange
@@ -555,28 +1184,47 @@ class PyDrakeIkServer(object):
             poses.append(q)
 
         info = results.info[0]
+        trajPoses = np.array(poses)
 
 
         if fields.options.usePointwise:
             pointwiseTimeSamples = np.linspace(timeRange[0], timeRange[1], numPointwiseSamples)
 
-            q_seed_array = self.getInterpolationFunction(timeSamples, np.array(poses),
+            q_seed_array = self.getInterpolationFunction(timeSamples, trajPoses,
                                     kind=self.trajInterpolationMode)(pointwiseTimeSamples).transpose()
 
             assert q_seed_array.shape == (len(q_nom), numPointwiseSamples)
 
-            results = pydrakeik.InverseKinPointwise(self.rigidBodyTree, pointwiseTimeSamples, q_seed_array, q_seed_array, constraints, ikoptions)
+            previousPointwise = self.lastTraj.get('pointwisePoses') if change is not None else None
+            if previousPointwise is not None and len(previousPointwise) == numPointwiseSamples:
+                pointwiseWindow = (pointwiseTimeSamples >= timeSamples[window].min()) & (pointwiseTimeSamples <= timeSamples[window].max())
+                poses = np.array(previousPointwise)
+                if maxDelta <= self.incrementalPointwiseTolerance:
+                    poses[pointwiseWindow] = q_seed_array.transpose()[pointwiseWindow]
+                elif pointwiseWindow.any():
+                    windowSamples = pointwiseTimeSamples[pointwiseWindow]
+                    windowSeeds = np.ascontiguousarray(q_seed_array[:,pointwiseWindow])
+                    results = pydrakeik.InverseKinPointwise(self.rigidBodyTree, windowSamples, windowSeeds, windowSeeds, constraints, ikoptions)
+                    poses[pointwiseWindow] = [np.reshape(q, q.shape[0]) for q in results.q_sol]
+                    info = max(info, max(results.info))
+                poses = list(poses)
+            else:
+                results = pydrakeik.InverseKinPointwise(self.rigidBodyTree, pointwiseTimeSamples, q_seed_array, q_seed_array, constraints, ikoptions)
 
-            assert len(results.q_sol) == len(pointwiseTimeSamples)
+                assert len(results.q_sol) == len(pointwiseTimeSamples)
 
-            poses = []
-            for i in xrange(len(results.q_sol)):
-                q = results.q_sol[i]
-                q.shape = q.shape[0]
-                poses.append(q)
+                poses = []
+                for i in xrange(len(results.q_sol)):
+                    q = results.q_sol[i]
+                    q.shape = q.shape[0]
+                    poses.append(q)
 
-            info = results.info[0]
+                info = results.info[0]
+
+            pointwisePoses = np.array(poses)
             timeSamples = pointwiseTimeSamples
+        else:
+            pointwisePoses = None
 
 
         assert timeSamples[0] == 0.0
@@ -596,6 +1244,9 @@ class PyDrakeIkServer(object):
             timeSamples = np.linspace(tFineWarped[0], tFineWarped[-1], numPointwiseSamples)
             poses = self.getInterpolationFunction(tFineWarped, posesFine, kind=self.trajInterpolationMode)(timeSamples)
 
+        if self.incrementalTrajEnabled:
+            self.lastTraj.update(trajPoses=trajPoses, pointwisePoses=pointwisePoses, result=(poses, timeSamples, info))
+
         return poses, timeSamples, info
 
 
@@ -1,3 +1,5 @@
+import os
+
 from director.componentgraph import ComponentFactory
 from director.fieldcontainer import FieldContainer
 
@@ -291,6 +293,17 @@ class RobotSystemFactory(object):
         else:
             robotSystem.ikPlanner.planningMode = 'matlabdrake'
 
+        # solve the asynchronous pydrake ik requests in worker processes
+        if robotSystem.ikPlanner.planningMode == 'pydrake' and directorConfig.get('ikWorkerPoolSize'):
+            pyDrakePlannerPub.enableWorkerPool(directorConfig['ikWorkerPoolSize'])
+
+        # cache pydrake ik solutions, optionally saved to ikCacheFile
+        if robotSystem.ikPlanner.planningMode == 'pydrake' and directorConfig.get('ikCacheSize'):
+            ikCacheFile = directorConfig.get('ikCacheFile')
+            if ikCacheFile:
+                ikCacheFile = os.path.expanduser(ikCacheFile)
+            pyDrakePlannerPub.enableIkCache(directorConfig['ikCacheSize'], ikCacheFile)
+
 
         linkNameArgs = ['','','']
         if 'leftFootLink' in directorConfig:
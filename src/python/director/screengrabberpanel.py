@@ -5,11 +5,17 @@ from director.timercallback import TimerCallback
 from director.simpletimer import FPSCounter
 from director import ioUtils as io
 import director.vtkAll as vtk
+from director import vtkNumpy as vnp
+import numpy as np
 import os
 import glob
 import time
 import datetime
 import itertools
+import threading
+import subprocess
+import Queue
+from distutils.spawn import find_executable
 
 def addWidgetsToDict(widgets, d):
 
@@ -26,6 +32,150 @@ class WidgetDict(object):
 
 
 
+def findMovieEncoder():
+    '''
+    Returns the path of the ffmpeg or avconv executable, or None.
+    '''
+    for name in ('ffmpeg', 'avconv'):
+        path = find_executable(name)
+        if path:
+            return path
+    return None
+
+
+class MovieRecorder(object):
+    '''
+    Records frames of a view without blocking the GUI thread on image
+    writing or encoding.
+
+    grabFrame reads the pixels of the view into one of a fixed pool of
+    reusable buffers and queues it for the writer threads.  Frames are
+    written as ppm images to outputDirectory, or, if encoderCommand is
+    given, streamed to an ffmpeg/avconv subprocess that encodes
+    movieFilename while recording.  Encoding uses a single writer thread
+    so frames reach the encoder in order.
+
+    If all buffers are in use because the writers can't keep up, the frame
+    is dropped and counted in droppedFrames.
+    '''
+
+    def __init__(self, outputDirectory, frameRate, encoderCommand=None, movieFilename=None,
+                 numWriterThreads=2, maxQueueSize=16):
+
+        self.outputDirectory = outputDirectory
+        self.frameRate = frameRate
+        self.encoderCommand = encoderCommand
+        self.movieFilename = movieFilename
+        self.numWriterThreads = 1 if encoderCommand else numWriterThreads
+        self.maxQueueSize = maxQueueSize
+        self.frameCount = 0
+        self.framesWritten = 0
+        self.droppedFrames = 0
+        self.errors = []
+        self.encoder = None
+        self.imageSize = None
+
+        self.grabber = vtk.vtkWindowToImageFilter()
+        self.grabber.SetInputBufferTypeToRGB()
+        self.grabber.ReadFrontBufferOff()
+        self.grabber.SetShouldRerender(False)
+
+        self.freeBuffers = Queue.Queue()
+        self.writeQueue = Queue.Queue()
+        self.threads = []
+
+    def start(self):
+        for i in xrange(self.numWriterThreads):
+            thread = threading.Thread(target=self._writerLoop)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def queueSize(self):
+        return self.writeQueue.qsize()
+
+    def _startEncoder(self, width, height):
+        command = [self.encoderCommand, '-y',
+                   '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', '%dx%d' % (width, height),
+                   '-r', str(self.frameRate), '-i', '-',
+                   '-vcodec', 'libx264', '-preset', 'fast', '-crf', '18', '-pix_fmt', 'yuv420p',
+                   self.movieFilename]
+        self.encoder = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def grabFrame(self, view):
+
+        self.grabber.SetInput(view.renderWindow())
+        self.grabber.Modified()
+        self.grabber.Update()
+        image = self.grabber.GetOutput()
+
+        width, height = image.GetDimensions()[:2]
+        if self.imageSize is None:
+            self.imageSize = (width, height)
+            for i in xrange(self.maxQueueSize + self.numWriterThreads):
+                self.freeBuffers.put(np.empty((height, width, 3), dtype=np.uint8))
+            if self.encoderCommand:
+                self._startEncoder(width, height)
+        elif self.imageSize != (width, height):
+            self.errors.append('frame %d has size %dx%d, expected %dx%d' % ((self.frameCount, width, height) + self.imageSize))
+            return False
+
+        try:
+            buf = self.freeBuffers.get_nowait()
+        except Queue.Empty:
+            self.droppedFrames += 1
+            return False
+
+        pixels = vnp.numpy_support.vtk_to_numpy(image.GetPointData().GetScalars())
+        buf[:] = pixels.reshape(height, width, 3)
+
+        self.writeQueue.put((self.frameCount, buf))
+        self.frameCount += 1
+        return True
+
+    def _writeFrame(self, frameIndex, buf):
+        # vtk images start at the bottom row
+        pixels = np.ascontiguousarray(buf[::-1])
+        if self.encoder:
+            self.encoder.stdin.write(pixels.data)
+        else:
+            filename = os.path.join(self.outputDirectory, 'frame_%07d.ppm' % frameIndex)
+            with open(filename, 'wb') as f:
+                f.write('P6\n%d %d\n255\n' % (buf.shape[1], buf.shape[0]))
+                f.write(pixels.data)
+
+    def _writerLoop(self):
+        while True:
+            item = self.writeQueue.get()
+            if item is None:
+                return
+            frameIndex, buf = item
+            try:
+                self._writeFrame(frameIndex, buf)
+                self.framesWritten += 1
+            except (IOError, OSError) as e:
+                self.errors.append(str(e))
+            finally:
+                self.freeBuffers.put(buf)
+
+    def stop(self):
+        '''
+        Wait for the queued frames to be written and for the encoder to
+        finish.
+        '''
+        for thread in self.threads:
+            self.writeQueue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+        if self.encoder:
+            self.encoder.stdin.close()
+            if self.encoder.wait() != 0:
+                self.errors.append('%s exited with code %d' % (self.encoderCommand, self.encoder.returncode))
+            self.encoder = None
+
+
 class ScreenGrabberPanel(object):
 
     def __init__(self, view):
@@ -37,6 +187,7 @@ class ScreenGrabberPanel(object):
         assert uifile.open(uifile.ReadOnly)
 
         self.frameCount = 0
+        self.recorder = None
 
         self.widget = loader.load(uifile)
         self.ui = WidgetDict(self.widget.children())
@@ -55,6 +206,7 @@ class ScreenGrabberPanel(object):
 
         self.updateViewSize()
         self.onLockViewSize()
+        self.ui.encodeMovieCheck.setEnabled(findMovieEncoder() is not None)
 
         self.recordTimer = QtCore.QTimer()
         self.recordTimer.connect('timeout()', self.onRecordTimer)
@@ -124,19 +276,16 @@ class ScreenGrabberPanel(object):
         app.getMainWindow().statusBar().showMessage('Saved: ' + filename, 2000)
 
 
-    def nextMovieFileName(self):
-        filename = os.path.join(self.movieOutputDirectory(), 'frame_%07d.tiff' % self.frameCount)
-        self.frameCount += 1
-        return filename
+    def movieFileName(self):
+        return os.path.join(self.movieOutputDirectory(), 'movie-' + self.dateTimeString() + '.mp4')
 
     def updateRecordingStats(self):
-        isRecordMode = self.ui.recordMovieButton.checked
 
-        currentRate = 0.0
-        writeQueue = 0.0
+        currentRate = self.fpsCounter.getAverageFPS() if self.isRecordMode() else 0.0
+        writeQueue = self.recorder.queueSize() if self.recorder else 0
 
         self.ui.currentRateValueLabel.setText('%.1f' % currentRate)
-        self.ui.writeQueueValueLabel.setText('%.1f' % currentRate)
+        self.ui.writeQueueValueLabel.setText('%d' % writeQueue)
 
     def isRecordMode(self):
         return self.ui.recordMovieButton.checked
@@ -150,6 +299,7 @@ class ScreenGrabberPanel(object):
         self.ui.captureRateSpin.setEnabled(not isRecordMode)
         self.ui.captureRateLabel.setEnabled(not isRecordMode)
         self.ui.moveOutputDirectoryLabel.setEnabled(not isRecordMode)
+        self.ui.encodeMovieCheck.setEnabled(not isRecordMode and findMovieEncoder() is not None)
         self.ui.currentRateLabel.setEnabled(isRecordMode)
         self.ui.currentRateValueLabel.setEnabled(isRecordMode)
         self.ui.writeQueueLabel.setEnabled(isRecordMode)
@@ -178,7 +328,9 @@ class ScreenGrabberPanel(object):
             self.ui.recordMovieButton.checked = False
             return
 
-        existingFiles = glob.glob(os.path.join(self.movieOutputDirectory(), '*.tiff'))
+        encoderCommand = findMovieEncoder() if self.ui.encodeMovieCheck.checked else None
+
+        existingFiles = [] if encoderCommand else glob.glob(os.path.join(self.movieOutputDirectory(), 'frame_*.ppm'))
         if len(existingFiles):
 
             choice = QtGui.QMessageBox.question(app.getMainWindow(), 'Continue?',
@@ -193,6 +345,10 @@ class ScreenGrabberPanel(object):
         for fileToRemove in existingFiles:
             os.remove(fileToRemove)
 
+        self.recorder = MovieRecorder(self.movieOutputDirectory(), self.captureRate(),
+                                      encoderCommand=encoderCommand, movieFilename=self.movieFileName())
+        self.recorder.start()
+
         self.fpsCounter.tick()
         self.startT = time.time()
         interval = int(round(1000.0 / self.captureRate()))
@@ -202,14 +358,29 @@ class ScreenGrabberPanel(object):
 
     def stopRecording(self):
         self.recordTimer.stop()
-        if self.frameCount > 0:
+        if not self.recorder:
+            return
+
+        app.getMainWindow().statusBar().showMessage('Writing %d queued frames...' % self.recorder.queueSize())
+        self.recorder.stop()
+        self.frameCount = self.recorder.frameCount
+
+        if self.recorder.errors:
+            app.showErrorMessage('Errors while recording:\n\n' + '\n'.join(self.recorder.errors[:10]))
+        elif self.frameCount > 0:
             self.showEncodingDialog()
+        self.recorder = None
 
     def showEncodingDialog(self):
 
-        msg = 'Recorded %d frames.  For encoding, use this command line:\n\n\n' % self.frameCount
+        if self.recorder.encoderCommand:
+            msg = 'Recorded %d frames (%d dropped) to:\n\n    %s\n' % (self.frameCount, self.recorder.droppedFrames, self.recorder.movieFilename)
+            app.showInfoMessage(msg, title='Recording Stopped')
+            return
+
+        msg = 'Recorded %d frames (%d dropped).  For encoding, use this command line:\n\n\n' % (self.frameCount, self.recorder.droppedFrames)
         msg += '    cd "%s"\n\n' % self.movieOutputDirectory()
-        msg += '    avconv -r %d -i frame_%%07d.tiff \\\n' % self.captureRate()
+        msg += '    avconv -r %d -i frame_%%07d.ppm \\\n' % self.captureRate()
         msg += '           -vcodec libx264 \\\n'
         msg += '           -preset slow \\\n'
         msg += '           -crf 18 \\\n'
@@ -257,13 +428,13 @@ class ScreenGrabberPanel(object):
 
     def onRecordTimer(self):
 
-        saveScreenshot(self.view, self.nextMovieFileName(), shouldRender=False)
+        self.recorder.grabFrame(self.view)
 
         self.fpsCounter.tick()
         tNow = time.time()
         if tNow - self.startT > 1.0:
             self.startT = tNow
-            self.ui.currentRateValueLabel.text = '%.1f' % self.fpsCounter.getAverageFPS()
+            self.updateRecordingStats()
 
 
 def saveScreenshot(view, filename, shouldRender=True, shouldWrite=True):
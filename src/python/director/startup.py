@@ -3,6 +3,9 @@
 
 from __future__ import division
 
+from time import time
+startupStartTime = time()
+
 import director
 from director import irisdriver
 
@@ -11,30 +14,17 @@ import sys
 import PythonQt
 import json
 from PythonQt import QtCore, QtGui
-from time import time
 import imp
 import director.applogic as app
 from director import drcargs
 from director import vtkAll as vtk
-from director import matlab
+from director import componentgraph
+from director.componentgraph import LazyModule
 from director import jointcontrol
 from director import callbacks
 from director import camerabookmarks
 from director import cameracontrol
 from director import cameracontrolpanel
-from director import bihandeddemo
-from director import debrisdemo
-from director import doordemo
-from director import drilldemo
-from director import valvedemo
-from director import drivingplanner
-from director import egressplanner
-from director import polarisplatformplanner
-from director import surprisetask
-from director import continuouswalkingdemo
-from director import sitstandplanner
-from director import walkingtestdemo
-from director import terraintask
 from director import ikplanner
 from director import objectmodel as om
 from director import spreadsheet
@@ -70,8 +60,6 @@ from director.jointpropagator import JointPropagator
 from director import planningutils
 from director import viewcolors
 
-from director import coursemodel
-
 from director import copmonitor
 from director import robotplanlistener
 from director import handdriver
@@ -113,6 +101,25 @@ import numpy as np
 from director.debugVis import DebugData
 from director import ioUtils as io
 
+# task and demo modules are imported when first used
+matlab = LazyModule('director.matlab')
+bihandeddemo = LazyModule('director.bihandeddemo')
+debrisdemo = LazyModule('director.debrisdemo')
+doordemo = LazyModule('director.doordemo')
+drilldemo = LazyModule('director.drilldemo')
+valvedemo = LazyModule('director.valvedemo')
+drivingplanner = LazyModule('director.drivingplanner')
+egressplanner = LazyModule('director.egressplanner')
+polarisplatformplanner = LazyModule('director.polarisplatformplanner')
+surprisetask = LazyModule('director.surprisetask')
+continuouswalkingdemo = LazyModule('director.continuouswalkingdemo')
+sitstandplanner = LazyModule('director.sitstandplanner')
+walkingtestdemo = LazyModule('director.walkingtestdemo')
+terraintask = LazyModule('director.terraintask')
+coursemodel = LazyModule('director.coursemodel')
+
+componentgraph.recordComponentTime('startup imports', time() - startupStartTime, 0.0)
+
 drcargs.requireStrict()
 drcargs.args()
 app.startup(globals())
@@ -167,6 +174,7 @@ useCOPMonitor = True
 useCourseModel = False
 useLimitJointsSentToPlanner = False
 useFeetlessRobot = False
+useStartupReport = False
 
 # Sensor Flags
 useKinect = False
@@ -448,64 +456,164 @@ if usePlanning:
     taskPanels = OrderedDict()
 
     if useHumanoidDRCDemos:
-        debrisDemo = debrisdemo.DebrisPlannerDemo(robotStateModel, robotStateJointController, playbackRobotModel,
-                        ikPlanner, manipPlanner, atlasdriver.driver, lHandDriver,
-                        perception.multisenseDriver, refitBlocks)
-
-        drillDemo = drilldemo.DrillPlannerDemo(robotStateModel, playbackRobotModel, teleopRobotModel, footstepsDriver, manipPlanner, ikPlanner,
-                        lHandDriver, rHandDriver, atlasdriver.driver, perception.multisenseDriver,
-                        fitDrillMultisense, robotStateJointController,
-                        playPlans, teleopPanel.showPose, cameraview, segmentationpanel)
-        drillTaskPanel = drilldemo.DrillTaskPanel(drillDemo)
-
-        valveDemo = valvedemo.ValvePlannerDemo(robotStateModel, footstepsDriver, footstepsPanel, manipPlanner, ikPlanner,
-                                          lHandDriver, rHandDriver, robotStateJointController)
-        valveTaskPanel = valvedemo.ValveTaskPanel(valveDemo)
-
-        continuouswalkingDemo = continuouswalkingdemo.ContinousWalkingDemo(robotStateModel, footstepsPanel, footstepsDriver, playbackPanel, robotStateJointController, ikPlanner,
-                                                                           teleopJointController, navigationPanel, cameraview)
-        continuousWalkingTaskPanel = continuouswalkingdemo.ContinuousWalkingTaskPanel(continuouswalkingDemo)
-
-        useDrivingPlanner = drivingplanner.DrivingPlanner.isCompatibleWithConfig()
-        if useDrivingPlanner:
-            drivingPlannerPanel = drivingplanner.DrivingPlannerPanel(robotSystem)
-
-        walkingDemo = walkingtestdemo.walkingTestDemo(robotStateModel, playbackRobotModel, teleopRobotModel, footstepsDriver, manipPlanner, ikPlanner,
-                        lHandDriver, rHandDriver, atlasdriver.driver, perception.multisenseDriver,
-                        robotStateJointController,
-                        playPlans, showPose)
-
-        bihandedDemo = bihandeddemo.BihandedPlannerDemo(robotStateModel, playbackRobotModel, teleopRobotModel, footstepsDriver, manipPlanner, ikPlanner,
-                        lHandDriver, rHandDriver, atlasdriver.driver, perception.multisenseDriver,
-                        fitDrillMultisense, robotStateJointController,
-                        playPlans, showPose, cameraview, segmentationpanel)
-
-        doorDemo = doordemo.DoorDemo(robotStateModel, footstepsDriver, manipPlanner, ikPlanner,
-                                          lHandDriver, rHandDriver, atlasdriver.driver, perception.multisenseDriver,
-                                          fitDrillMultisense, robotStateJointController,
-                                          playPlans, showPose)
-        doorTaskPanel = doordemo.DoorTaskPanel(doorDemo)
-
-        terrainTaskPanel = terraintask.TerrainTaskPanel(robotSystem)
-        terrainTask = terrainTaskPanel.terrainTask
-
-        surpriseTaskPanel = surprisetask.SurpriseTaskPanel(robotSystem)
-        surpriseTask = surpriseTaskPanel.planner
-        egressPanel = egressplanner.EgressPanel(robotSystem)
-        egressPlanner = egressPanel.egressPlanner
-
-        if useDrivingPlanner:
-            taskPanels['Driving'] = drivingPlannerPanel.widget
-
-        taskPanels['Egress'] = egressPanel.widget
-        taskPanels['Door'] = doorTaskPanel.widget
-        taskPanels['Valve'] = valveTaskPanel.widget
-        taskPanels['Drill'] = drillTaskPanel.widget
-        taskPanels['Surprise'] = surpriseTaskPanel.widget
-        taskPanels['Terrain'] = terrainTaskPanel.widget
-        taskPanels['Continuous Walking'] = continuousWalkingTaskPanel.widget
-
-    tasklaunchpanel.init(taskPanels)
+
+        # the task panels and their demos are constructed by a component
+        # factory when a panel is first opened, the demos without a panel
+        # are disabled unless enabled with enableComponents
+        class HumanoidDRCDemoFactory(object):
+
+            def getComponents(self):
+
+                components = {
+                    'DebrisDemo' : [],
+                    'DrillDemo' : [],
+                    'DrillTaskPanel' : ['DrillDemo'],
+                    'ValveDemo' : [],
+                    'ValveTaskPanel' : ['ValveDemo'],
+                    'ContinuousWalkingDemo' : [],
+                    'ContinuousWalkingTaskPanel' : ['ContinuousWalkingDemo'],
+                    'DrivingPlannerPanel' : [],
+                    'WalkingDemo' : [],
+                    'BihandedDemo' : [],
+                    'DoorDemo' : [],
+                    'DoorTaskPanel' : ['DoorDemo'],
+                    'TerrainTaskPanel' : [],
+                    'SurpriseTaskPanel' : [],
+                    'EgressPanel' : []}
+
+                disabledComponents = [
+                    'DebrisDemo',
+                    'WalkingDemo',
+                    'BihandedDemo']
+
+                # same check as DrivingPlanner.isCompatibleWithConfig,
+                # without importing drivingplanner
+                if 'drivingThrottleJoint' not in drcargs.getDirectorConfig():
+                    disabledComponents.append('DrivingPlannerPanel')
+
+                return components, disabledComponents
+
+            def getLazyComponents(self):
+                components, disabledComponents = self.getComponents()
+                return [name for name in components if name not in ['DebrisDemo', 'WalkingDemo', 'BihandedDemo']]
+
+            def initDebrisDemo(self, fields):
+                debrisDemo = debrisdemo.DebrisPlannerDemo(robotStateModel, robotStateJointController, playbackRobotModel,
+                                ikPlanner, manipPlanner, atlasdriver.driver, lHandDriver,
+                                perception.multisenseDriver, refitBlocks)
+                return FieldContainer(debrisDemo=debrisDemo)
+
+            def initDrillDemo(self, fields):
+                drillDemo = drilldemo.DrillPlannerDemo(robotStateModel, playbackRobotModel, teleopRobotModel, footstepsDriver, manipPlanner, ikPlanner,
+                                lHandDriver, rHandDriver, atlasdriver.driver, perception.multisenseDriver,
+                                fitDrillMultisense, robotStateJointController,
+                                playPlans, teleopPanel.showPose, cameraview, segmentationpanel)
+                return FieldContainer(drillDemo=drillDemo)
+
+            def initDrillTaskPanel(self, fields):
+                return FieldContainer(drillTaskPanel=drilldemo.DrillTaskPanel(fields.drillDemo))
+
+            def initValveDemo(self, fields):
+                valveDemo = valvedemo.ValvePlannerDemo(robotStateModel, footstepsDriver, footstepsPanel, manipPlanner, ikPlanner,
+                                                  lHandDriver, rHandDriver, robotStateJointController)
+                return FieldContainer(valveDemo=valveDemo)
+
+            def initValveTaskPanel(self, fields):
+                return FieldContainer(valveTaskPanel=valvedemo.ValveTaskPanel(fields.valveDemo))
+
+            def initContinuousWalkingDemo(self, fields):
+                continuouswalkingDemo = continuouswalkingdemo.ContinousWalkingDemo(robotStateModel, footstepsPanel, footstepsDriver, playbackPanel, robotStateJointController, ikPlanner,
+                                                                                   teleopJointController, navigationPanel, cameraview)
+                return FieldContainer(continuouswalkingDemo=continuouswalkingDemo)
+
+            def initContinuousWalkingTaskPanel(self, fields):
+                return FieldContainer(continuousWalkingTaskPanel=continuouswalkingdemo.ContinuousWalkingTaskPanel(fields.continuouswalkingDemo))
+
+            def initDrivingPlannerPanel(self, fields):
+                return FieldContainer(drivingPlannerPanel=drivingplanner.DrivingPlannerPanel(robotSystem))
+
+            def initWalkingDemo(self, fields):
+                walkingDemo = walkingtestdemo.walkingTestDemo(robotStateModel, playbackRobotModel, teleopRobotModel, footstepsDriver, manipPlanner, ikPlanner,
+                                lHandDriver, rHandDriver, atlasdriver.driver, perception.multisenseDriver,
+                                robotStateJointController,
+                                playPlans, showPose)
+                return FieldContainer(walkingDemo=walkingDemo)
+
+            def initBihandedDemo(self, fields):
+                bihandedDemo = bihandeddemo.BihandedPlannerDemo(robotStateModel, playbackRobotModel, teleopRobotModel, footstepsDriver, manipPlanner, ikPlanner,
+                                lHandDriver, rHandDriver, atlasdriver.driver, perception.multisenseDriver,
+                                fitDrillMultisense, robotStateJointController,
+                                playPlans, showPose, cameraview, segmentationpanel)
+                return FieldContainer(bihandedDemo=bihandedDemo)
+
+            def initDoorDemo(self, fields):
+                doorDemo = doordemo.DoorDemo(robotStateModel, footstepsDriver, manipPlanner, ikPlanner,
+                                                  lHandDriver, rHandDriver, atlasdriver.driver, perception.multisenseDriver,
+                                                  fitDrillMultisense, robotStateJointController,
+                                                  playPlans, showPose)
+                return FieldContainer(doorDemo=doorDemo)
+
+            def initDoorTaskPanel(self, fields):
+                return FieldContainer(doorTaskPanel=doordemo.DoorTaskPanel(fields.doorDemo))
+
+            def initTerrainTaskPanel(self, fields):
+                terrainTaskPanel = terraintask.TerrainTaskPanel(robotSystem)
+                return FieldContainer(terrainTaskPanel=terrainTaskPanel, terrainTask=terrainTaskPanel.terrainTask)
+
+            def initSurpriseTaskPanel(self, fields):
+                surpriseTaskPanel = surprisetask.SurpriseTaskPanel(robotSystem)
+                return FieldContainer(surpriseTaskPanel=surpriseTaskPanel, surpriseTask=surpriseTaskPanel.planner)
+
+            def initEgressPanel(self, fields):
+                egressPanel = egressplanner.EgressPanel(robotSystem)
+                return FieldContainer(egressPanel=egressPanel, egressPlanner=egressPanel.egressPlanner)
+
+
+        def requireTaskComponent(name):
+            '''
+            Constructs a task component if needed and adds its objects to
+            the console namespace.
+            '''
+            objects = set(om.getObjects())
+            fields = taskComponentFactory.requireComponent(name)
+            globals().update(dict(fields))
+            for obj in set(om.getObjects()) - objects:
+                obj.setProperty('Deletable', False)
+            return fields
+
+        def createTaskPanel(componentName, fieldName):
+            return getattr(requireTaskComponent(componentName), fieldName).widget
+
+        taskComponentFactory = componentgraph.ComponentFactory()
+        taskComponentFactory.register(HumanoidDRCDemoFactory)
+
+        taskComponentOptions = taskComponentFactory.getDefaultOptions()
+        for component in drcargs.getDirectorConfig().get('disableComponents', []):
+            if component in taskComponentOptions._fields:
+                setattr(taskComponentOptions, component, False)
+        for component in drcargs.getDirectorConfig().get('enableComponents', []):
+            if component in taskComponentOptions._fields:
+                taskComponentFactory.setDependentOptions(taskComponentOptions, **{component: True})
+
+        taskComponentFactory.construct(taskComponentOptions)
+        for fields in taskComponentFactory.componentFields.values():
+            globals().update(dict(fields))
+
+        for name, componentName, fieldName in [
+                ('Driving', 'DrivingPlannerPanel', 'drivingPlannerPanel'),
+                ('Egress', 'EgressPanel', 'egressPanel'),
+                ('Door', 'DoorTaskPanel', 'doorTaskPanel'),
+                ('Valve', 'ValveTaskPanel', 'valveTaskPanel'),
+                ('Drill', 'DrillTaskPanel', 'drillTaskPanel'),
+                ('Surprise', 'SurpriseTaskPanel', 'surpriseTaskPanel'),
+                ('Terrain', 'TerrainTaskPanel', 'terrainTaskPanel'),
+                ('Continuous Walking', 'ContinuousWalkingTaskPanel', 'continuousWalkingTaskPanel')]:
+            if taskComponentFactory.isComponentEnabled(componentName):
+                taskPanels[name] = functools.partial(createTaskPanel, componentName, fieldName)
+
+    taskLaunchPanel = tasklaunchpanel.init(OrderedDict())
+    for name, createWidgetFunction in taskPanels.iteritems():
+        taskLaunchPanel.addLazyTaskPanel(name, createWidgetFunction)
 
     splinewidget.init(view, handFactory, robotStateModel)
 
@@ -890,6 +998,7 @@ if useDrillDemo:
 
 
     showImageOverlay()
+    drillDemo = requireTaskComponent('DrillDemo').drillDemo
     drillDemo.pointerTracker = createPointerTracker()
     drillDemo.projectCallback = projectDrillDemoInCamera
     drillYawPreTransform = vtk.vtkTransform()
@@ -1072,3 +1181,7 @@ if useFeetlessRobot:
 
 for scriptArgs in drcargs.args().scripts:
     execfile(scriptArgs[0])
+
+if useStartupReport:
+    componentgraph.recordComponentTime('startup', 0.0, time() - startupStartTime)
+    componentgraph.printComponentTimes()
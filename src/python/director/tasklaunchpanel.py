@@ -8,6 +8,8 @@ class TaskLaunchPanel(object):
 
         self.widget = QtGui.QTabWidget()
         self.widget.setWindowTitle('Task Panel')
+        self.widget.connect('currentChanged(int)', self._onCurrentChanged)
+        self.lazyTaskPanels = {}
 
         for name, widget in widgetMap.iteritems():
             self.addTaskPanel(name, widget)
@@ -26,9 +28,33 @@ class TaskLaunchPanel(object):
     def addTaskPanel(self, taskPanelName, taskPanelWidget):
         self.widget.addTab(taskPanelWidget, taskPanelName)
 
+    def addLazyTaskPanel(self, taskPanelName, createWidgetFunction):
+        '''
+        Adds a tab with a placeholder widget.  createWidgetFunction is called
+        to construct the task panel widget the first time the tab is shown.
+        '''
+        placeholder = QtGui.QWidget()
+        layout = QtGui.QVBoxLayout(placeholder)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.lazyTaskPanels[taskPanelName] = (placeholder, createWidgetFunction)
+        self.addTaskPanel(taskPanelName, placeholder)
+
+    def _createLazyTaskPanel(self, taskPanelName):
+        placeholder, createWidgetFunction = self.lazyTaskPanels.pop(taskPanelName)
+        placeholder.layout().addWidget(createWidgetFunction())
+
+    def _onCurrentChanged(self, index):
+        if self.widget.isVisible():
+            taskPanelName = self.widget.tabText(index)
+            if taskPanelName in self.lazyTaskPanels:
+                self._createLazyTaskPanel(taskPanelName)
+
     def showTaskLaunchPanel(self):
 
         widget = self.widget
+        taskPanelName = widget.tabText(widget.currentIndex)
+        if taskPanelName in self.lazyTaskPanels:
+            self._createLazyTaskPanel(taskPanelName)
         widget.show()
         widget.raise_()
         widget.activateWindow()
@@ -163,6 +163,41 @@ def transformFromPose(position, quaternion):
     return getTransformFromNumpy(mat)
 
 
+def matricesFromPoses(positions, quaternions, out=None):
+    '''
+    Vectorized version of transformFromPose.  Given an Nx3 array of positions
+    and an Nx4 array of (w, x, y, z) quaternions, returns an Nx4x4 numpy array
+    of homogeneous transforms.  Quaternions are normalized, and a zero
+    quaternion maps to the identity rotation.  If out is given it must be a
+    float64 array of shape Nx4x4 and it is filled in place.
+    '''
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    quaternions = np.asarray(quaternions, dtype=np.float64).reshape(-1, 4)
+    if out is None:
+        out = np.empty((quaternions.shape[0], 4, 4))
+
+    nq = np.einsum('ij,ij->i', quaternions, quaternions)
+    scale = np.zeros_like(nq)
+    valid = nq > transformations._EPS
+    scale[valid] = np.sqrt(2.0 / nq[valid])
+    q = quaternions * scale[:,np.newaxis]
+    w, x, y, z = q[:,0], q[:,1], q[:,2], q[:,3]
+
+    out[:,0,0] = 1.0 - y*y - z*z
+    out[:,0,1] = x*y - z*w
+    out[:,0,2] = x*z + y*w
+    out[:,1,0] = x*y + z*w
+    out[:,1,1] = 1.0 - x*x - z*z
+    out[:,1,2] = y*z - x*w
+    out[:,2,0] = x*z - y*w
+    out[:,2,1] = y*z + x*w
+    out[:,2,2] = 1.0 - x*x - y*y
+    out[:,:3,3] = positions
+    out[:,3,:3] = 0.0
+    out[:,3,3] = 1.0
+    return out
+
+
 def poseFromTransform(transform):
     '''
     Returns position, quaternion
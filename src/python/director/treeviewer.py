@@ -19,7 +19,9 @@ from director import vtkAll as vtk
 from director import vtkNumpy as vnp
 from director import visualization as vis
 from director import packagepath
+from director import treeviewerformats
 from director.shallowCopy import shallowCopy
+from director.timercallback import TimerCallback
 
 import robotlocomotion as lcmrl
 
@@ -49,6 +51,18 @@ def transformFromDict(pose_data):
         pose_data.get("quaternion", [1, 0, 0, 0]))
 
 
+def posesFromDicts(pose_datas):
+    """
+    Parse a list of transform dicts into a single Nx7 array where each row
+    is translation (x, y, z) followed by quaternion (w, x, y, z).
+    """
+    poses = np.empty((len(pose_datas), 7))
+    for row, pose_data in zip(poses, pose_datas):
+        row[:3] = pose_data.get("translation", (0, 0, 0))
+        row[3:] = pose_data.get("quaternion", (1, 0, 0, 0))
+    return poses
+
+
 class Geometry(object):
     TextureCache = {}
     PackageMap = None
@@ -118,7 +132,7 @@ class Geometry(object):
     @staticmethod
     def createPointcloud(params):
         polyData = vnp.numpyToPolyData(np.asarray(params["points"]),
-                                       createVertexCells=True)
+                                       createVertexCells=True, copy=False)
         if "channels" in params:
             Geometry.addColorChannels(polyData, params["channels"])
         return [polyData]
@@ -136,7 +150,7 @@ class Geometry(object):
         y = ranges * np.sin(angles)
         z = np.zeros(x.shape)
         points = np.vstack((x, y, z)).T
-        polyData = vnp.numpyToPolyData(points, createVertexCells=True)
+        polyData = vnp.numpyToPolyData(points, createVertexCells=True, copy=False)
         if "channels" in params:
             Geometry.addColorChannels(polyData, params["channels"])
         return [polyData]
@@ -413,6 +427,11 @@ class TreeViewer(object):
         self.itemToPathCache = {}
         self.pathToItemCache = {}
         self.client_id_regex = re.compile(r'\<(.*)\>')
+        self.batchTransformsEnabled = False
+        self.pendingTransforms = {}
+        self.flushTimer = TimerCallback(targetFps=60,
+                                        callback=self.flushPendingTransforms)
+        self.lastFlushTime = 0.0
         self.enable()
         self.sendStatusMessage(
             0, ViewerResponse(ViewerStatus.OK, {"ready": True}))
@@ -453,6 +472,17 @@ class TreeViewer(object):
     def disable(self):
         self.setEnabled(False)
 
+    def setBatchTransformsEnabled(self, enabled):
+        """
+        When enabled, settransform commands are not applied immediately.
+        The latest pose for each path is queued and all queued poses are
+        applied together, followed by a single render, at most once per
+        display frame (see flushTimer.targetFps).
+        """
+        self.batchTransformsEnabled = enabled
+        if not enabled:
+            self.flushPendingTransforms()
+
     def sendStatusMessage(self, timestamp, response, client_id=""):
         msg = lcmrl.viewer2_comms_t()
         msg.format = "treeviewer_json"
@@ -468,20 +498,21 @@ class TreeViewer(object):
         lcmUtils.publish(channel, msg)
 
     def decodeCommsMsg(self, msg):
-        if msg.format == "treeviewer_json":
-            if msg.format_version_major == 1 and msg.format_version_minor == 0:
-                data = json.loads(msg.data.decode())
-                return data, ViewerResponse(ViewerStatus.OK, {})
-            else:
-                return None, ViewerResponse(ViewerStatus.ERROR_UNKNOWN_FORMAT_VERSION,
-                                            {"supported_formats": {
-                                                 "treeviewer_json": ["1.0"]
-                                            }})
-        else:
+        if not treeviewerformats.isFormatSupported(msg.format):
             return None, ViewerResponse(ViewerStatus.ERROR_UNKNOWN_FORMAT,
-                                        {"supported_formats": {
-                                             "treeviewer_json": ["1.0"]
-                                        }})
+                                        {"supported_formats":
+                                             treeviewerformats.getSupportedFormats()})
+        elif not treeviewerformats.isFormatSupported(msg.format,
+                                                     msg.format_version_major,
+                                                     msg.format_version_minor):
+            return None, ViewerResponse(ViewerStatus.ERROR_UNKNOWN_FORMAT_VERSION,
+                                        {"supported_formats":
+                                             treeviewerformats.getSupportedFormats()})
+        else:
+            data = treeviewerformats.decode(msg.data, msg.format,
+                                            msg.format_version_major,
+                                            msg.format_version_minor)
+            return data, ViewerResponse(ViewerStatus.OK, {})
 
     def onViewerRequest(self, msg, channel="DIRECTOR_TREE_VIEWER_REQUEST"):
         match = self.client_id_regex.search(channel)
@@ -504,28 +535,42 @@ class TreeViewer(object):
         addedGeometries = set()
         setTransforms = set()
         missingPaths = set()
-        for command in data["delete"]:
-            deletedPaths.add(tuple(self.handleDeletePath(command)))
+        if data["delete"]:
+            # apply queued transforms first so that they cannot re-create
+            # folders for the paths that are about to be deleted
+            self.flushPendingTransforms()
         if "load" in data:
             warnings.warn("The 'load' comand has been deprecated. Please use 'setgeometry' instead", DeprecationWarning)
             data["setgeometry"] = data["load"]
         if "draw" in data:
             warnings.warn("The 'draw' cmmand has been deprecated. Please use 'settransform' instead", DeprecationWarning)
             data["settransform"] = data["draw"]
-        for command in data["setgeometry"]:
-            addedGeometries.add(tuple(self.handleSetGeometry(command)))
-        for command in data["settransform"]:
-            path, missingGeometry = self.handleSetTransform(command)
-            setTransforms.add(tuple(path))
-            if missingGeometry:
-                missingPaths.add(tuple(path))
+        with om.batchUpdate():
+            for command in data["delete"]:
+                deletedPaths.add(tuple(self.handleDeletePath(command)))
+            for command in data["setgeometry"]:
+                addedGeometries.add(tuple(self.handleSetGeometry(command)))
+        if self.batchTransformsEnabled:
+            for path, missingGeometry in self.queueSetTransforms(data["settransform"]):
+                setTransforms.add(path)
+                if missingGeometry:
+                    missingPaths.add(path)
+        else:
+            for command in data["settransform"]:
+                path, missingGeometry = self.handleSetTransform(command)
+                setTransforms.add(tuple(path))
+                if missingGeometry:
+                    missingPaths.add(tuple(path))
         result = {
             "deleted_paths": list(deletedPaths),
             "added_geometries": list(addedGeometries),
             "set_transforms": list(setTransforms),
             "missing_paths": list(missingPaths)
         }
-        self.view.render()
+        if self.batchTransformsEnabled:
+            self.scheduleFlush()
+        else:
+            self.view.render()
         # print "result:", result
         if not missingPaths:
             return ViewerResponse(ViewerStatus.OK, result)
@@ -590,11 +635,53 @@ class TreeViewer(object):
             folder.transform.SetMatrix(transform.GetMatrix())
         return path, len(folder.children()) == 0
 
+    def queueSetTransforms(self, commands):
+        """
+        Queue the poses of a list of settransform commands.  Only the latest
+        pose for each path is kept until the next flush.  Yields
+        (path, missingGeometry) for each command.
+        """
+        if not commands:
+            return
+        poses = posesFromDicts([command["transform"] for command in commands])
+        for command, pose in zip(commands, poses):
+            path = tuple(command["path"])
+            folder = self.getPathFolder(path)
+            self.pendingTransforms[path] = (folder, pose)
+            yield path, len(folder.children()) == 0
+
+    def scheduleFlush(self):
+        if self.flushTimer.singleShotTimer.isActive():
+            return
+        elapsed = time.time() - self.lastFlushTime
+        self.flushTimer.singleShot(max(0.0, 1.0 / self.flushTimer.targetFps - elapsed))
+
+    def flushPendingTransforms(self):
+        """
+        Apply all queued poses in a single pass and render once.
+        """
+        if not self.pendingTransforms:
+            return
+
+        folders, poses = zip(*self.pendingTransforms.values())
+        self.pendingTransforms = {}
+        poses = np.array(poses)
+        matrices = transformUtils.matricesFromPoses(poses[:,:3], poses[:,3:])
+
+        for folder, matrix in zip(folders, matrices.reshape(-1, 16)):
+            if not hasattr(folder, "transform"):
+                folder.transform = vtk.vtkTransform()
+            folder.transform.SetMatrix(matrix)
+
+        self.lastFlushTime = time.time()
+        self.view.render()
+
     def handleDeletePath(self, command):
         path = command["path"]
         item = self.getPathFolder(path)
         if item is not None:
-            om.removeFromObjectModel(item)
+            with om.batchUpdate():
+                om.removeFromObjectModel(item)
         return path
 
     def getRootFolder(self):
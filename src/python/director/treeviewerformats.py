@@ -0,0 +1,166 @@
+"""
+Encoders and decoders for the viewer2_comms_t payload formats understood by
+the tree viewer.
+
+treeviewer_json 1.0
+    The payload is a utf-8 encoded JSON document.
+
+treeviewer_msgpack 1.0
+    The payload is a msgpack document with the same structure as the JSON
+    format, except that any numeric array may be replaced by a map of the form
+
+        {"__ndarray__": True, "dtype": "<f4", "shape": [n, 3], "data": <bin>}
+
+    where data holds the raw little-endian, C-ordered array buffer.  The
+    supported dtypes are listed in MSGPACK_DTYPES.  Other integer arrays,
+    such as the int64 arrays numpy creates by default, are encoded as "<i4"
+    or "<u4" when their values fit.  Arrays are decoded with
+    np.frombuffer, so the array data is not copied while decoding.  This
+    format requires the msgpack python module, version 0.4.0 or newer.
+    Strings are always packed as msgpack str and array data as bin.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import numpy as np
+
+try:
+    import msgpack
+    HAVE_MSGPACK = True
+except ImportError:
+    HAVE_MSGPACK = False
+
+try:
+    _textType = unicode
+except NameError:
+    _textType = None
+
+
+JSON_FORMAT = "treeviewer_json"
+MSGPACK_FORMAT = "treeviewer_msgpack"
+
+MSGPACK_DTYPES = ("<f4", "<f8", "<u1", "<u4", "<i4")
+
+
+def _jsonDefault(obj):
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError("{!r} is not JSON serializable".format(obj))
+
+
+def encodeJson(data):
+    return bytearray(json.dumps(data, default=_jsonDefault), encoding='utf-8')
+
+
+def decodeJson(payload):
+    return json.loads(bytes(payload).decode())
+
+
+def _msgpackArrayDtype(obj):
+    '''
+    Returns the little-endian dtype used to encode the array, or raises
+    TypeError if the array can not be encoded.
+    '''
+    dtype = obj.dtype.newbyteorder("<")
+    if dtype.str in MSGPACK_DTYPES:
+        return dtype
+    if obj.dtype.kind in "iu":
+        dtype = np.dtype("<i4" if obj.dtype.kind == "i" else "<u4")
+        info = np.iinfo(dtype)
+        if not obj.size or (obj.min() >= info.min and obj.max() <= info.max):
+            return dtype
+    raise TypeError("Unsupported array dtype: {}".format(obj.dtype))
+
+
+def _msgpackDefault(obj):
+    if isinstance(obj, np.ndarray):
+        dtype = _msgpackArrayDtype(obj)
+        obj = np.ascontiguousarray(obj, dtype=dtype)
+        return {u"__ndarray__": True,
+                u"dtype": _toText(dtype.str),
+                u"shape": list(obj.shape),
+                u"data": obj.tobytes()}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError("{!r} is not msgpack serializable".format(obj))
+
+
+def _toText(obj):
+    '''
+    Returns obj with every python 2 str converted to unicode, so that
+    use_bin_type packs them as msgpack str instead of bin.  Does nothing on
+    python 3, where str is already text.
+    '''
+    if _textType is None:
+        return obj
+    if isinstance(obj, str):
+        return obj.decode("utf-8")
+    if isinstance(obj, dict):
+        return {_toText(key): _toText(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_toText(value) for value in obj]
+    return obj
+
+
+def _msgpackObjectHook(obj):
+    if obj.get("__ndarray__"):
+        if obj["dtype"] not in MSGPACK_DTYPES:
+            raise ValueError("Unsupported array dtype: {}".format(obj["dtype"]))
+        return np.frombuffer(obj["data"], dtype=obj["dtype"]).reshape(obj["shape"])
+    return obj
+
+
+def _getUnpackTextOptions():
+    # raw=False was added in msgpack 0.5.2 and encoding was removed in 1.0
+    if getattr(msgpack, "version", (0,)) >= (0, 5, 2):
+        return {"raw": False}
+    return {"encoding": "utf-8"}
+
+
+def encodeMsgpack(data):
+    return bytearray(msgpack.packb(_toText(data), default=_msgpackDefault, use_bin_type=True))
+
+
+def decodeMsgpack(payload):
+    return msgpack.unpackb(bytes(payload), object_hook=_msgpackObjectHook, **_UNPACK_TEXT_OPTIONS)
+
+
+ENCODERS = {(JSON_FORMAT, 1, 0): encodeJson}
+DECODERS = {(JSON_FORMAT, 1, 0): decodeJson}
+
+if HAVE_MSGPACK:
+    _UNPACK_TEXT_OPTIONS = _getUnpackTextOptions()
+    ENCODERS[(MSGPACK_FORMAT, 1, 0)] = encodeMsgpack
+    DECODERS[(MSGPACK_FORMAT, 1, 0)] = decodeMsgpack
+
+
+def getSupportedFormats():
+    '''
+    Returns a dict of format name to a list of supported "major.minor"
+    version strings.
+    '''
+    formats = {}
+    for name, major, minor in sorted(DECODERS):
+        formats.setdefault(name, []).append("{:d}.{:d}".format(major, minor))
+    return formats
+
+
+def isFormatSupported(format, versionMajor=None, versionMinor=None):
+    if versionMajor is None:
+        return any(name == format for name, _, _ in DECODERS)
+    return (format, versionMajor, versionMinor) in DECODERS
+
+
+def encode(data, format=JSON_FORMAT, versionMajor=1, versionMinor=0):
+    '''
+    Returns the payload bytearray for the given request or response data.
+    '''
+    return ENCODERS[(format, versionMajor, versionMinor)](data)
+
+
+def decode(payload, format=JSON_FORMAT, versionMajor=1, versionMinor=0):
+    '''
+    Returns the request or response data decoded from the given payload.
+    '''
+    return DECODERS[(format, versionMajor, versionMinor)](payload)
@@ -10,6 +10,7 @@ import numpy as np
 from lcm import LCM
 from robotlocomotion import viewer2_comms_t
 from director.thirdparty import transformations
+from director import treeviewerformats
 
 
 class ClientIDFactory(object):
@@ -25,13 +26,13 @@ class ClientIDFactory(object):
 CLIENT_ID_FACTORY = ClientIDFactory()
 
 
-def to_lcm(data):
+def to_lcm(data, format=treeviewerformats.JSON_FORMAT):
     msg = viewer2_comms_t()
     msg.utime = data["utime"]
-    msg.format = "treeviewer_json"
+    msg.format = format
     msg.format_version_major = 1
     msg.format_version_minor = 0
-    msg.data = bytearray(json.dumps(data), encoding='utf-8')
+    msg.data = treeviewerformats.encode(data, format)
     msg.num_bytes = len(msg.data)
     return msg
 
@@ -125,6 +126,21 @@ class Triad(BaseGeometry):
             "tube": self.tube
         }
 
+class PointCloud(BaseGeometry):
+    __slots__ = ["points", "channels"]
+    def __init__(self, points, channels=None):
+        self.points = points
+        self.channels = channels if channels is not None else {}
+
+    def serialize(self):
+        return {
+            "type": "pointcloud",
+            "points": np.asarray(self.points, dtype=np.float32),
+            "channels": {name: np.asarray(values, dtype=np.float32)
+                         for (name, values) in self.channels.items()}
+        }
+
+
 class PolyLine(BaseGeometry):
     def __init__(self, points, radius=0.01, closed=False,
                  start_head=False, end_head=False,
@@ -273,6 +289,7 @@ class CoreVisualizer(object):
         self.tree = LazyTree()
         self.queue = CommandQueue()
         self.publish_immediately = True
+        self.format = treeviewerformats.JSON_FORMAT
         self.lcm.subscribe(self._response_channel(),
                            self._handle_response)
         self.handler_thread = None
@@ -349,7 +366,7 @@ class CoreVisualizer(object):
     def publish(self):
         if not self.queue.isempty():
             data = self.serialize_queue()
-            msg = to_lcm(data)
+            msg = to_lcm(data, self.format)
             self.lcm.publish(self._request_channel(), msg.encode())
             self.queue.empty()
 
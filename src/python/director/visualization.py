@@ -613,6 +613,8 @@ class FrameSync(object):
 
     def __init__(self):
         self.frames = {}
+        self._frameIds = {}
+        self._relativeMatrices = {}
         self._blockCallbacks = False
         self._ids = itertools.count()
 
@@ -628,10 +630,16 @@ class FrameSync(object):
         callbackId = frame.connectFrameModified(self._onFrameModified)
 
         self.frames[frameId] = FrameSync.FrameData(
+            frameId=frameId,
+            key=id(frame),
             ref=weakref.ref(frame),
             baseTransform=self._computeBaseTransform(frame),
             callbackId=callbackId,
-            ignoreIncoming=ignoreIncoming)
+            ignoreIncoming=ignoreIncoming,
+            matrix=vtk.vtkMatrix4x4(),
+            transform=vtk.vtkTransform())
+        self._frameIds[id(frame)] = frameId
+        self._relativeMatrices.clear()
 
     def removeFrame(self, frame):
 
@@ -664,28 +672,51 @@ class FrameSync(object):
         return t
 
     def _removeFrameId(self, frameId):
-        del self.frames[frameId]
+        frameData = self.frames.pop(frameId)
+        if self._frameIds.get(frameData.key) == frameId:
+            del self._frameIds[frameData.key]
+        self._relativeMatrices.clear()
 
     def _findFrameId(self, frame):
-
-        for frameId, frameData in self.frames.items():
-
-            if frameData.ref() is None:
-                self._removeFrameId(frameId)
-            elif frameData.ref() is frame:
-                return frameId
-
-    def _moveFrame(self, frameId, modifiedFrameId):
-
-        frameData = self.frames[frameId]
-        modifiedFrameData = self.frames[modifiedFrameId]
-
-        t = vtk.vtkTransform()
-        t.PostMultiply()
-        t.Concatenate(frameData.baseTransform)
-        t.Concatenate(modifiedFrameData.baseTransform.GetLinearInverse())
-        t.Concatenate(modifiedFrameData.ref().transform)
-        frameData.ref().copyFrame(t)
+        '''
+        Frames are indexed by id().  The id of a deleted frame may be reused
+        before its entry is removed, so the weak reference is checked too.
+        '''
+        frameId = self._frameIds.get(id(frame))
+        frameData = self.frames.get(frameId)
+        if frameData is not None and frameData.ref() is frame:
+            return frameId
+
+    def _getRelativeMatrices(self, modifiedFrameId):
+        '''
+        Returns a list of (frameData, matrix) for the frames that move with
+        the modified frame, where matrix is inverse(modified base) * base, so
+        that a synced frame transform is the modified frame transform times
+        matrix.  The list is cached until the frames or base transforms
+        change.
+        '''
+        relativeMatrices = self._relativeMatrices.get(modifiedFrameId)
+        if relativeMatrices is None:
+
+            baseInverse = vtk.vtkMatrix4x4()
+            vtk.vtkMatrix4x4.Invert(self.frames[modifiedFrameId].baseTransform.GetMatrix(), baseInverse)
+
+            relativeMatrices = []
+            for frameId, frameData in self.frames.iteritems():
+                if frameId != modifiedFrameId:
+                    matrix = vtk.vtkMatrix4x4()
+                    vtk.vtkMatrix4x4.Multiply4x4(baseInverse, frameData.baseTransform.GetMatrix(), matrix)
+                    relativeMatrices.append((frameData, matrix))
+
+            self._relativeMatrices[modifiedFrameId] = relativeMatrices
+
+        return relativeMatrices
+
+    def _moveFrame(self, frameData, relativeMatrix, modifiedFrame):
+
+        vtk.vtkMatrix4x4.Multiply4x4(modifiedFrame.transform.GetMatrix(), relativeMatrix, frameData.matrix)
+        frameData.transform.SetMatrix(frameData.matrix)
+        frameData.ref().copyFrame(frameData.transform)
 
     def _onFrameModified(self, frame):
 
@@ -699,17 +730,17 @@ class FrameSync(object):
 
         if self.frames[modifiedFrameId].ignoreIncoming:
             self.frames[modifiedFrameId].baseTransform = self._computeBaseTransform(frame)
+            self._relativeMatrices.clear()
             return
 
         self._blockCallbacks = True
 
-        for frameId, frameData in self.frames.items():
+        for frameData, relativeMatrix in self._getRelativeMatrices(modifiedFrameId):
             if frameData.ref() is None:
-                self._removeFrameId(frameId)
-            elif frameId != modifiedFrameId:
-
-                #print '  ', self, 'moving:', self.frames[frameId].ref().getProperty('Name')
-                self._moveFrame(frameId, modifiedFrameId)
+                self._removeFrameId(frameData.frameId)
+            else:
+                #print '  ', self, 'moving:', frameData.ref().getProperty('Name')
+                self._moveFrame(frameData, relativeMatrix, frame)
 
         self._blockCallbacks = False
 
@@ -1,27 +1,86 @@
-from director.shallowCopy import shallowCopy
 import director.vtkAll as vtk
 from vtk.util import numpy_support
 import numpy as np
 
 
-def numpyToPolyData(pts, pointData=None, createVertexCells=True):
-
+def numpyToPolyData(pts, pointData=None, createVertexCells=True, copy=True):
+    '''
+    Returns a vtkPolyData with the given Nx3 points and a dict of point data
+    arrays.  If copy is False, contiguous float32/float64 points and
+    contiguous point data arrays are wrapped without copying.  The wrapped
+    numpy arrays are kept alive by the vtk arrays, and later changes to them
+    are visible in the returned polyData.
+    '''
     pd = vtk.vtkPolyData()
-    pd.SetPoints(getVtkPointsFromNumpy(pts.copy()))
+    pd.SetPoints(getVtkPointsFromNumpy(_asVtkPointsArray(pts, copy)))
 
     if pointData is not None:
         for key, value in pointData.iteritems():
-            addNumpyToVtk(pd, value.copy(), key)
+            value = np.array(value, order='C') if copy else np.ascontiguousarray(value)
+            addNumpyToVtk(pd, value, key)
 
     if createVertexCells:
-        f = vtk.vtkVertexGlyphFilter()
-        f.SetInputData(pd)
-        f.Update()
-        pd = shallowCopy(f.GetOutput())
+        pd.SetVerts(getVtkVertexCells(pts.shape[0]))
 
     return pd
 
 
+def _asVtkPointsArray(pts, copy):
+    if pts.dtype not in (np.float32, np.float64):
+        return np.ascontiguousarray(pts, dtype=np.float64)
+    elif copy:
+        return np.array(pts, order='C')
+    else:
+        return np.ascontiguousarray(pts)
+
+
+def getVtkVertexCells(numPoints):
+    '''
+    Returns a vtkCellArray with one vertex cell per point.  The cells are
+    built directly from a connectivity array instead of a vtkVertexGlyphFilter.
+    '''
+    cells = np.empty((numPoints, 2), dtype=numpy_support.ID_TYPE_CODE)
+    cells[:,0] = 1
+    cells[:,1] = np.arange(numPoints)
+    cellArray = vtk.vtkCellArray()
+    cellArray.SetCells(numPoints, getVtkIdTypeArrayFromNumpy(cells.ravel()))
+    return cellArray
+
+
+def updatePolyDataFromNumpy(polyData, pts, pointData=None, createVertexCells=True):
+    '''
+    Set the points and point data arrays of an existing polyData.  Arrays
+    whose size is unchanged are written in place, others are replaced.
+    Returns True if the existing point buffer was reused.
+    '''
+    numPoints = pts.shape[0]
+    points = polyData.GetPoints()
+    inPlace = bool(points) and points.GetNumberOfPoints() == numPoints
+
+    if inPlace:
+        numpy_support.vtk_to_numpy(points.GetData())[:] = pts
+        points.Modified()
+    else:
+        polyData.SetPoints(getVtkPointsFromNumpy(np.array(pts, order='C')))
+
+    if createVertexCells and polyData.GetNumberOfVerts() != numPoints:
+        polyData.SetVerts(getVtkVertexCells(numPoints))
+
+    if pointData is not None:
+        for key, value in pointData.iteritems():
+            vtkArray = polyData.GetPointData().GetArray(key)
+            if vtkArray and vtkArray.GetNumberOfTuples() == numPoints and vtkArray.GetNumberOfComponents() == (value.shape[1] if value.ndim > 1 else 1):
+                numpy_support.vtk_to_numpy(vtkArray)[:] = value
+                vtkArray.Modified()
+            else:
+                polyData.GetPointData().RemoveArray(key)
+                addNumpyToVtk(polyData, np.array(value, order='C'), key)
+                inPlace = False
+
+    polyData.Modified()
+    return inPlace
+
+
 def numpyToImageData(img, flip=True, vtktype=vtk.VTK_UNSIGNED_CHAR):
     if flip:
         img = np.flipud(img)
@@ -64,18 +123,29 @@ def getVtkPolyDataFromNumpyPoints(points):
     return numpyToPolyData(points)
 
 
-def getVtkFromNumpy(numpyArray):
+def _keepNumpyArrayAlive(vtkArray, numpyArray):
 
     def MakeCallback(numpyArray):
         def Closure(caller, event):
             closureArray = numpyArray
         return Closure
 
-    vtkArray = numpy_support.numpy_to_vtk(numpyArray)
     vtkArray.AddObserver('DeleteEvent', MakeCallback(numpyArray))
     return vtkArray
 
 
+def getVtkFromNumpy(numpyArray):
+
+    vtkArray = numpy_support.numpy_to_vtk(numpyArray)
+    return _keepNumpyArrayAlive(vtkArray, numpyArray)
+
+
+def getVtkIdTypeArrayFromNumpy(numpyArray):
+
+    vtkArray = numpy_support.numpy_to_vtkIdTypeArray(numpyArray)
+    return _keepNumpyArrayAlive(vtkArray, numpyArray)
+
+
 def addNumpyToVtk(dataObj, numpyArray, arrayName, arrayType='points'):
     assert arrayType in ('points', 'cells')
     vtkArray = getVtkFromNumpy(numpyArray)
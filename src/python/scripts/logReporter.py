@@ -6,6 +6,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import datetime as dt
 from director import lcmspy as spy
+from director import lcmlogcolumns
 import scipy.signal as sig
 
 def sizeof_fmt(num, suffix='B'):
@@ -30,33 +31,31 @@ class LCMLogAnalyzer(object):
         self.slidingWindowWidth = 100 
         self.movementThreshold = 0.4
 
+        # (channel, field path) pairs extracted from the log, see lcmlogcolumns
+        self.fields = [
+            ('EST_ROBOT_STATE', 'joint_velocity'),
+            ('ATLAS_BATTERY_DATA', 'remaining_charge_percentage'),
+            ('ATLAS_STATUS', 'pump_supply_pressure'),
+            ]
+
     def parseLog(self):
-        log = lcm.EventLog(self.logFile, 'r')
-        print 'Log size: ' + sizeof_fmt(log.size())
-        log.seek(0)
-        
-        while True:
-            event = log.read_next_event()
-            if not event:
-                break
-            timestamp = event.timestamp
-            if event.channel == 'EST_ROBOT_STATE':
-                msg = spy.decodeMessage(event.data)
-                self.jointVelocityTimes.append(timestamp)
-                self.jointVelocityNorms.append(np.linalg.norm(msg.joint_velocity))
-            elif event.channel == 'ATLAS_BATTERY_DATA':
-                msg = spy.decodeMessage(event.data)
-                self.batteryTimes.append(timestamp)
-                self.batteryPercentage.append(msg.remaining_charge_percentage)
-            elif event.channel == 'ATLAS_STATUS':
-                msg = spy.decodeMessage(event.data)
-                self.pressureTimes.append(timestamp)
-                self.pressureReadings.append(msg.pump_supply_pressure)
+        print 'Log size: ' + sizeof_fmt(os.path.getsize(self.logFile))
+
+        columns = lcmlogcolumns.LcmLogColumns(self.logFile, self.fields)
+        columns.update()
+
+        self.jointVelocityTimes = columns.getTimestamps('EST_ROBOT_STATE')
+        self.jointVelocities = columns.getColumn('EST_ROBOT_STATE', 'joint_velocity')
+        self.jointVelocityNorms = np.linalg.norm(self.jointVelocities, axis=1) if len(self.jointVelocities) else np.zeros(0)
+        self.batteryTimes = columns.getTimestamps('ATLAS_BATTERY_DATA')
+        self.batteryPercentage = columns.getColumn('ATLAS_BATTERY_DATA', 'remaining_charge_percentage')
+        self.pressureTimes = columns.getTimestamps('ATLAS_STATUS')
+        self.pressureReadings = columns.getColumn('ATLAS_STATUS', 'pump_supply_pressure')
 
         print 'parsed ' + str(len(self.jointVelocityNorms)) + ' robot states'
         print 'parsed ' + str(len(self.batteryPercentage)) + ' battery states'
         print 'parsed ' + str(len(self.pressureReadings)) + ' pump readings'
-        
+
     def movingAverage(self, x):
         N = self.slidingWindowWidth
         return np.convolve(x, np.ones((N,))/N)[(N-1):]
@@ -9,8 +9,10 @@ import json
 import re
 import select
 import numpy as np
+from collections import OrderedDict
 
 from director import lcmspy as spy
+from director import lcmlogindex
 
 
 VIDEO_LCM_URL = 'udpm://239.255.76.50:7650?ttl=1'
@@ -26,22 +28,127 @@ class FieldData(object):
         return 'FieldData(%s)' % ', '.join(['%s=%r' % (k,v) for k, v in self.__dict__.iteritems()])
 
 
-def getRecentUtimes(utimeMap, seconds):
-
-    utimes = np.array(utimeMap.keys())
-    if not len(utimes):
-        return None
-
-    utimes.sort()
-    endTime = utimes[-1]
-    startTime = max(0, endTime - seconds*1e6)
-    startIndex = utimes.searchsorted(startTime)
-    utimes = utimes[startIndex:]
-
-    if not len(utimes):
-        return None
+class UtimeIndex(object):
+    '''
+    A sorted index of video frames stored as parallel int64 arrays of
+    utime, file id and file offset.  Appends are amortized O(1), lookups
+    by utime are O(log n), and cropping to a time window moves a start
+    pointer.  The catalog thread appends while server threads take
+    snapshots, so access is guarded by a lock.
+    '''
+
+    def __init__(self, capacity=1024):
+        self.lock = threading.Lock()
+        self.filenames = []
+        self.fileIds = {}
+        self._utimes = np.zeros(capacity, dtype=np.int64)
+        self._fileIds = np.zeros(capacity, dtype=np.int64)
+        self._offsets = np.zeros(capacity, dtype=np.int64)
+        self.start = 0
+        self.end = 0
+
+    def __len__(self):
+        return self.end - self.start
+
+    @property
+    def utimes(self):
+        return self._utimes[self.start:self.end]
+
+    def getFileId(self, filename):
+        fileId = self.fileIds.get(filename)
+        if fileId is None:
+            fileId = self.fileIds[filename] = len(self.filenames)
+            self.filenames.append(filename)
+        return fileId
+
+    def _reserve(self, size):
+        if self.end + size <= len(self._utimes):
+            return
+        # drop cropped entries and grow the arrays
+        count = self.end - self.start
+        capacity = max(len(self._utimes), 2*(count + size))
+        for name in ('_utimes', '_fileIds', '_offsets'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=np.int64)
+            new[:count] = old[self.start:self.end]
+            setattr(self, name, new)
+        self.start, self.end = 0, count
+
+    def append(self, filename, utimes, offsets):
+        '''
+        Add frames of the given log file.  Frames are expected to arrive in
+        time order, frames older than the last indexed frame are merged.
+        '''
+        if not len(utimes):
+            return
 
-    return utimes
+        with self.lock:
+            fileId = self.getFileId(filename)
+            self._reserve(len(utimes))
+            newEnd = self.end + len(utimes)
+            isSorted = (np.all(np.diff(utimes) >= 0)
+                        and (self.end == self.start or utimes[0] >= self._utimes[self.end-1]))
+
+            self._utimes[self.end:newEnd] = utimes
+            self._fileIds[self.end:newEnd] = fileId
+            self._offsets[self.end:newEnd] = offsets
+            self.end = newEnd
+
+            if not isSorted:
+                order = np.argsort(self._utimes[self.start:self.end], kind='mergesort') + self.start
+                for name in ('_utimes', '_fileIds', '_offsets'):
+                    array = getattr(self, name)
+                    array[self.start:self.end] = array[order]
+
+    def crop(self, timeWindow):
+        '''
+        Discard frames older than timeWindow seconds before the last frame.
+        '''
+        with self.lock:
+            if self.end == self.start:
+                return
+            cropTime = self._utimes[self.end-1] - timeWindow*1e6
+            self.start += int(self.utimes.searchsorted(cropTime))
+
+    def getRecentUtimes(self, seconds):
+        '''
+        Returns a copy of the utimes within seconds of the last frame, or
+        None if there are no frames.
+        '''
+        with self.lock:
+            utimes = self.utimes
+            if not len(utimes):
+                return None
+            startIndex = utimes.searchsorted(utimes[-1] - seconds*1e6)
+            return utimes[startIndex:].copy()
+
+    def copy(self):
+        with self.lock:
+            index = UtimeIndex(capacity=max(1, len(self)))
+            index.filenames = list(self.filenames)
+            index.fileIds = dict(self.fileIds)
+            index.end = len(self)
+            index._utimes[:index.end] = self.utimes
+            index._fileIds[:index.end] = self._fileIds[self.start:self.end]
+            index._offsets[:index.end] = self._offsets[self.start:self.end]
+            return index
+
+    def findIndex(self, utime):
+        '''
+        Returns the index of the first frame at or after utime, clamped to
+        the last frame.
+        '''
+        utimes = self.utimes
+        return min(int(utimes.searchsorted(utime)), len(utimes) - 1)
+
+    def lookup(self, utime):
+        '''
+        Returns (filename, offset) of the frame at utime.
+        '''
+        i = self.start + self.findIndex(utime)
+        if self._utimes[i] != utime:
+            raise KeyError(utime)
+        return self.filenames[self._fileIds[i]], int(self._offsets[i])
 
 
 class LCMPoller(object):
@@ -56,45 +163,161 @@ class LCMPoller(object):
             self.lc.handle()
 
 
-class LogLookup(object):
+class FrameCache(object):
+    '''
+    An LRU cache of decoded frames keyed by utime.  The size of a frame is
+    estimated from the size of its encoded message, and the least recently
+    used frames are evicted when the total exceeds maxBytes.
+    '''
+
+    def __init__(self, maxBytes=256*1024*1024):
+        self.maxBytes = maxBytes
+        self.numBytes = 0
+        self.frames = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __contains__(self, utime):
+        return utime in self.frames
+
+    def get(self, utime):
+        with self.lock:
+            frame = self.frames.pop(utime, None)
+            if frame is not None:
+                self.frames[utime] = frame
+            return frame
+
+    def add(self, utime, frame, numBytes):
+        with self.lock:
+            if utime in self.frames:
+                return
+            self.frames[utime] = (frame, numBytes)
+            self.numBytes += numBytes
+            while self.numBytes > self.maxBytes and len(self.frames) > 1:
+                _, (_, evictedBytes) = self.frames.popitem(last=False)
+                self.numBytes -= evictedBytes
 
-    def __init__(self):
-        self.utimeMap = None
-        self.logs = {}
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.numBytes = 0
 
-    def setUtimeMap(self, utimeMap):
-        self.utimeMap = utimeMap
 
-    def getImage(self, utime):
-        filename, filepos = self.utimeMap[utime]
+class LogLookup(object):
 
-        log = self.logs.get(filename)
+    def __init__(self, frameCache=None, maxOpenLogs=8):
+        self.utimeIndex = None
+        self.frameCache = frameCache if frameCache is not None else FrameCache()
+        self.maxOpenLogs = maxOpenLogs
+        self.logs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def setUtimeIndex(self, utimeIndex):
+        self.utimeIndex = utimeIndex
+
+    def getLog(self, filename):
+        '''
+        Returns an open log, keeping at most maxOpenLogs logs open.
+        '''
+        log = self.logs.pop(filename, None)
         if log is None:
             log = lcm.EventLog(filename, 'r')
-            self.logs[filename] = log
+            while len(self.logs) >= self.maxOpenLogs:
+                _, evicted = self.logs.popitem(last=False)
+                evicted.close()
+        self.logs[filename] = log
+        return log
+
+    def getImage(self, utime):
+        cached = self.frameCache.get(utime)
+        if cached is not None:
+            return cached[0]
+
+        with self.lock:
+            filename, filepos = self.utimeIndex.lookup(utime)
+            log = self.getLog(filename)
+            log.seek(filepos)
+            event = log.read_next_event()
 
-        log.seek(filepos)
-        event = log.read_next_event()
         msg = spy.decodeMessage(event.data)
 
         if hasattr(msg, 'images'):
             msg = msg.images[0]
+
+        self.frameCache.add(utime, (msg, filename), len(event.data))
         return msg, filename
 
     def closeLogs(self):
-        for log in self.logs.values():
-            log.close()
-        self.logs = {}
+        with self.lock:
+            for log in self.logs.values():
+                log.close()
+            self.logs = OrderedDict()
+
+
+class FramePrefetcher(object):
+    '''
+    A thread that decodes frames into the frame cache of a LogLookup ahead
+    of playback.  request() replaces the list of utimes to prefetch, so
+    the prefetcher follows the current play position and direction.
+    '''
+
+    def __init__(self, logLookup):
+        self.logLookup = logLookup
+        self.pending = []
+        self.condition = threading.Condition()
+        self.shouldStop = False
+        self.thread = None
+
+    def start(self):
+        self.shouldStop = False
+        self.thread = threading.Thread(target=self.mainLoop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.shouldStop = True
+            self.condition.notify()
+        self.thread.join()
+
+    def request(self, utimes):
+        with self.condition:
+            self.pending = [utime for utime in utimes if utime not in self.logLookup.frameCache]
+            self.condition.notify()
+
+    def requestFromIndex(self, utimes, index, step, numFrames):
+        '''
+        Prefetch numFrames frames of utimes starting after index and
+        advancing by step frames.
+        '''
+        step = int(step) or 1
+        stop = len(utimes) if step > 0 else -1
+        indices = range(index + step, stop, step)[:numFrames]
+        self.request([utimes[i] for i in indices])
+
+    def mainLoop(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.shouldStop:
+                    self.condition.wait()
+                if self.shouldStop:
+                    return
+                utime = self.pending.pop(0)
+            try:
+                self.logLookup.getImage(utime)
+            except Exception as e:
+                print 'prefetch failed for utime %d: %s' % (utime, e)
 
 
 class PlayThread(object):
 
-    def __init__(self, utimes, logLookup, speed):
+    def __init__(self, utimes, logLookup, speed, prefetcher=None):
         self.fps = 60
         self.shouldStop = False
         self.utimes = utimes
         self.logLookup = logLookup
         self.speed = speed
+        self.prefetcher = prefetcher
+        self.numPrefetchFrames = 30
         self.lc = lcm.LCM(VIDEO_LCM_URL)
 
     def start(self):
@@ -107,6 +330,16 @@ class PlayThread(object):
         self.shouldStop = True
         self.thread.join()
 
+    def prefetch(self, startTime):
+        '''
+        Prefetch the frames that will be played in the next
+        numPrefetchFrames ticks at the current speed.
+        '''
+        elapsed = time.time() - startTime + np.arange(1, self.numPrefetchFrames + 1) / float(self.fps)
+        indices = self.utimes.searchsorted(self.utimes[0] + (1e6 * elapsed * self.speed).astype(np.int64))
+        indices = np.unique(indices[indices < len(self.utimes)])
+        self.prefetcher.request(self.utimes[indices])
+
     def mainLoop(self):
         startTime = time.time()
 
@@ -119,6 +352,9 @@ class PlayThread(object):
             if utimeIndex == len(self.utimes):
                 break
 
+            if self.prefetcher:
+                self.prefetch(startTime)
+
             utimeRequest = self.utimes[utimeIndex]
             image, filename = self.logLookup.getImage(utimeRequest)
 
@@ -131,14 +367,17 @@ class PlayThread(object):
 
 class ServerThread(object):
 
-    def __init__(self, sharedUtimeMap):
+    def __init__(self, sharedUtimeIndex):
 
-        self.sharedUtimeMap = sharedUtimeMap
+        self.sharedUtimeIndex = sharedUtimeIndex
         self.utimes = None
         self.playbackThread = None
         self.syncThread = None
         self.timeWindow = 60
         self.logLookup = LogLookup()
+        self.prefetcher = FramePrefetcher(self.logLookup)
+        self.numPrefetchFrames = 30
+        self.lastFrameIndex = None
         self.lc = lcm.LCM(VIDEO_LCM_URL)
         self.lc.subscribe('VIDEO_PLAYBACK_CONTROL', self.onControlMessage)
 
@@ -147,10 +386,12 @@ class ServerThread(object):
         self.thread.daemon = True
         self.shouldStop = False
         self.thread.start()
+        self.prefetcher.start()
 
     def stop(self):
         self.shouldStop = True
         self.thread.join()
+        self.prefetcher.stop()
 
     def getUtimeIndex(self, data):
 
@@ -164,8 +405,8 @@ class ServerThread(object):
 
         if self.utimes is None:
 
-            self.logLookup.setUtimeMap(dict(self.sharedUtimeMap))
-            self.utimes = getRecentUtimes(self.logLookup.utimeMap, seconds=self.timeWindow)
+            self.logLookup.setUtimeIndex(self.sharedUtimeIndex.copy())
+            self.utimes = self.logLookup.utimeIndex.getRecentUtimes(seconds=self.timeWindow)
 
             if self.utimes is None:
                 print 'no utimes cataloged'
@@ -182,10 +423,18 @@ class ServerThread(object):
 
         self.lc.publish('VIDEO_PLAYBACK_IMAGE', image.encode())
 
+        # prefetch ahead in the direction and at the rate of scrubbing
+        utimeIndex = int(utimeIndex)
+        step = utimeIndex - self.lastFrameIndex if self.lastFrameIndex is not None else 1
+        self.prefetcher.requestFromIndex(self.utimes, utimeIndex, step, self.numPrefetchFrames)
+        self.lastFrameIndex = utimeIndex
+
 
     def onResume(self, data):
         self.stopPlaybackThread()
+        self.prefetcher.request([])
         self.utimes = None
+        self.lastFrameIndex = None
         self.logLookup.closeLogs()
         return
 
@@ -200,7 +449,7 @@ class ServerThread(object):
 
         startIndex = self.getUtimeIndex(data)
         playbackUtimes = self.utimes[startIndex:]
-        self.playbackThread = PlayThread(playbackUtimes, self.logLookup, speed=data.speed)
+        self.playbackThread = PlayThread(playbackUtimes, self.logLookup, speed=data.speed, prefetcher=self.prefetcher)
         self.playbackThread.start()
 
 
@@ -215,7 +464,7 @@ class ServerThread(object):
 
 
     def onLogSync(self):
-        self.syncThread = LogSyncThread(self.sharedUtimeMap)
+        self.syncThread = LogSyncThread(self.sharedUtimeIndex)
         self.syncThread.start()
 
 
@@ -248,9 +497,9 @@ class ServerThread(object):
 
 class LogSyncThread(object):
 
-    def __init__(self, sharedUtimeMap):
+    def __init__(self, sharedUtimeIndex):
 
-        self.sharedUtimeMap = sharedUtimeMap
+        self.sharedUtimeIndex = sharedUtimeIndex
         self.utimes = None
         self.logLookup = LogLookup()
         self.lastPublishTime = time.time()
@@ -282,20 +531,15 @@ class LogSyncThread(object):
 
     def onFrameRequest(self, utimeRequest):
 
-        if self.logLookup.utimeMap is None:
-
-            self.logLookup.setUtimeMap(dict(self.sharedUtimeMap))
-            assert len(self.logLookup.utimeMap)
+        if self.logLookup.utimeIndex is None:
 
-            self.utimes = np.array(self.logLookup.utimeMap.keys())
-            self.utimes.sort()
+            self.logLookup.setUtimeIndex(self.sharedUtimeIndex.copy())
+            assert len(self.logLookup.utimeIndex)
 
+            self.utimes = self.logLookup.utimeIndex.utimes
 
-        requestIndex = self.utimes.searchsorted(utimeRequest)
-
-        if requestIndex >= len(self.utimes):
-            requestIndex = len(self.utimes)-1
 
+        requestIndex = self.logLookup.utimeIndex.findIndex(utimeRequest)
         utimeFrame =  self.utimes[requestIndex]
 
 
@@ -331,7 +575,7 @@ class CatalogThread(object):
         self.pruneEnabled = True
         self.maxNumberOfFiles = 30
         self.cropTimeWindow = 60*30
-        self.utimeMap = {}
+        self.utimeIndex = UtimeIndex()
         self.catalog = {}
 
 
@@ -363,18 +607,23 @@ class CatalogThread(object):
 
 
     def updateLogInfo(self, filename):
-
+        '''
+        Index the video frames appended to the log file since the last
+        update.  The file size is checked first, and only the event headers
+        of the new bytes are parsed.
+        '''
         fieldData = self.catalog.get(filename)
 
         if not fieldData:
             print 'discovered new file:', filename
-            fieldData = FieldData(filename=filename, fileSize=0, lastFilePos=0, channelTypes={})
+            fieldData = FieldData(filename=filename, fileSize=0, lastFilePos=0, channelIds={})
             self.catalog[filename] = fieldData
-            self.cropUtimeMap(self.utimeMap, self.cropTimeWindow)
+            self.utimeIndex.crop(self.cropTimeWindow)
 
-
-        log = lcm.EventLog(filename, 'r')
-        fileSize = log.size()
+        try:
+            fileSize = os.path.getsize(filename)
+        except OSError:
+            return
 
         # if the log file is the same size as the last time it was inspected
         # then there is no more work to do, return.
@@ -383,34 +632,13 @@ class CatalogThread(object):
 
         fieldData.fileSize = fileSize
 
-        # seek to the last processed event, if one exists, then read past it
-        if fieldData.lastFilePos > 0:
-            log.seek(fieldData.lastFilePos)
-            event = log.read_next_event()
+        events, fieldData.lastFilePos = lcmlogindex.scanEvents(filename, startOffset=fieldData.lastFilePos,
+                                                               channelIds=fieldData.channelIds, endOffset=fileSize)
 
-
-        while True:
-
-            filepos = log.tell()
-            event = log.read_next_event()
-            if not event:
-                break
-
-            fieldData.lastFilePos = filepos
-            timestamp = event.timestamp
-            channel = event.channel
-
-            if channel == self.videoChannel:
-                self.utimeMap[timestamp] = (filename, filepos)
-
-
-            # maintain a catalog of channelName->messageType
-            #if channel not in fieldData.channelTypes:
-            #    messageClass = spy.getMessageClass(event.data)
-            #    fieldData.channelTypes[channel] = messageClass
-
-
-        log.close()
+        videoChannelId = fieldData.channelIds.get(self.videoChannel)
+        if videoChannelId is not None:
+            frames = events[events['channel'] == videoChannelId]
+            self.utimeIndex.append(filename, frames['utime'], frames['offset'])
 
 
     @staticmethod
@@ -444,20 +672,6 @@ class CatalogThread(object):
         return logFiles
 
 
-    @staticmethod
-    def cropUtimeMap(utimeMap, timeWindow):
-
-        if not len(utimeMap):
-            return
-
-        utimes = getRecentUtimes(utimeMap, timeWindow)
-        cropTime = utimes[0]
-
-        for utime in utimeMap.keys():
-            if utime < cropTime:
-                del utimeMap[utime]
-
-
 def main():
 
     try:
@@ -472,7 +686,7 @@ def main():
     catalogThread.start()
 
 
-    serverThread = ServerThread(catalogThread.utimeMap)
+    serverThread = ServerThread(catalogThread.utimeIndex)
     serverThread.start()
 
     try:
@@ -0,0 +1,127 @@
+import gc
+import time
+import new
+from weakref import ref
+
+from director import callbacks
+
+
+class ReferenceCallbackRegistry(callbacks.CallbackRegistry):
+    '''
+    The previous dispatch: validate the signal, copy the callbacks dict and
+    check the weak reference of each callback and build a bound method for
+    each call.
+    '''
+
+    def process(self, s, *args, **kwargs):
+        self._check_signal(s)
+        for cid, proxy in self.callbacks[s].items():
+            if proxy.inst is not None and proxy.inst() is None:
+                del self.callbacks[s][cid]
+            elif proxy.inst is not None:
+                new.instancemethod(proxy.func, proxy.inst(), proxy.klass)(*args, **kwargs)
+            else:
+                proxy.func(*args, **kwargs)
+
+
+class Receiver(object):
+
+    def __init__(self):
+        self.calls = []
+
+    def onSignal(self, *args):
+        self.calls.append(args)
+
+
+def testDispatch():
+
+    registry = callbacks.CallbackRegistry(['a', 'b'])
+    calls = []
+
+    receiver = Receiver()
+    cidMethod = registry.connect('a', receiver.onSignal)
+    cidFunc = registry.connect('a', lambda *args: calls.append(args))
+    assert registry.connect('a', receiver.onSignal) == cidMethod
+
+    registry.process('a', 1, 2)
+    registry.process('b', 3)
+    assert receiver.calls == [(1, 2)] and calls == [(1, 2)]
+
+    try:
+        registry.process('c')
+    except ValueError:
+        pass
+    else:
+        raise Exception('expected ValueError')
+
+    # a callback that disconnects another still sees the snapshot semantics
+    registry.connect('b', lambda *args: registry.disconnect(cidFunc))
+    registry.connect('b', lambda *args: calls.append(args))
+    registry.process('b', 4)
+    assert calls == [(1, 2), (4,)]
+    registry.process('a', 5)
+    assert calls == [(1, 2), (4,)] and receiver.calls == [(1, 2), (5,)]
+
+    # dead bound methods are removed without a dispatch
+    receiverRef = ref(receiver)
+    del receiver
+    gc.collect()
+    assert receiverRef() is None
+    assert not registry.callbacks['a']
+    assert registry.getCallbacks('a') == []
+    registry.process('a', 6)
+
+
+def testStatistics():
+
+    registry = callbacks.CallbackRegistry(['a'])
+    registry.connect('a', lambda: None)
+
+    callbacks.setStatisticsEnabled(True)
+    try:
+        callbacks.resetStatistics()
+        for i in xrange(10):
+            registry.process('a')
+        count, seconds = callbacks.getStatistics()['a']
+        assert count == 10 and seconds >= 0.0
+        callbacks.printStatistics()
+    finally:
+        callbacks.setStatisticsEnabled(False)
+
+    registry.process('a')
+    assert callbacks.getStatistics() == {}
+
+
+def timeDispatch(registryClass, numCallbacks, numCalls):
+    registry = registryClass(['a'])
+    receivers = [Receiver() for i in xrange(numCallbacks)]
+    for receiver in receivers:
+        registry.connect('a', receiver.onSignal)
+
+    startTime = time.time()
+    for i in xrange(numCalls):
+        registry.process('a', i)
+    elapsed = time.time() - startTime
+
+    assert all(len(receiver.calls) == numCalls for receiver in receivers)
+    return elapsed
+
+
+def benchmark():
+
+    numCalls = 50000
+    print '%10s %12s %12s %8s' % ('callbacks', 'reference s', 'current s', 'speedup')
+    for numCallbacks in (0, 1, 3, 10):
+        referenceTime = timeDispatch(ReferenceCallbackRegistry, numCallbacks, numCalls)
+        currentTime = timeDispatch(callbacks.CallbackRegistry, numCallbacks, numCalls)
+        print '%10d %12.3f %12.3f %8.2f' % (numCallbacks, referenceTime, currentTime, referenceTime / currentTime)
+
+
+def main():
+    testDispatch()
+    testStatistics()
+    benchmark()
+
+
+if __name__ == '__main__':
+    main()
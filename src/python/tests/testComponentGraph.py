@@ -0,0 +1,174 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import __builtin__
+
+from director import componentgraph
+from director.componentgraph import ComponentFactory, LazyModule, ImportTimer
+from director.fieldcontainer import FieldContainer
+
+
+initialized = []
+
+
+class TestFactory(object):
+
+    def getComponents(self):
+
+        components = {
+            'Base' : [],
+            'Panel' : ['Base'],
+            'Demo' : ['Base'],
+            'DemoPanel' : ['Demo'],
+            'Extra' : []}
+
+        disabledComponents = ['Extra']
+
+        return components, disabledComponents
+
+    def getLazyComponents(self):
+        return ['Demo', 'DemoPanel']
+
+    def initBase(self, fields):
+        initialized.append('Base')
+        return FieldContainer(base='base')
+
+    def initPanel(self, fields):
+        initialized.append('Panel')
+        return FieldContainer(panel=fields.base + ' panel')
+
+    def initDemo(self, fields):
+        initialized.append('Demo')
+        import json
+        return FieldContainer(demo=fields.base + ' demo')
+
+    def initDemoPanel(self, fields):
+        initialized.append('DemoPanel')
+        return FieldContainer(demoPanel=fields.demo + ' panel')
+
+    def initExtra(self, fields):
+        initialized.append('Extra')
+
+
+class EagerDependsOnLazyFactory(object):
+
+    def getComponents(self):
+        components = {
+            'Lazy' : [],
+            'Eager' : ['Lazy']}
+        return components, []
+
+    def getLazyComponents(self):
+        return ['Lazy']
+
+    def initLazy(self, fields):
+        initialized.append('Lazy')
+        return FieldContainer(lazy='lazy')
+
+    def initEager(self, fields):
+        initialized.append('Eager')
+        return FieldContainer(eager=fields.lazy + ' eager')
+
+
+def testLazyComponents():
+
+    factory = ComponentFactory()
+    factory.register(TestFactory)
+
+    fields = factory.construct()
+    assert initialized == ['Base', 'Panel']
+    assert fields.panel == 'base panel'
+    assert not hasattr(fields, 'demo')
+
+    assert factory.requireComponent('DemoPanel').demoPanel == 'base demo panel'
+    assert initialized == ['Base', 'Panel', 'Demo', 'DemoPanel']
+    factory.requireComponent('Demo')
+    assert initialized == ['Base', 'Panel', 'Demo', 'DemoPanel']
+
+    try:
+        factory.requireComponent('Extra')
+    except Exception:
+        pass
+    else:
+        raise Exception('expected an exception for a disabled component')
+
+    assert factory.componentTimes.keys() == ['Base', 'Panel', 'Demo', 'DemoPanel']
+    for importSeconds, initSeconds in factory.componentTimes.values():
+        assert importSeconds >= 0.0 and initSeconds >= 0.0
+
+    # a lazy component that an eager component depends on is initialized by construct
+    del initialized[:]
+    factory = ComponentFactory()
+    factory.register(EagerDependsOnLazyFactory)
+    fields = factory.construct()
+    assert initialized == ['Lazy', 'Eager']
+    assert fields.eager == 'lazy eager'
+    factory.requireComponent('Lazy')
+    assert initialized == ['Lazy', 'Eager']
+
+    # it stays lazy when the eager component is disabled
+    del initialized[:]
+    factory = ComponentFactory()
+    factory.register(EagerDependsOnLazyFactory)
+    factory.construct(dict(useEager=False))
+    assert initialized == []
+
+
+def testLazyModule():
+
+    module = LazyModule('director.thirdparty.toposort')
+    assert 'imported' not in repr(module)
+    assert module.toposort_flatten({'b': set(['a'])}) == ['a', 'b']
+    assert 'imported' in repr(module)
+    assert 'import director.thirdparty.toposort' in componentgraph.getComponentTimes()
+
+    componentgraph.printComponentTimes()
+
+
+def writeSlowModule(dirName, moduleName, seconds):
+    with open(os.path.join(dirName, moduleName + '.py'), 'w') as f:
+        f.write('import time\ntime.sleep(%f)\n' % seconds)
+
+
+def testImportTimer():
+
+    tempDir = tempfile.mkdtemp()
+    sys.path.insert(0, tempDir)
+    try:
+        for name in ('slow_nested', 'slow_thread'):
+            writeSlowModule(tempDir, name, 0.1)
+
+        builtinImport = __builtin__.__import__
+        outer = ImportTimer()
+        with outer:
+            # imports on other threads are not counted
+            thread = threading.Thread(target=lambda: __import__('slow_thread'))
+            thread.start()
+            thread.join()
+
+            # a nested timer is excluded from the enclosing timer
+            inner = ImportTimer()
+            with inner:
+                __import__('slow_nested')
+
+        assert __builtin__.__import__ is builtinImport
+        assert inner.seconds >= 0.1 and inner.elapsed >= inner.seconds
+        assert outer.seconds < 0.05
+        assert outer.elapsed < 0.15
+
+    finally:
+        sys.path.remove(tempDir)
+        shutil.rmtree(tempDir)
+
+
+def main():
+    testLazyComponents()
+    testLazyModule()
+    testImportTimer()
+
+
+if __name__ == '__main__':
+    main()
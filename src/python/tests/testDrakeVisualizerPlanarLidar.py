@@ -0,0 +1,72 @@
+import numpy as np
+
+import bot_core as lcmbot
+
+from director.consoleapp import ConsoleApp
+from director import drakevisualizer
+from director import vtkNumpy as vnp
+
+
+def makeBoxLinkMessage(linkName, robotNum):
+    geom = lcmbot.viewer_geometry_data_t()
+    geom.type = geom.BOX
+    geom.position = [0, 0, 0]
+    geom.quaternion = [1, 0, 0, 0]
+    geom.color = [1, 0, 0, 1]
+    geom.string_data = ''
+    geom.float_data = [1.0, 0.5, 0.5]
+    geom.num_float_data = 3
+
+    link = lcmbot.viewer_link_data_t()
+    link.name = linkName
+    link.robot_num = robotNum
+    link.num_geom = 1
+    link.geom = [geom]
+
+    msg = lcmbot.viewer_load_robot_t()
+    msg.num_links = 1
+    msg.link = [link]
+    return msg
+
+
+def makeScanMessage(numRanges):
+    msg = lcmbot.planar_lidar_t()
+    msg.ranges = [1.0] * numRanges
+    msg.ranges[0] = -1.0
+    msg.nranges = numRanges
+    msg.intensities = []
+    msg.nintensities = 0
+    msg.rad0 = 0.0
+    msg.radstep = 0.01
+    return msg
+
+
+def testScanDoesNotReplaceMesh():
+
+    drakeVis = drakevisualizer.DrakeVisualizer(view)
+    drakeVis.onViewerLoadRobot(makeBoxLinkMessage('scanner', 1))
+
+    link = drakeVis.getLink(1, 'scanner')
+    mesh = link.geometry[0].polyDataItem.polyData
+    meshPoints = vnp.getNumpyFromVtk(mesh, 'Points').copy()
+    numPolys = mesh.GetNumberOfPolys()
+    assert numPolys > 0
+
+    for numRanges in (100, 50):
+        drakeVis.onPlanarLidar(makeScanMessage(numRanges), 'DRAKE_PLANAR_LIDAR_1_scanner')
+
+        # the scan has its own geometry, the link mesh is unchanged
+        assert link.scanGeometry is not None and link.scanGeometry is not link.geometry[0]
+        assert link.scanGeometry.polyDataItem.getProperty('Name') == 'scanner planar lidar'
+        assert link.scanGeometry.polyDataItem.polyData.GetNumberOfPoints() == numRanges - 1
+        assert len(link.geometry) == 2
+        assert mesh.GetNumberOfPolys() == numPolys
+        assert np.array_equal(vnp.getNumpyFromVtk(mesh, 'Points'), meshPoints)
+
+    drakeVis.disable()
+
+
+app = ConsoleApp()
+view = app.createView()
+
+testScanDoesNotReplaceMesh()
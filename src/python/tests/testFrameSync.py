@@ -8,6 +8,7 @@ from director import applogic
 from director import vtkAll as vtk
 
 import weakref
+import numpy as np
 
 
 
@@ -149,6 +150,32 @@ def main():
     assert t2.GetPosition() == (20.0, 5.0, 10.0)
 
 
+    # test rotations and a frame that ignores incoming changes
+    t3 = vtk.vtkTransform()
+    f3 = vis.FrameItem('frame 3', t3, view=None)
+    om.addToObjectModel(f3)
+
+    frameSync = vis.FrameSync()
+    frameSync.addFrame(f1)
+    frameSync.addFrame(f2)
+    frameSync.addFrame(f3, ignoreIncoming=True)
+
+    t1.RotateZ(90)
+    t1.Modified()
+    assert np.allclose(t2.GetPosition(), (-5.0, 20.0, 10.0))
+    assert np.allclose(t2.GetOrientation(), (0.0, 0.0, 90.0))
+    assert np.allclose(t3.GetPosition(), (0.0, 0.0, 0.0))
+
+    t3.Translate(1,0,0)
+    t3.Modified()
+    assert np.allclose(t2.GetPosition(), (-5.0, 20.0, 10.0))
+
+    t2.Translate(0,0,1)
+    t2.Modified()
+    assert np.allclose(t1.GetPosition(), (0.0, 0.0, 21.0))
+    assert np.allclose(t3.GetPosition(), (0.0, 1.0, 1.0))
+
+
     sys.exit(0)
 
 if __name__ == '__main__':
@@ -0,0 +1,63 @@
+import numpy as np
+
+from director import geometryencoder
+from director import meshmanager
+from director import filterUtils
+from director import vtkNumpy as vnp
+from director.debugVis import DebugData
+
+
+def newMesh():
+    d = DebugData()
+    d.addSphere((0.5, 0.0, 1.0), radius=0.2)
+    d.addArrow((0, 0, 0), (0, 0, 0.3))
+    return filterUtils.computeNormals(d.getPolyData())
+
+
+def getTriangles(polyData):
+    polys = vnp.numpy_support.vtk_to_numpy(polyData.GetPolys().GetData())
+    return polys.reshape(-1, 4)[:,1:]
+
+
+def testMeshCodec():
+
+    polyData = filterUtils.triangulatePolyData(newMesh())
+    points = vnp.getNumpyFromVtk(polyData, 'Points')
+    extent = points.max(axis=0) - points.min(axis=0)
+
+    for bits in (0, 8, 16, 32):
+        for compression in (None, 'zlib'):
+            data = geometryencoder.encodeMesh(polyData, quantizationBits=bits, compression=compression)
+            decoded = geometryencoder.decodeMesh(data)
+
+            assert decoded.GetNumberOfPoints() == polyData.GetNumberOfPoints()
+            assert decoded.GetNumberOfPolys() == polyData.GetNumberOfPolys()
+            assert (getTriangles(decoded) == getTriangles(polyData)).all()
+
+            tolerance = extent / (2**bits - 1) if bits else 1e-6
+            error = np.abs(vnp.getNumpyFromVtk(decoded, 'Points') - points)
+            assert (error <= tolerance).all()
+
+            for arrayName in ('Normals', 'RGB255'):
+                assert np.allclose(vnp.getNumpyFromVtk(decoded, arrayName),
+                                   vnp.getNumpyFromVtk(polyData, arrayName))
+
+    legacySize = len(geometryencoder.encodePolyData(polyData))
+    compactSize = len(geometryencoder.encodeMesh(polyData))
+    print 'legacy encoding: %d bytes, mesh codec: %d bytes' % (legacySize, compactSize)
+    assert compactSize < legacySize
+
+
+def testMeshManagerDeduplication():
+
+    manager = meshmanager.MeshManager()
+    meshId = manager.add(newMesh())
+    assert manager.add(newMesh()) == meshId
+
+    d = DebugData()
+    d.addCube((1, 1, 1), (0, 0, 0))
+    assert manager.add(d.getPolyData()) != meshId
+
+
+testMeshCodec()
+testMeshManagerDeduplication()
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from director import ikcache
+from director import ikconstraints
+from director import ikparameters
+from director import transformUtils
+from director.fieldcontainer import FieldContainer
+
+
+def makeFields(targetPosition, seedPose):
+
+    frame = transformUtils.frameFromPositionAndRPY(targetPosition, [0, 0, 90])
+    constraints = [
+        ikconstraints.PositionConstraint(linkName='hand', referenceFrame=frame),
+        ikconstraints.PostureConstraint(postureName='q_start', joints=['a', 'b'], jointsLowerBound=[0, 0], jointsUpperBound=[0, 0]),
+        ]
+
+    options = ikparameters.IkParameters()
+    options.setToDefaults()
+
+    return FieldContainer(
+        utime=0,
+        poses=dict(q_start=[0.1, 0.2, 0.3], q_nom=[0.0, 0.0, 0.0], q_seed=list(seedPose)),
+        constraints=constraints,
+        seedPose='q_seed',
+        nominalPose='q_nom',
+        endPose='',
+        jointNames=['a', 'b', 'c'],
+        jointLimits=dict(a=[-1, 1], b=[-1, 1], c=[-1, 1]),
+        positionCosts=[1, 1, 1],
+        affordances='[]',
+        options=options,
+        )
+
+
+def testCache(cacheFile):
+
+    cache = ikcache.IkSolutionCache(maxSize=2, filename=cacheFile, saveDelay=None)
+    keys = cache.getKeys(makeFields([1, 0, 0], [0, 0, 0]))
+    assert cache.lookup(keys) is None
+    cache.add(keys, [0.5, 0.5, 0.5], 1)
+
+    # changes are saved by flush, not by every add
+    assert not os.path.isfile(cacheFile)
+    cache.flush()
+    assert os.path.isfile(cacheFile) and not cache.dirty
+
+    # a request with a seed that differs by less than the pose resolution is a hit
+    endPose, info, isExact = cache.lookup(cache.getKeys(makeFields([1, 0, 0], [0, 0, 1e-5])))
+    assert isExact and info == 1 and np.allclose(endPose, 0.5)
+
+    # a slightly different target is a near miss
+    endPose, info, isExact = cache.lookup(cache.getKeys(makeFields([1.001, 0, 0], [0, 0, 0])))
+    assert not isExact and np.allclose(endPose, 0.5)
+
+    # a different target is a miss
+    assert cache.lookup(cache.getKeys(makeFields([1.5, 0, 0], [0, 0, 0]))) is None
+
+    # persistence and lru eviction
+    cache = ikcache.IkSolutionCache(maxSize=2, filename=cacheFile, saveDelay=None)
+    assert len(cache) == 1
+    assert cache.lookup(keys)[2]
+
+    cache.add(cache.getKeys(makeFields([2, 0, 0], [0, 0, 0])), [0, 0, 0], 1)
+    cache.lookup(keys)
+    cache.add(cache.getKeys(makeFields([3, 0, 0], [0, 0, 0])), [0, 0, 0], 1)
+    assert len(cache) == 2
+    assert cache.lookup(keys) is not None
+    assert cache.lookup(cache.getKeys(makeFields([2, 0, 0], [0, 0, 0]))) is None
+
+    # close saves pending changes and the cache is no longer flushed at exit
+    assert cache in ikcache._openCaches
+    cache.close()
+    assert cache not in ikcache._openCaches and not cache.dirty
+    assert len(ikcache.IkSolutionCache(maxSize=2, filename=cacheFile, saveDelay=None)) == 2
+
+
+def main():
+    tempDir = tempfile.mkdtemp()
+    try:
+        testCache(os.path.join(tempDir, 'ikcache.json'))
+    finally:
+        shutil.rmtree(tempDir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# import pydrakeik first.  This is a workaround for the issue:
+# https://github.com/RobotLocomotion/director/issues/467
+from director import pydrakeik
+
+from director import robotsystem
+from director.consoleapp import ConsoleApp
+from director import robotstate
+
+import numpy as np
+import time
+
+
+def makeWaypoints(ikPlanner, numWaypoints):
+
+    jointController = ikPlanner.jointController
+    startPose = np.array(jointController.getPose('q_nom'))
+    jointNames = ikPlanner.getJointGroup('Left Arm')
+    jointIndices = [robotstate.getDrakePoseJointNames().index(name) for name in jointNames]
+
+    poses = []
+    for i in xrange(numWaypoints):
+        pose = startPose.copy()
+        pose[jointIndices] += np.radians(5.0) * (i % 3)
+        poses.append(pose)
+    return poses, jointIndices
+
+
+def solve(ikPlanner, poses):
+    startTime = time.time()
+    plan, info = ikPlanner.computeMultiPostureGoal(poses, feetOnGround=False)
+    return time.time() - startTime, info
+
+
+def runBenchmark(ikPlanner, numWaypoints, numChangedList):
+
+    ikServer = ikPlanner.plannerPub.ikServer
+    poses, jointIndices = makeWaypoints(ikPlanner, numWaypoints)
+
+    print 'waypoints: %d' % numWaypoints
+    print '%8s %10s %10s %6s %6s' % ('changed', 'full', 'incr', 'info', 'info')
+
+    for numChanged in numChangedList:
+
+        changedPoses = [pose.copy() for pose in poses]
+        for i in xrange(1, numChanged + 1):
+            changedPoses[-i][jointIndices[0]] += np.radians(2.0)
+
+        ikServer.incrementalTrajEnabled = False
+        fullTime, fullInfo = solve(ikPlanner, changedPoses)
+
+        ikServer.incrementalTrajEnabled = True
+        ikServer.lastTraj = None
+        solve(ikPlanner, poses)
+        incrementalTime, incrementalInfo = solve(ikPlanner, changedPoses)
+
+        print '%8d %10.3f %10.3f %6d %6d' % (numChanged, fullTime, incrementalTime, fullInfo, incrementalInfo)
+
+        assert incrementalInfo < 10
+
+    # an unchanged request returns the previous solution
+    unchangedTime, info = solve(ikPlanner, changedPoses)
+    print 'unchanged: %.3f' % unchangedTime
+    assert unchangedTime < incrementalTime
+
+    ikServer.incrementalTrajEnabled = False
+
+
+app = ConsoleApp()
+view = app.createView()
+
+robotSystem = robotsystem.create(view, planningOnly=True)
+ikPlanner = robotSystem.ikPlanner
+ikPlanner.planningMode = 'pydrake'
+ikPlanner.plannerPub._setupLocalServer()
+
+numWaypoints = 4 if app.getTestingEnabled() else 8
+runBenchmark(ikPlanner, numWaypoints, range(0, numWaypoints))
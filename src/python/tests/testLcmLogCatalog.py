@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+
+from director import lcmlogindex
+from director import lcmspy
+
+
+def writeLog(filename):
+    syncBytes = lcmlogindex.EVENT_HEADER.pack(lcmlogindex.EVENT_SYNC_WORD, 0, 0, 0, 0)[:4]
+    with open(filename, 'wb') as f:
+        for i in xrange(3000):
+            # CAMERA has a 2 second gap, and its data contains the sync word
+            # to test the event boundary detection between byte ranges
+            if i % 2:
+                channel, data = 'CAMERA', 'fingerp1' + syncBytes*20
+                if 1000 < i < 1200:
+                    continue
+            else:
+                channel, data = 'STATE', 'fingerp2' + 'x'*(i % 50)
+            utime = 1000000 + i*10000
+            f.write(lcmlogindex.EVENT_HEADER.pack(lcmlogindex.EVENT_SYNC_WORD, i, utime, len(channel), len(data)))
+            f.write(channel + data)
+
+
+def testCatalog(logFile):
+
+    writeLog(logFile)
+
+    catalog = lcmspy.catalogLogFile(logFile, numWorkers=1, useCache=False)
+    channels = catalog['channels']
+    assert sorted(channels) == ['CAMERA', 'STATE']
+    assert channels['STATE']['count'] == 1500
+    assert channels['CAMERA']['count'] == 1400
+    assert catalog['numEvents'] == 2900
+    assert abs(channels['STATE']['rate'] - 50.0) < 1e-6
+    assert sum(channels['STATE']['rateHistogram']) == 1500
+    assert channels['STATE']['rateHistogram'][1] == 50
+    assert channels['STATE']['gaps'] == []
+    assert len(channels['CAMERA']['gaps']) == 1
+    assert channels['CAMERA']['fingerprints'] == {'fingerp1'.encode('hex'): 1400}
+    assert lcmspy.readSampleMessages(logFile, channels['STATE']) == ['fingerp2']
+
+    # parallel scan of small byte ranges gives the same result
+    parallelCatalog = lcmspy.catalogLogFile(logFile, numWorkers=4, chunkSize=4096, useCache=False)
+    assert parallelCatalog == catalog
+
+    # the second call is served from the cache
+    catalog = lcmspy.catalogLogFile(logFile)
+    assert os.path.isfile(logFile + '.ddcatalog.json')
+    assert lcmspy.catalogLogFile(logFile, numWorkers=1, chunkSize=1) == catalog
+
+    lcmspy.printLogCatalog(catalog)
+
+
+def main():
+    tempDir = tempfile.mkdtemp()
+    try:
+        testCatalog(os.path.join(tempDir, 'test.lcmlog'))
+    finally:
+        shutil.rmtree(tempDir)
+
+
+if __name__ == '__main__':
+    main()
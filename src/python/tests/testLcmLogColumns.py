@@ -0,0 +1,99 @@
+import os
+import struct
+import shutil
+import tempfile
+import numpy as np
+
+from director import lcmlogindex
+from director import lcmlogcolumns
+
+
+class Message(object):
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def encodeState(i):
+    return struct.pack('>d4d', i*0.5, *[i + j for j in xrange(4)])
+
+
+def decodeState(data):
+    values = struct.unpack('>d4d', data)
+    return Message(voltage=values[0], pose=Message(position=list(values[1:])))
+
+
+def writeEvents(f, numEvents, firstEvent=0):
+    for i in xrange(firstEvent, firstEvent + numEvents):
+        channel = 'STATE' if i % 2 else 'OTHER'
+        data = encodeState(i) if i % 2 else 'x' * 10
+        header = lcmlogindex.EVENT_HEADER.pack(lcmlogindex.EVENT_SYNC_WORD, i, 1000 + i*10, len(channel), len(data))
+        f.write(header + channel + data)
+
+
+def testFieldPath():
+    msg = decodeState(encodeState(3))
+    assert lcmlogcolumns.parseFieldPath('pose.position[2]') == ['pose', 'position', 2]
+    assert lcmlogcolumns.getFieldValue(msg, 'pose.position[2]') == 5.0
+    assert lcmlogcolumns.getFieldValue(msg, 'voltage') == 1.5
+
+    try:
+        lcmlogcolumns.parseFieldPath('pose..position')
+    except ValueError:
+        pass
+    else:
+        raise Exception('expected ValueError')
+
+
+def testColumns(logFile):
+
+    with open(logFile, 'wb') as f:
+        writeEvents(f, 1000)
+
+    fields = [('STATE', 'voltage'), ('STATE', 'pose.position'), ('MISSING', 'voltage')]
+    columns = lcmlogcolumns.LcmLogColumns(logFile, fields, decodeFunction=decodeState, chunkSize=64)
+    assert columns.update() == 500
+
+    voltage = columns.getColumn('STATE', 'voltage')
+    positions = columns.getColumn('STATE', 'pose.position')
+    timestamps = columns.getTimestamps('STATE')
+    assert isinstance(voltage, np.memmap)
+    assert voltage.shape == (500,) and positions.shape == (500, 4)
+    assert np.allclose(voltage, np.arange(1, 1000, 2)*0.5)
+    assert np.allclose(positions[:,3], np.arange(1, 1000, 2) + 3)
+    assert timestamps.dtype == np.int64 and timestamps[0] == 1010
+    assert len(columns.getColumn('MISSING', 'voltage')) == 0
+
+    # reopen, the columns are loaded without decoding
+    def failDecode(data):
+        raise Exception('unexpected decode')
+
+    columns = lcmlogcolumns.LcmLogColumns(logFile, fields, decodeFunction=failDecode)
+    assert columns.update() == 0
+    assert np.allclose(columns.getColumn('STATE', 'voltage'), voltage)
+
+    # grow the log, only the new events are decoded
+    with open(logFile, 'ab') as f:
+        writeEvents(f, 100, firstEvent=1000)
+
+    columns = lcmlogcolumns.LcmLogColumns(logFile, fields, decodeFunction=decodeState)
+    assert columns.update() == 50
+    assert len(columns.getTimestamps('STATE')) == 550
+    assert np.allclose(columns.getColumn('STATE', 'voltage')[-1], 1099*0.5)
+
+    # a different field list extracts again
+    columns = lcmlogcolumns.LcmLogColumns(logFile, fields[:1], decodeFunction=decodeState)
+    assert columns.update() == 550
+
+
+def main():
+    testFieldPath()
+    tempDir = tempfile.mkdtemp()
+    try:
+        testColumns(os.path.join(tempDir, 'test.lcmlog'))
+    finally:
+        shutil.rmtree(tempDir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+import os
+import struct
+import shutil
+import tempfile
+import numpy as np
+
+from director import lcmlogindex
+from director import lcmlogplayer
+
+
+def writeEvents(f, numEvents, firstEvent=0, utimeStep=10):
+    for i in xrange(firstEvent, firstEvent + numEvents):
+        channel = 'CHANNEL_%d' % (i % 3)
+        data = 'x' * (i % 50)
+        header = lcmlogindex.EVENT_HEADER.pack(lcmlogindex.EVENT_SYNC_WORD, i, 1000 + i*utimeStep, len(channel), len(data))
+        f.write(header + channel + data)
+
+
+def testIndex(logFile):
+
+    with open(logFile, 'wb') as f:
+        writeEvents(f, 1000)
+
+    index = lcmlogindex.LcmLogIndex(logFile)
+    assert index.update() == 1000
+    assert index.persistent
+    assert os.path.isfile(index.indexFilename)
+    assert index.channels == ['CHANNEL_0', 'CHANNEL_1', 'CHANNEL_2']
+
+    # reopen, the index is loaded from disk
+    index = lcmlogindex.LcmLogIndex(logFile)
+    assert index.update() == 0
+    assert len(index) == 1000
+    assert isinstance(index.events, np.memmap)
+
+    # grow the log with a trailing partial event, only new events are scanned
+    with open(logFile, 'ab') as f:
+        writeEvents(f, 500, firstEvent=1000)
+        f.write(struct.pack('>I', lcmlogindex.EVENT_SYNC_WORD))
+
+    index = lcmlogindex.LcmLogIndex(logFile)
+    assert index.update() == 500
+    assert len(index) == 1500
+    assert index.endOffset == os.path.getsize(logFile) - 4
+
+    assert index.findEventIndex(1000 + 700*10) == 700
+    assert index.getChannelIdsMatching('CHANNEL_[12]') == [1, 2]
+    assert index.getChannelMask([0]).sum() == 500
+
+    with open(logFile, 'rb') as f:
+        utime, channel, data = lcmlogindex.readEventAt(f, int(index.offsets[7]))
+    assert (utime, channel, data) == (1070, 'CHANNEL_1', 'x'*7)
+
+    # rewrite the log with different content, the index is rebuilt
+    with open(logFile, 'wb') as f:
+        writeEvents(f, 10, firstEvent=5)
+
+    index = lcmlogindex.LcmLogIndex(logFile)
+    assert index.update() == 10
+    assert index.utimes[0] == 1050
+
+    # a corrupt tail without a sync word ends the scan at the last good event
+    endOffset = index.endOffset
+    with open(logFile, 'ab') as f:
+        f.write('\x00' * 4 + '\x01' * 100)
+
+    index = lcmlogindex.LcmLogIndex(logFile)
+    assert index.update() == 0
+    assert index.endOffset == endOffset
+
+    # events written after the corrupt bytes are found by the next scan
+    with open(logFile, 'ab') as f:
+        writeEvents(f, 5, firstEvent=15)
+    index = lcmlogindex.LcmLogIndex(logFile)
+    assert index.update() == 5
+    assert index.endOffset == os.path.getsize(logFile)
+
+
+class PublishRecorder(object):
+
+    def __init__(self):
+        self.events = []
+
+    def publish(self, channel, data):
+        self.events.append((channel, data))
+
+
+def testPlaybackFilter(logFile):
+
+    with open(logFile, 'wb') as f:
+        writeEvents(f, 1000, utimeStep=10000)
+
+    recorder = PublishRecorder()
+    player = lcmlogplayer.LcmLogPlayer(lcmHandle=recorder)
+    player.readLog(logFile)
+
+    player.setChannelFilter(include=['CHANNEL_.*'], exclude=['CHANNEL_2'])
+    player.setChannelMaxRate('CHANNEL_1', 20.0)
+    player.resetPlayPosition(0.0)
+    player.advanceTime(player.getEndTime())
+
+    channels = [channel for channel, data in recorder.events]
+    assert 'CHANNEL_2' not in channels
+    assert channels.count('CHANNEL_0') == 334
+    # CHANNEL_1 has an event every 30 ms of log time, decimated to 20 Hz
+    assert channels.count('CHANNEL_1') == 167
+
+    # fast-forward publishes the last event on each enabled channel
+    recorder.events = []
+    player.setChannelMaxRate('CHANNEL_1', None)
+    player.skipToState(5.0)
+    assert recorder.events == [('CHANNEL_0', 'x'*(498 % 50)), ('CHANNEL_1', 'x'*(499 % 50))]
+    assert player.nextEventIndex == 500
+
+    # a time past the end of the log includes the last event
+    recorder.events = []
+    player.skipToState(player.getEndTime() + 1.0)
+    assert recorder.events == [('CHANNEL_1', 'x'*(997 % 50)), ('CHANNEL_0', 'x'*(999 % 50))]
+
+    # reading another log closes the previous file
+    logFileHandle = player.logFile
+    player.readLog(logFile)
+    assert logFileHandle.closed and not player.logFile.closed
+
+
+def main():
+    tempDir = tempfile.mkdtemp()
+    try:
+        testIndex(os.path.join(tempDir, 'test.lcmlog'))
+        testPlaybackFilter(os.path.join(tempDir, 'playback.lcmlog'))
+    finally:
+        shutil.rmtree(tempDir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import time
+import argparse
+import numpy as np
+
+from director import vtkAll as vtk
+from director import vtkNumpy as vnp
+from director.shallowCopy import shallowCopy
+
+
+def numpyToPolyDataGlyphFilter(pts, pointData):
+    '''
+    The previous numpyToPolyData implementation, used as the benchmark baseline.
+    '''
+    pd = vtk.vtkPolyData()
+    pd.SetPoints(vnp.getVtkPointsFromNumpy(pts.copy()))
+    for key, value in pointData.iteritems():
+        vnp.addNumpyToVtk(pd, value.copy(), key)
+    f = vtk.vtkVertexGlyphFilter()
+    f.SetInputData(pd)
+    f.Update()
+    return shallowCopy(f.GetOutput())
+
+
+def checkPolyData(polyData, pts, pointData):
+    numPoints = pts.shape[0]
+    assert polyData.GetNumberOfPoints() == numPoints
+    assert polyData.GetNumberOfVerts() == numPoints
+    assert polyData.GetNumberOfCells() == numPoints
+    assert np.allclose(vnp.getNumpyFromVtk(polyData, 'Points'), pts)
+    for key, value in pointData.iteritems():
+        assert np.allclose(vnp.getNumpyFromVtk(polyData, key), value)
+
+    cellIds = vtk.vtkIdList()
+    for cellId in (0, numPoints/2, numPoints - 1):
+        polyData.GetCellPoints(cellId, cellIds)
+        assert cellIds.GetNumberOfIds() == 1
+        assert cellIds.GetId(0) == cellId
+
+
+def testZeroCopy():
+    pts = np.random.rand(100, 3)
+    polyData = vnp.numpyToPolyData(pts, copy=False)
+    pts[0] = (1.0, 2.0, 3.0)
+    assert np.allclose(vnp.getNumpyFromVtk(polyData, 'Points')[0], (1.0, 2.0, 3.0))
+
+    polyData = vnp.numpyToPolyData(pts)
+    pts[0] = (0.0, 0.0, 0.0)
+    assert np.allclose(vnp.getNumpyFromVtk(polyData, 'Points')[0], (1.0, 2.0, 3.0))
+
+    # non-float points are converted
+    polyData = vnp.numpyToPolyData(np.ones((10, 3), dtype=int), copy=False)
+    assert vnp.getNumpyFromVtk(polyData, 'Points').dtype == np.float64
+
+
+def testBenchmark(pointCounts):
+    methods = [
+        ('glyph filter', numpyToPolyDataGlyphFilter),
+        ('copy', lambda pts, pointData: vnp.numpyToPolyData(pts, pointData)),
+        ('zero copy', lambda pts, pointData: vnp.numpyToPolyData(pts, pointData, copy=False)),
+        ]
+
+    for numPoints in pointCounts:
+        pts = np.random.rand(numPoints, 3).astype(np.float32)
+        pointData = {'intensity': np.random.rand(numPoints).astype(np.float32)}
+
+        for name, method in methods:
+            t0 = time.time()
+            polyData = method(pts, pointData)
+            elapsed = time.time() - t0
+            print '%10d points, %-12s: %.4f s' % (numPoints, name, elapsed)
+            checkPolyData(polyData, pts, pointData)
+            del polyData
+
+
+def getArgs():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--benchmark', action='store_true', help='time the conversions for up to 10M points')
+    args, unknown = parser.parse_known_args()
+    return args
+
+
+args = getArgs()
+
+testZeroCopy()
+if args.benchmark:
+    testBenchmark((10000, 100000, 1000000, 10000000))
+else:
+    testBenchmark((1000,))
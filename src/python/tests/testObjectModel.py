@@ -51,6 +51,27 @@ def main():
     assert p2.children()[0] == c2
     assert c2.children() == []
 
+    # the indexes follow renames and removals
+    c3 = om.ObjectModelItem('test child item 3')
+    tree.addToObjectModel(c3, p2)
+    assert p2.children() == [c2, c3]
+    assert c3.parent() == p2
+
+    c2.rename('renamed child')
+    assert tree.findObjectByName('test child item 2') is None
+    assert tree.findObjectByName('renamed child') == c2
+    assert p2.findChild('renamed child') == c2
+
+    tree.removeFromObjectModel(p2)
+    assert tree.findObjectByName('renamed child') is None
+    assert tree.findObjectByName('test parent item 2') is None
+    assert c3.getObjectTree() is None
+    assert tree.getTopLevelObjects() == []
+    assert not tree._items and not tree._objects and not tree._objectsByName
+
+    tree.addToObjectModel(p2)
+    tree.addToObjectModel(c2, p2)
+
     objectTree2.show()
     propertiesPanel2.show()
 
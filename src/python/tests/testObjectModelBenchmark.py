@@ -0,0 +1,108 @@
+import time
+import argparse
+import PythonQt
+from PythonQt import QtGui
+import director.objectmodel as om
+
+
+printTimes = False
+
+
+def timeit(name, func, *args):
+    t = time.time()
+    result = func(*args)
+    if printTimes:
+        print '%-28s %.3f s' % (name, time.time() - t)
+    return result
+
+
+def addItems(tree, parents, numItems):
+    objs = []
+    for i in xrange(numItems):
+        obj = om.ObjectModelItem('item %d' % i)
+        tree.addToObjectModel(obj, parents[i % len(parents)])
+        objs.append(obj)
+    return objs
+
+
+def findItems(tree, numItems):
+    for i in xrange(numItems):
+        assert tree.findObjectByName('item %d' % i) is not None
+
+
+def renameItems(objs):
+    for obj in objs:
+        obj.rename(obj.getProperty('Name') + ' renamed')
+
+
+def removeItems(tree, objs):
+    for obj in objs:
+        tree.removeFromObjectModel(obj)
+
+
+def batchAddItems(tree, parents, numItems):
+    with tree.batchUpdate():
+        return addItems(tree, parents, numItems)
+
+
+def batchRemoveItems(tree, objs):
+    with tree.batchUpdate():
+        removeItems(tree, objs)
+
+
+def getArgs():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--benchmark', action='store_true', help='time the object model with 10000 items')
+    args, unknown = parser.parse_known_args()
+    return args
+
+
+def main():
+
+    global printTimes
+    args = getArgs()
+
+    # the default run only checks the results with a small tree
+    printTimes = args.benchmark
+    numItems = 10000 if args.benchmark else 100
+
+    tree = om.ObjectModelTree()
+    tree.init(QtGui.QTreeWidget(), PythonQt.dd.ddPropertiesPanel())
+
+    parents = [tree.addContainer('container %d' % i) for i in xrange(10)]
+
+    objs = timeit('add %d items' % numItems, addItems, tree, parents, numItems)
+    timeit('find %d items' % numItems, findItems, tree, numItems)
+    assert len(parents[0].children()) == numItems / len(parents)
+
+    timeit('rename %d items' % (numItems/2), renameItems, objs[::2])
+    assert tree.findObjectByName('item 0') is None
+    assert tree.findObjectByName('item 0 renamed') == objs[0]
+
+    timeit('remove %d items' % (numItems/2), removeItems, tree, objs[::2])
+    assert tree.findObjectByName('item 1') == objs[1]
+    assert len(tree.getObjects()) == numItems/2 + len(parents)
+
+    timeit('remove %d containers' % len(parents), removeItems, tree, parents)
+    assert not tree.getObjects()
+
+    addedObjects = []
+    tree.connectObjectAdded(lambda tree, obj: addedObjects.append(obj))
+
+    parents = [tree.addContainer('container %d' % i) for i in xrange(10)]
+    objs = timeit('batch add %d items' % numItems, batchAddItems, tree, parents, numItems)
+    assert len(addedObjects) == numItems + len(parents)
+    assert tree.getTreeWidget().topLevelItemCount == len(parents)
+    assert tree._getItemForObject(parents[0]).childCount() == numItems / len(parents)
+
+    timeit('batch remove %d items' % (numItems/2), batchRemoveItems, tree, objs[::2])
+    assert tree._getItemForObject(parents[0]).childCount() == 0
+    assert tree._getItemForObject(parents[1]).childCount() == numItems / len(parents)
+
+    timeit('batch remove %d containers' % len(parents), batchRemoveItems, tree, parents)
+    assert not tree.getObjects()
+    assert tree.getTreeWidget().topLevelItemCount == 0
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+# import pydrakeik first.  This is a workaround for the issue:
+# https://github.com/RobotLocomotion/director/issues/467
+from director import pydrakeik
+
+from director import robotsystem
+from director import robotstate
+from director import ikplanner
+from director.consoleapp import ConsoleApp
+from director.fieldcontainer import FieldContainer
+
+import numpy as np
+
+
+def testComputeIkCost():
+
+    nominalPose = [0.0, 0.0, 0.0]
+    positionCosts = [1.0, 10.0, 0.0]
+
+    assert pydrakeik.computeIkCost(nominalPose, nominalPose, positionCosts) == 0.0
+    assert pydrakeik.computeIkCost([1.0, 0.0, 0.0], nominalPose, positionCosts) == 1.0
+    assert pydrakeik.computeIkCost([0.0, 0.0, 5.0], nominalPose, positionCosts) == 0.0
+
+    poses = [[0.0, 1.0, 0.0], [2.0, 0.0, 0.0], [0.5, 0.0, 0.0]]
+    costs = [pydrakeik.computeIkCost(pose, nominalPose, positionCosts) for pose in poses]
+    assert costs == [10.0, 4.0, 0.25]
+    assert sorted(range(len(poses)), key=costs.__getitem__) == [2, 1, 0]
+
+
+def testMakeIkSeeds():
+
+    inf = float('inf')
+    fields = FieldContainer(
+        poses=dict(q_seed=[5.0, 0.1, 0.2], q_nom=[0.0, 0.0, 0.0]),
+        seedPose='q_seed',
+        nominalPose='q_nom',
+        jointNames=['base_x', 'a', 'b'],
+        jointLimits=dict(base_x=[-inf, inf], a=[-1.0, 1.0], b=[0.0, 0.5]),
+        )
+    previous = [[1.0, 1.0, 1.0], [2.0, 2.0, 2.0]]
+
+    seeds = pydrakeik.makeIkSeeds(fields, 8, previous, np.random.RandomState(0))
+    assert [name for name, pose in seeds] == ['seed', 'nominal', 'previous_0', 'previous_1',
+                                              'random_0', 'random_1', 'random_2', 'random_3']
+    assert np.allclose(seeds[0][1], fields.poses['q_seed'])
+    assert np.allclose(seeds[1][1], fields.poses['q_nom'])
+    assert np.allclose(seeds[2][1], previous[0])
+    assert np.allclose(seeds[3][1], previous[1])
+
+    for name, pose in seeds[4:]:
+        # the unbounded joint keeps the seed value
+        assert pose[0] == 5.0
+        assert -1.0 <= pose[1] <= 1.0
+        assert 0.0 <= pose[2] <= 0.5
+
+    # the same random state gives the same seeds
+    again = pydrakeik.makeIkSeeds(fields, 8, previous, np.random.RandomState(0))
+    assert all(np.array_equal(a[1], b[1]) for a, b in zip(seeds, again))
+
+    seeds = pydrakeik.makeIkSeeds(fields, 3, previous)
+    assert [name for name, pose in seeds] == ['seed', 'nominal', 'previous_0']
+
+
+def testIkFuture():
+
+    calls = []
+    future = pydrakeik.IkFuture()
+    future.addDoneCallback(calls.append)
+    assert not future.done()
+
+    future._setResult('done', ([0.0], 1))
+    assert future.done() and not future.cancelled()
+    assert future.result() == ([0.0], 1)
+    assert calls == [future]
+
+    # callbacks added after completion are called right away
+    future.addDoneCallback(calls.append)
+    assert calls == [future, future]
+
+    future = pydrakeik.IkFuture()
+    assert future.cancel()
+    try:
+        future.result()
+    except pydrakeik.IkCancelledError:
+        pass
+    else:
+        raise Exception('expected IkCancelledError')
+
+    future = pydrakeik.IkFuture()
+    future._setResult('error', 'traceback')
+    try:
+        future.result()
+    except pydrakeik.IkCancelledError:
+        raise
+    except Exception:
+        pass
+    else:
+        raise Exception('expected an exception')
+
+
+def makeFields(plannerPub):
+
+    ikPlanner = robotSystem.ikPlanner
+    constraints = [ikPlanner.createPostureConstraint('q_nom', robotstate.getDrakePoseJointNames())]
+    ikParameters = ikplanner.IkParameters()
+    ikParameters.setToDefaults()
+    return plannerPub.setupFields(constraints, ikParameters, ikPlanner.defaultPositionCosts, 'q_nom', 'q_nom')
+
+
+def testEncodeDecode(plannerPub):
+
+    fields = makeFields(plannerPub)
+    decoded = pydrakeik.decodeFields(pydrakeik.encodeFields(fields))
+
+    assert decoded.poses == fields.poses
+    assert decoded.jointNames == fields.jointNames
+    assert decoded.seedPose == fields.seedPose and decoded.nominalPose == fields.nominalPose
+    assert [type(c) for c in decoded.constraints] == [type(c) for c in fields.constraints]
+    assert decoded.options.majorIterationsLimit == fields.options.majorIterationsLimit
+
+
+def testWorkerPool(plannerPub):
+
+    initArgs = plannerPub._getInitArgs()
+    fields = makeFields(plannerPub)
+    nominalPose = np.array(fields.poses['q_nom'])
+
+    pool = pydrakeik.IkWorkerPool(initArgs.urdfFile, initArgs.packagePaths, numWorkers=2)
+    assert pool.isAlive()
+
+    results = []
+    future = pool.submit('runIk', fields, callback=results.append)
+    endPose, info = future.result(timeout=120)
+    assert pydrakeik.isIkInfoFeasible(info)
+    assert np.allclose(endPose, nominalPose, atol=1e-3)
+    assert results == [future] and future.solveTime >= 0.0
+
+    # a new request with cancelPending makes the pending ones stale
+    first = pool.submit('runIk', fields)
+    second = pool.submit('runIk', fields, cancelPending=True)
+    assert first.cancelled()
+    pool.waitForAny([second], timeout=120)
+    assert second.status == 'done'
+
+    third = pool.submit('runIk', fields)
+    assert third.cancel() and third.cancelled()
+
+    pool.shutdown()
+    assert not pool.isAlive()
+    future = pool.submit('runIk', fields)
+    assert future.status == 'error'
+
+
+def testWorkerExit(plannerPub):
+
+    initArgs = plannerPub._getInitArgs()
+    fields = makeFields(plannerPub)
+
+    pool = pydrakeik.IkWorkerPool(initArgs.urdfFile, initArgs.packagePaths, numWorkers=1)
+    pool.workers[0].terminate()
+    pool.workers[0].join()
+
+    # the wait ends with a failed future instead of blocking
+    future = pool.submit('runIk', fields)
+    pool.waitForAny([future])
+    assert future.status == 'error'
+    assert not pool.isAlive()
+
+
+def testPlannerFallback(plannerPub):
+
+    fields = makeFields(plannerPub)
+    plannerPub.workerPool = None
+    future = plannerPub._submit('runIk', fields, None, cancelPending=False)
+    assert future.status == 'done'
+    assert pydrakeik.isIkInfoFeasible(future.value[1])
+
+
+app = ConsoleApp()
+view = app.createView()
+robotSystem = robotsystem.create(view, planningOnly=True)
+plannerPub = robotSystem.ikPlanner.publishers['pydrake']
+
+testComputeIkCost()
+testMakeIkSeeds()
+testIkFuture()
+testEncodeDecode(plannerPub)
+testWorkerPool(plannerPub)
+testWorkerExit(plannerPub)
+testPlannerFallback(plannerPub)
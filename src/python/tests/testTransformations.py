@@ -59,6 +59,22 @@ def testEulerToFrame():
     assert np.allclose(mat, mat2)
 
 
+def testMatricesFromPoses():
+    '''
+    Test vectorized matricesFromPoses is same as transformFromPose
+    '''
+    quats = [transformations.random_quaternion() for i in xrange(10)]
+    quats.append(np.zeros(4))
+    positions = np.random.rand(len(quats), 3)
+
+    mats = transformUtils.matricesFromPoses(positions, quats)
+
+    for pos, quat, mat in zip(positions, quats, mats):
+        mat2 = transformUtils.getNumpyFromTransform(transformUtils.transformFromPose(pos, quat))
+        assert np.allclose(mat, mat2)
+
+
 testTransform()
 testEuler()
 testEulerToFrame()
+testMatricesFromPoses()
@@ -0,0 +1,110 @@
+import time
+import argparse
+import numpy as np
+
+from director import treeviewerformats
+from director.treeviewer import Geometry
+from director import vtkNumpy as vnp
+
+
+def makePointcloudRequest(numPoints):
+    points = np.random.rand(numPoints, 3).astype(np.float32)
+    intensity = np.random.rand(numPoints).astype(np.float32)
+    return {
+        "utime": 0,
+        "delete": [],
+        "settransform": [],
+        "setgeometry": [{
+            "path": ["cloud"],
+            "geometry": {
+                "type": "pointcloud",
+                "points": points,
+                "channels": {"intensity": intensity}
+            }
+        }]
+    }
+
+
+def benchmarkFormat(data, format):
+    t0 = time.time()
+    payload = treeviewerformats.encode(data, format)
+    t1 = time.time()
+    decoded = treeviewerformats.decode(payload, format)
+    t2 = time.time()
+    polyData = Geometry([decoded["setgeometry"][0]["geometry"]]).polyData
+    t3 = time.time()
+
+    print '%s: %.2f MB, encode %.3f s, decode %.3f s, polydata %.3f s' % (
+        format, len(payload) / 1e6, t1 - t0, t2 - t1, t3 - t2)
+    return polyData
+
+
+def testRoundTrip():
+    data = makePointcloudRequest(100)
+    points = data["setgeometry"][0]["geometry"]["points"]
+
+    for format in treeviewerformats.getSupportedFormats():
+        decoded = treeviewerformats.decode(treeviewerformats.encode(data, format), format)
+        decodedPoints = np.asarray(decoded["setgeometry"][0]["geometry"]["points"])
+        assert np.allclose(decodedPoints, points)
+        assert decoded["setgeometry"][0]["path"] == ["cloud"]
+
+
+def testBenchmark(numPoints=10000):
+    data = makePointcloudRequest(numPoints)
+    points = data["setgeometry"][0]["geometry"]["points"]
+
+    for format in treeviewerformats.getSupportedFormats():
+        polyData = benchmarkFormat(data, format)
+        assert polyData.GetNumberOfPoints() == numPoints
+        assert np.allclose(vnp.getNumpyFromVtk(polyData, 'Points'), points)
+
+
+def testMsgpackText():
+    if not treeviewerformats.HAVE_MSGPACK:
+        return
+    import msgpack
+    data = {"path": ["cloud"], "points": np.zeros((2, 3), dtype=np.float32)}
+    payload = treeviewerformats.encode(data, treeviewerformats.MSGPACK_FORMAT)
+    unpacked = msgpack.unpackb(bytes(payload), **treeviewerformats._UNPACK_TEXT_OPTIONS)
+    # text is packed as msgpack str, so it unpacks as unicode, and only the
+    # array buffer is packed as bin
+    assert unpacked[u"path"] == [u"cloud"]
+    assert type(unpacked[u"path"][0]) is unicode
+    assert type(unpacked[u"points"][u"data"]) is bytes
+
+
+def testMsgpackIntegerArrays():
+    if not treeviewerformats.HAVE_MSGPACK:
+        return
+    # int64 arrays, such as triangle indices, are encoded as int32 when they fit
+    for array in [np.arange(6).reshape(2, 3), np.array([2**31 - 1, -2**31]),
+                  np.array([2**32 - 1], dtype=np.uint64), np.zeros(0, dtype=np.int64),
+                  np.array([1, 2], dtype=np.int16)]:
+        payload = treeviewerformats.encode({"faces": array}, treeviewerformats.MSGPACK_FORMAT)
+        decoded = treeviewerformats.decode(payload, treeviewerformats.MSGPACK_FORMAT)["faces"]
+        assert decoded.dtype.str in treeviewerformats.MSGPACK_DTYPES
+        assert decoded.shape == array.shape and np.array_equal(decoded, array)
+
+    for array in [np.array([2**31]), np.array([-1, 2**32], dtype=np.int64)]:
+        try:
+            treeviewerformats.encode({"faces": array}, treeviewerformats.MSGPACK_FORMAT)
+        except TypeError:
+            pass
+        else:
+            raise Exception('expected a TypeError for values that do not fit in 32 bits')
+
+
+def getArgs():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--benchmark', action='store_true', help='time the formats with a large point cloud')
+    args, unknown = parser.parse_known_args()
+    return args
+
+
+args = getArgs()
+
+testRoundTrip()
+testMsgpackText()
+testMsgpackIntegerArrays()
+testBenchmark(1000000 if args.benchmark else 10000)